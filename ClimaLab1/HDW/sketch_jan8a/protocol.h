@@ -0,0 +1,201 @@
+// Protocolo de texto de la estación: armado de líneas, comandos y paquetes.
+//
+// No depende de Arduino (solo la biblioteca de C), así que también se
+// compila en la PC para las pruebas de HDW/tests. Todo trabaja sobre
+// buffers fijos: nada de String ni memoria dinámica.
+#ifndef CLIMALAB_PROTOCOL_H
+#define CLIMALAB_PROTOCOL_H
+
+#include <ctype.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+#define CMD_MAX        96    // largo máximo de un comando (SET_WIFI incluido)
+#define PACKET_MAX     64    // paquete de texto más largo, con RAW y el terminador
+#define WIFI_FIELD_MAX 32    // SSID y clave, lo que cabe en la EEPROM
+
+#define STREAM_MIN_MS    20
+#define UV_PERIOD_MIN_MS 5
+#define UV_PERIOD_MAX_MS 10000
+
+// ===================== LECTURA =====================
+#define VALID_UV     0x01
+#define VALID_TEMP   0x02
+#define VALID_HUM    0x04
+#define VALID_PRES   0x08
+#define VALID_UV_ADC 0x10
+
+struct SensorReading {
+  uint32_t tMs;    // millis() al leer los sensores
+  uint8_t valid;
+  int uv;
+  int uvAdc;       // analogRead() del sensor UV, antes de los umbrales
+  float temp;
+  float hum;
+  float pres;
+};
+
+// Umbrales (mV) del índice UV; iguales a FIRMWARE_UV_MV en calibration.py
+static const int UV_THRESHOLDS_MV[] = {50, 227, 318, 408, 503, 606, 696, 795, 881, 976, 1079};
+
+static inline int uvIndexFromMv(float mV) {
+  int index = 0;
+  while (index < (int)(sizeof(UV_THRESHOLDS_MV) / sizeof(UV_THRESHOLDS_MV[0])) &&
+         mV >= UV_THRESHOLDS_MV[index]) {
+    index++;
+  }
+  return index;
+}
+
+static inline const char *uvLevelWord(int uv) {
+  if (uv <= 2) return "Bajo";
+  if (uv <= 5) return "Moderado";
+  if (uv <= 7) return "Alto";
+  if (uv <= 10) return "Muy Alto";
+  return "Extremo";
+}
+
+// ===================== LÍNEAS =====================
+// Junta los caracteres de un canal hasta el fin de línea
+struct LineReader {
+  char line[CMD_MAX];
+  size_t len;
+  bool overflow;     // la línea no entró: se descarta entera
+};
+
+enum LineStatus { LINE_PENDING, LINE_READY, LINE_OVERFLOW };
+
+static inline void resetLine(LineReader &r) {
+  r.len = 0;
+  r.overflow = false;
+  r.line[0] = '\0';
+}
+
+// Agrega un carácter; con LINE_READY la línea queda en r.line hasta el próximo
+static inline LineStatus pushLineChar(LineReader &r, char c) {
+  if (c == '\r') return LINE_PENDING;
+
+  if (c != '\n') {
+    if (r.len < CMD_MAX - 1) r.line[r.len++] = c;
+    else r.overflow = true;
+    return LINE_PENDING;
+  }
+
+  bool overflow = r.overflow;
+  r.line[r.len] = '\0';
+  r.len = 0;
+  r.overflow = false;
+  return overflow ? LINE_OVERFLOW : LINE_READY;
+}
+
+// ===================== COMANDOS =====================
+enum CommandKind {
+  CMD_NONE,          // línea vacía
+  CMD_UNKNOWN,       // se ignora, como siempre
+  CMD_DATA,
+  CMD_FORMAT,        // flag: binario
+  CMD_RAW,           // flag: encendido
+  CMD_SAMPLE,        // value: periodo del UV en ms
+  CMD_STREAM,        // value: periodo en ms
+  CMD_STOP,
+  CMD_DUMP,          // value: desde qué seq
+  CMD_SET_WIFI,      // ssid, pass
+};
+
+struct Command {
+  CommandKind kind;
+  bool ok;           // false: argumentos inválidos, se responde ERR_...
+  bool flag;
+  uint32_t value;
+  const char *ssid;  // apuntan dentro de la línea
+  const char *pass;
+};
+
+// Quita espacios al principio y al final, en el mismo buffer
+static inline char *trimLine(char *s) {
+  while (isspace((unsigned char)*s)) s++;
+  size_t n = strlen(s);
+  while (n && isspace((unsigned char)s[n - 1])) s[--n] = '\0';
+  return s;
+}
+
+// Entero sin signo decimal que ocupa todo el texto
+static inline bool parseNumber(const char *text, uint32_t &value) {
+  if (!text || !isdigit((unsigned char)*text)) return false;
+  char *end;
+  unsigned long v = strtoul(text, &end, 10);
+  if (*end != '\0' || v > 0xFFFFFFFFUL) return false;
+  value = (uint32_t)v;
+  return true;
+}
+
+// Interpreta una línea (la modifica: separa los campos de SET_WIFI)
+static inline Command parseCommand(char *line) {
+  Command c = {CMD_UNKNOWN, true, false, 0, NULL, NULL};
+  char *cmd = trimLine(line);
+
+  // Nombre hasta la primera coma; el resto son los argumentos
+  char *args = strchr(cmd, ',');
+  if (args) *args++ = '\0';
+
+  if (*cmd == '\0' && !args) {
+    c.kind = CMD_NONE;
+  } else if (strcmp(cmd, "DATA") == 0 && !args) {
+    c.kind = CMD_DATA;
+  } else if (strcmp(cmd, "STOP") == 0 && !args) {
+    c.kind = CMD_STOP;
+  } else if (strcmp(cmd, "FORMAT") == 0 && args && (strcmp(args, "BIN") == 0 || strcmp(args, "TXT") == 0)) {
+    c.kind = CMD_FORMAT;
+    c.flag = strcmp(args, "BIN") == 0;
+  } else if (strcmp(cmd, "RAW") == 0 && args && (strcmp(args, "ON") == 0 || strcmp(args, "OFF") == 0)) {
+    c.kind = CMD_RAW;
+    c.flag = strcmp(args, "ON") == 0;
+  } else if (strcmp(cmd, "SAMPLE") == 0) {
+    c.kind = CMD_SAMPLE;
+    c.ok = parseNumber(args, c.value) && c.value >= UV_PERIOD_MIN_MS && c.value <= UV_PERIOD_MAX_MS;
+  } else if (strcmp(cmd, "STREAM") == 0) {
+    c.kind = CMD_STREAM;
+    c.ok = parseNumber(args, c.value) && c.value >= STREAM_MIN_MS;
+  } else if (strcmp(cmd, "DUMP") == 0) {
+    c.kind = CMD_DUMP;
+    c.ok = parseNumber(args, c.value);
+  } else if (strcmp(cmd, "SET_WIFI") == 0) {
+    // SET_WIFI,<ssid>,<clave>: la clave puede llevar comas
+    c.kind = CMD_SET_WIFI;
+    char *pass = args ? strchr(args, ',') : NULL;
+    if (pass) *pass++ = '\0';
+    c.ok = pass && *args && strlen(args) <= WIFI_FIELD_MAX && strlen(pass) <= WIFI_FIELD_MAX;
+    c.ssid = args;
+    c.pass = pass;
+  }
+
+  return c;
+}
+
+// ===================== PAQUETE DE TEXTO =====================
+// Un valor con sus decimales, o "NA" si el sensor no respondió
+static inline void formatField(char *buf, size_t size, bool valid, float value, int decimals) {
+  if (valid) snprintf(buf, size, "%.*f", decimals, (double)value);
+  else snprintf(buf, size, "NA");
+}
+
+// "uv,nivel,temp,hum,pres,millis" (con raw: más decimales y ",adc" al final).
+// Devuelve el largo, o -1 si no entró en el buffer.
+static inline int formatDataPacket(char *buf, size_t size, const SensorReading &r, bool raw) {
+  char temp[16], hum[16], pres[16];
+  formatField(temp, sizeof(temp), r.valid & VALID_TEMP, r.temp, raw ? 2 : 1);
+  formatField(hum, sizeof(hum), r.valid & VALID_HUM, r.hum, raw ? 2 : 1);
+  formatField(pres, sizeof(pres), r.valid & VALID_PRES, r.pres, raw ? 1 : 0);
+
+  // millis() después de los valores: la app fecha cada muestra con el reloj de la placa
+  int n = snprintf(buf, size, "%d,%s,%s,%s,%s,%lu", r.uv, uvLevelWord(r.uv), temp, hum, pres,
+                   (unsigned long)r.tMs);
+  if (raw && n >= 0 && (size_t)n < size) {
+    n += snprintf(buf + n, size - n, ",%d", r.uvAdc);
+  }
+  return (n < 0 || (size_t)n >= size) ? -1 : n;
+}
+
+#endif
@@ -4,6 +4,8 @@
 #include <Adafruit_AHTX0.h>
 #include <Adafruit_BMP280.h>
 
+#include "protocol.h"
+
 // ===================== EEPROM =====================
 #define EEPROM_SIZE 128
 #define ADDR_FLAG   0
@@ -19,18 +21,135 @@ bool bmpOK = false;
 
 // ===================== UV =====================
 #define UV_PIN 34
-int uvIndex = 0;
-String uvNivel = "";
+
+// ===================== MUESTREO EN SEGUNDO PLANO =====================
+// Los sensores se leen solos en cada vuelta del loop y se filtran; DATA,
+// STREAM y el registro responden con la última lectura filtrada, sin
+// esperar ninguna conversión.
+#define UV_PERIOD_MS      20    // una muestra de UV cada 20 ms (cambia con SAMPLE,<ms>)
+#define UV_OVERSAMPLE     16    // analogRead promediados en cada muestra
+#define UV_MEDIAN         5     // mediana de las últimas muestras: quita los picos del ADC
+
+#define AHT_ADDR          0x38
+#define AHT_PERIOD_MS     2000  // más seguido el AHT20 se autocalienta
+#define AHT_CONVERSION_MS 80
+#define PRES_PERIOD_MS    100   // el BMP280 convierte solo (modo normal); aquí solo se lee
+#define ENV_AVG           4     // promedio de las últimas lecturas de T, H y P
+
+// Promedio móvil de las últimas ENV_AVG lecturas
+struct Average {
+  float values[ENV_AVG];
+  uint8_t count;
+  uint8_t pos;
+};
+
+unsigned long uvPeriodMs = UV_PERIOD_MS;
+unsigned long uvNext = 0;
+int uvWindow[UV_MEDIAN];
+uint8_t uvCount = 0;
+uint8_t uvPos = 0;
+
+enum AhtState { AHT_IDLE, AHT_MEASURING };
+AhtState ahtState = AHT_IDLE;
+unsigned long ahtNext = 0;
+unsigned long ahtReadyAt = 0;
+unsigned long presNext = 0;
+
+Average tempAvg = {};
+Average humAvg = {};
+Average presAvg = {};
 
 // ===================== WIFI =====================
 WiFiServer server(3333);
 bool wifiOK = false;
 
+// El AP se reinicia sin bloquear: se apaga, y WIFI_RESTART_MS después el
+// loop lo vuelve a levantar con wifiSsid/wifiPass
+#define WIFI_RESTART_MS 1000
+
+enum WifiState { WIFI_IDLE, WIFI_RESTARTING };
+WifiState wifiState = WIFI_IDLE;
+unsigned long wifiRestartAt = 0;
+bool wifiReplyPending = false;   // responder OK_WIFI por Serial al terminar
+char wifiSsid[WIFI_FIELD_MAX + 1];
+char wifiPass[WIFI_FIELD_MAX + 1];
+
+// ===================== SESIONES =====================
+#define MAX_CLIENTS   4     // clientes WiFi atendidos a la vez
+
+// Estado de cada canal (Serial o un cliente WiFi): formato, envío
+// continuo y la línea que se está recibiendo
+struct Session {
+  bool binary;
+  bool raw;            // paquetes de texto con la lectura cruda (RAW,ON)
+  bool streaming;
+  unsigned long streamMs;
+  unsigned long nextPush;
+  LineReader reader;
+  uint32_t dumpNext;   // próximo registro a enviar por DUMP
+  uint32_t dumpLeft;   // registros que faltan enviar
+  uint32_t frameSeq;   // seq de la última trama enviada por este canal
+};
+
+Session serialSession;
+WiFiClient clients[MAX_CLIENTS];
+Session clientSessions[MAX_CLIENTS];
+
+// ===================== TRAMA BINARIA =====================
+// Debe coincidir con climalab/frames.py (24 bytes, little-endian)
+#define FRAME_SYNC0 0xA5
+#define FRAME_SYNC1 0x5A
+
+// Los bits de valid (VALID_*) y SensorReading están en protocol.h
+struct __attribute__((packed)) DataFrame {
+  uint8_t  sync[2];
+  uint32_t seq;
+  uint32_t tMs;
+  uint8_t  valid;
+  uint8_t  uv;
+  int16_t  temp;   // décimas de °C
+  uint16_t hum;    // décimas de %
+  uint32_t pres;   // Pa
+  uint16_t uvAdc;  // lectura cruda del ADC de UV (0..4095)
+  uint16_t crc;    // CRC-16/CCITT-FALSE de seq..uvAdc
+};
+
+// ===================== REGISTRO EN RAM =====================
+// La placa toma una muestra cada LOG_PERIOD_MS aunque nadie la pida; si la
+// app se desconecta, al volver recupera lo que falta con DUMP,<desde_seq>.
+#define LOG_PERIOD_MS 1000
+#define LOG_CAPACITY  3600   // 1 h a 1 Hz (~84 KB de RAM)
+#define DUMP_CHUNK    32     // tramas por escritura durante un DUMP
+
+DataFrame logRing[LOG_CAPACITY];
+uint32_t logHead = 0;          // seq del último registro (0 = vacío)
+unsigned long logNext = 0;
+
 // ===================== PROTOTIPOS =====================
-void saveWiFi(String ssid, String pass);
-bool loadWiFi(String &ssid, String &pass);
-void startWiFiAP(String ssid, String pass);
-String buildDataPacket();
+void saveWiFi(const char *ssid, const char *pass);
+bool loadWiFi(char *ssid, char *pass);
+void startWiFiAP(const char *ssid, const char *pass);
+void restartWiFi(unsigned long delayMs, bool reply);
+void wifiStep();
+void sampleSensors();
+void sampleUv(unsigned long now);
+void sampleAht(unsigned long now);
+void pushAverage(Average &a, float v);
+float averageOf(const Average &a);
+int uvMedian();
+SensorReading readSensors();
+DataFrame buildDataFrame(const SensorReading &r, uint32_t seq);
+void logSample();
+uint32_t logOldest();
+void startDump(Print &out, Session &s, uint32_t since);
+void pushDump(Print &out, Session &s);
+uint16_t crc16(const uint8_t *data, size_t len);
+void sendPacket(Print &out, Session &s);
+void resetSession(Session &s);
+void pollSession(Stream &io, Session &s, bool isSerial);
+void handleCommand(const Command &c, Print &out, Session &s, bool isSerial);
+void pushStream(Print &out, Session &s);
+void acceptWiFiClients();
 
 // ===================== SETUP =====================
 void setup() {
@@ -47,164 +166,463 @@ void setup() {
 
   if (bmp.begin(0x76)) {
     bmpOK = true;
+    // Modo normal: el chip mide continuamente con sobremuestreo y su filtro IIR
+    bmp.setSampling(Adafruit_BMP280::MODE_NORMAL,
+                    Adafruit_BMP280::SAMPLING_X2,     // temperatura
+                    Adafruit_BMP280::SAMPLING_X16,    // presión
+                    Adafruit_BMP280::FILTER_X16,
+                    Adafruit_BMP280::STANDBY_MS_63);
     Serial.println("BMP280 OK");
   }
 
   pinMode(UV_PIN, INPUT);
+  sampleUv(millis());   // así DATA tiene UV desde el primer pedido
+  resetSession(serialSession);
 
   // 🔴 Apagar WiFi previo
   WiFi.mode(WIFI_OFF);
-  delay(1000);
 
   // ===================== RESTAURAR WIFI =====================
-  String ssid, pass;
-  if (loadWiFi(ssid, pass)) {
+  // El AP se levanta desde el loop, cuando el WiFi terminó de apagarse
+  if (loadWiFi(wifiSsid, wifiPass)) {
     Serial.println("📡 Restaurando WiFi guardado...");
-    startWiFiAP(ssid, pass);
+    restartWiFi(WIFI_RESTART_MS, false);
   }
 }
 
 // ===================== LOOP =====================
+// Nada bloquea: en cada vuelta se atienden Serial y todos los clientes
 void loop() {
-  handleSerialCommands();
-  handleWiFiClient();
+  sampleSensors();
+  logSample();
+  pollSession(Serial, serialSession, true);
+  wifiStep();
+
+  if (wifiOK) {
+    acceptWiFiClients();
+    for (int i = 0; i < MAX_CLIENTS; i++) {
+      if (!clients[i]) continue;
+      if (!clients[i].connected()) {
+        clients[i].stop();
+        continue;
+      }
+      pollSession(clients[i], clientSessions[i], false);
+    }
+  }
 }
 
-// ===================== SERIAL =====================
-void handleSerialCommands() {
-  if (!Serial.available()) return;
+// ===================== SESIONES =====================
+void resetSession(Session &s) {
+  s.binary = false;
+  s.raw = false;
+  s.streaming = false;
+  s.streamMs = 0;
+  s.nextPush = 0;
+  resetLine(s.reader);
+  s.dumpNext = 0;
+  s.dumpLeft = 0;
+  s.frameSeq = 0;
+}
+
+// Lee lo que haya llegado sin esperar; cada línea completa es un comando.
+// Los comandos se responden en orden, así el cliente puede enviar varios
+// DATA seguidos sin esperar cada respuesta.
+void pollSession(Stream &io, Session &s, bool isSerial) {
+  // Mientras dura un DUMP no se leen comandos ni se envía streaming:
+  // el cliente espera exactamente las tramas anunciadas
+  if (s.dumpLeft) {
+    pushDump(io, s);
+    return;
+  }
+
+  while (io.available()) {
+    LineStatus status = pushLineChar(s.reader, io.read());
+    if (status == LINE_OVERFLOW) {
+      io.println("ERR_CMD");
+    } else if (status == LINE_READY) {
+      handleCommand(parseCommand(s.reader.line), io, s, isSerial);
+    }
+  }
 
-  String cmd = Serial.readStringUntil('\n');
-  cmd.trim();
+  pushStream(io, s);
+}
 
-  // -------- CONFIGURAR WIFI --------
-  if (cmd.startsWith("SET_WIFI")) {
-    int p1 = cmd.indexOf(',');
-    int p2 = cmd.indexOf(',', p1 + 1);
+void handleCommand(const Command &c, Print &out, Session &s, bool isSerial) {
+  switch (c.kind) {
+    // -------- CONFIGURAR WIFI (solo por cable) --------
+    case CMD_SET_WIFI:
+      if (!isSerial) return;
+      if (!c.ok) {
+        out.println("ERR_WIFI");
+        return;
+      }
+      strncpy(wifiSsid, c.ssid, WIFI_FIELD_MAX);
+      wifiSsid[WIFI_FIELD_MAX] = '\0';
+      strncpy(wifiPass, c.pass, WIFI_FIELD_MAX);
+      wifiPass[WIFI_FIELD_MAX] = '\0';
+
+      // Guardar en EEPROM; OK_WIFI sale cuando el AP nuevo está activo
+      saveWiFi(wifiSsid, wifiPass);
+      restartWiFi(WIFI_RESTART_MS, true);
+      return;
 
-    if (p1 < 0 || p2 < 0) {
-      Serial.println("ERR_WIFI");
+    // -------- PEDIR DATOS --------
+    case CMD_DATA:
+      sendPacket(out, s);
       return;
-    }
 
-    String ssid = cmd.substring(p1 + 1, p2);
-    String pass = cmd.substring(p2 + 1);
+    // -------- FORMATO (texto / binario) --------
+    case CMD_FORMAT:
+      s.binary = c.flag;
+      out.println("OK_FORMAT");
+      return;
 
-    // Apagar WiFi anterior
-    WiFi.softAPdisconnect(true);
-    WiFi.disconnect(true);
-    WiFi.mode(WIFI_OFF);
-    delay(1000);
+    // -------- VALORES CRUDOS (para recalibrar en la app) --------
+    case CMD_RAW:
+      s.raw = c.flag;
+      out.println("OK_RAW");
+      return;
 
-    // Guardar en EEPROM
-    saveWiFi(ssid, pass);
+    // -------- MUESTREO (SAMPLE,<ms>: periodo del UV en segundo plano) --------
+    case CMD_SAMPLE:
+      if (!c.ok) {
+        out.println("ERR_SAMPLE");
+        return;
+      }
+      uvPeriodMs = c.value;
+      uvNext = millis();
+      out.println("OK_SAMPLE");
+      return;
 
-    // Crear nuevo AP
-    startWiFiAP(ssid, pass);
+    // -------- STREAMING --------
+    case CMD_STREAM:
+      if (!c.ok) {
+        out.println("ERR_STREAM");
+        return;
+      }
+      s.streamMs = c.value;
+      s.nextPush = millis();
+      s.streaming = true;
+      out.println("OK_STREAM");
+      return;
 
-    Serial.println("OK_WIFI");
-    return;
-  }
+    case CMD_STOP:
+      s.streaming = false;
+      out.println("OK_STOP");
+      return;
 
-  // -------- PEDIR DATOS --------
-  if (cmd == "DATA") {
-    Serial.println(buildDataPacket());
+    // -------- HISTORIAL (DUMP,<desde_seq>) --------
+    case CMD_DUMP:
+      if (!c.ok) {
+        out.println("ERR_DUMP");
+        return;
+      }
+      startDump(out, s, c.value);
+      return;
+
+    default:
+      return;   // línea vacía o comando desconocido
   }
 }
 
-// ===================== WIFI CLIENT =====================
-void handleWiFiClient() {
-  if (!wifiOK) return;
+void pushStream(Print &out, Session &s) {
+  if (!s.streaming) return;
 
+  unsigned long now = millis();
+  if ((long)(now - s.nextPush) < 0) return;
+
+  sendPacket(out, s);
+
+  // Plazos absolutos; si nos atrasamos mucho, se reanclan a "ahora"
+  s.nextPush += s.streamMs;
+  if ((long)(now - s.nextPush) > (long)s.streamMs) s.nextPush = now + s.streamMs;
+}
+
+// ===================== WIFI CLIENT =====================
+// Cada conexión nueva ocupa un lugar libre; sin lugar se rechaza
+void acceptWiFiClients() {
   WiFiClient client = server.available();
   if (!client) return;
 
-  while (client.connected()) {
-    if (client.available()) {
-      String cmd = client.readStringUntil('\n');
-      cmd.trim();
-
-      if (cmd == "DATA") {
-        client.println(buildDataPacket());
-      }
+  for (int i = 0; i < MAX_CLIENTS; i++) {
+    if (!clients[i] || !clients[i].connected()) {
+      clients[i].stop();
+      clients[i] = client;
+      clients[i].setNoDelay(true);   // sin Nagle: cada respuesta sale ya
+      resetSession(clientSessions[i]);
+      return;
     }
   }
+
+  client.println("ERR_BUSY");
   client.stop();
 }
 
+// ===================== MUESTREO EN SEGUNDO PLANO =====================
+void sampleSensors() {
+  unsigned long now = millis();
+
+  if ((long)(now - uvNext) >= 0) sampleUv(now);
+  if (ahtOK) sampleAht(now);
+
+  if (bmpOK && (long)(now - presNext) >= 0) {
+    pushAverage(presAvg, bmp.readPressure());
+    presNext = now + PRES_PERIOD_MS;
+  }
+}
+
+void sampleUv(unsigned long now) {
+  // Sobremuestreo: el promedio de varias conversiones baja el ruido del ADC
+  long sum = 0;
+  for (int i = 0; i < UV_OVERSAMPLE; i++) sum += analogRead(UV_PIN);
+
+  uvWindow[uvPos] = sum / UV_OVERSAMPLE;
+  uvPos = (uvPos + 1) % UV_MEDIAN;
+  if (uvCount < UV_MEDIAN) uvCount++;
+
+  // Plazos absolutos, como el streaming; si nos atrasamos mucho se reanclan
+  uvNext += uvPeriodMs;
+  if ((long)(now - uvNext) > (long)uvPeriodMs) uvNext = now + uvPeriodMs;
+}
+
+// El AHT20 tarda ~80 ms en convertir: se dispara la medición y se lee en
+// una vuelta posterior, en lugar de esperar como hace getEvent()
+void sampleAht(unsigned long now) {
+  if (ahtState == AHT_IDLE) {
+    if ((long)(now - ahtNext) < 0) return;
+    ahtNext = now + AHT_PERIOD_MS;
+    Wire.beginTransmission(AHT_ADDR);
+    Wire.write(0xAC);
+    Wire.write(0x33);
+    Wire.write(0x00);
+    if (Wire.endTransmission() == 0) {
+      ahtState = AHT_MEASURING;
+      ahtReadyAt = now + AHT_CONVERSION_MS;
+    }
+    return;
+  }
+
+  if ((long)(now - ahtReadyAt) < 0) return;
+
+  uint8_t d[6];
+  if (Wire.requestFrom(AHT_ADDR, 6) != 6) {
+    ahtState = AHT_IDLE;
+    return;
+  }
+  for (int i = 0; i < 6; i++) d[i] = Wire.read();
+
+  if (d[0] & 0x80) {            // todavía ocupado
+    ahtReadyAt = now + 10;
+    return;
+  }
+
+  uint32_t rawHum = ((uint32_t)d[1] << 12) | ((uint32_t)d[2] << 4) | (d[3] >> 4);
+  uint32_t rawTemp = ((uint32_t)(d[3] & 0x0F) << 16) | ((uint32_t)d[4] << 8) | d[5];
+  pushAverage(humAvg, rawHum * 100.0 / 1048576.0);
+  pushAverage(tempAvg, rawTemp * 200.0 / 1048576.0 - 50.0);
+  ahtState = AHT_IDLE;
+}
+
+void pushAverage(Average &a, float v) {
+  a.values[a.pos] = v;
+  a.pos = (a.pos + 1) % ENV_AVG;
+  if (a.count < ENV_AVG) a.count++;
+}
+
+float averageOf(const Average &a) {
+  float sum = 0;
+  for (int i = 0; i < a.count; i++) sum += a.values[i];
+  return sum / a.count;
+}
+
+int uvMedian() {
+  int sorted[UV_MEDIAN];
+  for (int i = 0; i < uvCount; i++) {
+    // Inserción: son pocas muestras
+    int v = uvWindow[i], j = i;
+    while (j > 0 && sorted[j - 1] > v) {
+      sorted[j] = sorted[j - 1];
+      j--;
+    }
+    sorted[j] = v;
+  }
+  return sorted[uvCount / 2];
+}
+
 // ===================== DATA PACKET =====================
-String buildDataPacket() {
-  int adc = analogRead(UV_PIN);
-  float volt = adc * (3.3 / 4095.0);
-  float mV = volt * 1000.0;
-
-  if (mV < 50) uvIndex = 0;
-  else if (mV < 227) uvIndex = 1;
-  else if (mV < 318) uvIndex = 2;
-  else if (mV < 408) uvIndex = 3;
-  else if (mV < 503) uvIndex = 4;
-  else if (mV < 606) uvIndex = 5;
-  else if (mV < 696) uvIndex = 6;
-  else if (mV < 795) uvIndex = 7;
-  else if (mV < 881) uvIndex = 8;
-  else if (mV < 976) uvIndex = 9;
-  else if (mV < 1079) uvIndex = 10;
-  else uvIndex = 11;
-
-  if (uvIndex <= 2) uvNivel = "Bajo";
-  else if (uvIndex <= 5) uvNivel = "Moderado";
-  else if (uvIndex <= 7) uvNivel = "Alto";
-  else if (uvIndex <= 10) uvNivel = "Muy Alto";
-  else uvNivel = "Extremo";
-
-  String temp = "NA", hum = "NA";
-  if (ahtOK) {
-    sensors_event_t h, t;
-    aht.getEvent(&h, &t);
-    temp = String(t.temperature, 1);
-    hum = String(h.relative_humidity, 1);
-  }
-
-  String pres = "NA";
-  if (bmpOK) {
-    pres = String(bmp.readPressure(), 0);
-  }
-
-  return String(uvIndex) + "," + uvNivel + "," + temp + "," + hum + "," + pres;
+// Foto de los valores filtrados: no toca los sensores, responde al instante
+SensorReading readSensors() {
+  SensorReading r;
+  r.tMs = millis();
+  r.valid = 0;
+  r.uvAdc = 0;
+
+  if (uvCount) {
+    r.uvAdc = uvMedian();
+    r.valid |= VALID_UV | VALID_UV_ADC;
+  }
+  float mV = r.uvAdc * (3300.0 / 4095.0);
+
+  r.uv = uvIndexFromMv(mV);
+
+  if (ahtOK && humAvg.count) {
+    r.temp = averageOf(tempAvg);
+    r.hum = averageOf(humAvg);
+    r.valid |= VALID_TEMP | VALID_HUM;
+  }
+
+  if (bmpOK && presAvg.count) {
+    r.pres = averageOf(presAvg);
+    r.valid |= VALID_PRES;
+  }
+
+  return r;
+}
+
+DataFrame buildDataFrame(const SensorReading &r, uint32_t seq) {
+  DataFrame f;
+
+  f.sync[0] = FRAME_SYNC0;
+  f.sync[1] = FRAME_SYNC1;
+  f.seq = seq;
+  f.tMs = r.tMs;
+  f.valid = r.valid;
+  f.uv = r.uv;
+  f.temp = (r.valid & VALID_TEMP) ? (int16_t)lroundf(r.temp * 10) : 0;
+  f.hum = (r.valid & VALID_HUM) ? (uint16_t)lroundf(r.hum * 10) : 0;
+  f.pres = (r.valid & VALID_PRES) ? (uint32_t)lroundf(r.pres) : 0;
+  f.uvAdc = (r.valid & VALID_UV_ADC) ? (uint16_t)r.uvAdc : 0;
+  f.crc = crc16((const uint8_t *)&f.seq, offsetof(DataFrame, crc) - offsetof(DataFrame, seq));
+
+  return f;
+}
+
+uint16_t crc16(const uint8_t *data, size_t len) {
+  uint16_t crc = 0xFFFF;
+  while (len--) {
+    crc ^= (uint16_t)(*data++) << 8;
+    for (int i = 0; i < 8; i++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// Envía una muestra por Serial o por un cliente WiFi en el formato acordado
+void sendPacket(Print &out, Session &s) {
+  if (s.binary) {
+    DataFrame f = buildDataFrame(readSensors(), ++s.frameSeq);
+    out.write((const uint8_t *)&f, sizeof(f));
+  } else {
+    // Con raw se agrega el ADC de UV y los sensores van con toda su resolución
+    char packet[PACKET_MAX];
+    if (formatDataPacket(packet, sizeof(packet), readSensors(), s.raw) > 0) out.println(packet);
+  }
+}
+
+// ===================== REGISTRO EN RAM =====================
+void logSample() {
+  unsigned long now = millis();
+  if ((long)(now - logNext) < 0) return;
+
+  logHead++;
+  logRing[(logHead - 1) % LOG_CAPACITY] = buildDataFrame(readSensors(), logHead);
+
+  logNext += LOG_PERIOD_MS;
+  if ((long)(now - logNext) > (long)LOG_PERIOD_MS) logNext = now + LOG_PERIOD_MS;
+}
+
+// seq del registro más antiguo que sigue en el anillo
+uint32_t logOldest() {
+  return logHead > LOG_CAPACITY ? logHead - LOG_CAPACITY + 1 : 1;
+}
+
+// Responde "OK_DUMP,<n>,<último_seq>,<su millis>,<periodo>,<millis actual>"
+// y después envía n tramas binarias con seq > since, por bloques
+void startDump(Print &out, Session &s, uint32_t since) {
+  uint32_t first = max(since + 1, logOldest());
+  if (since >= logHead) first = logHead + 1;   // también cubre since = 0xFFFFFFFF
+  uint32_t count = logHead + 1 - first;
+  uint32_t headMs = logHead ? logRing[(logHead - 1) % LOG_CAPACITY].tMs : 0;
+
+  char header[PACKET_MAX];
+  snprintf(header, sizeof(header), "OK_DUMP,%lu,%lu,%lu,%d,%lu", (unsigned long)count,
+           (unsigned long)logHead, (unsigned long)headMs, LOG_PERIOD_MS, (unsigned long)millis());
+  out.println(header);
+
+  s.dumpNext = first;
+  s.dumpLeft = count;
+}
+
+void pushDump(Print &out, Session &s) {
+  DataFrame chunk[DUMP_CHUNK];
+  size_t n = 0;
+  while (s.dumpLeft && n < DUMP_CHUNK) {
+    // Si el anillo alcanzó al envío se sigue por el más antiguo que quede
+    uint32_t seq = max(s.dumpNext, logOldest());
+    chunk[n++] = logRing[(seq - 1) % LOG_CAPACITY];
+    s.dumpNext = seq + 1;
+    s.dumpLeft--;
+  }
+  out.write((const uint8_t *)chunk, n * sizeof(DataFrame));
 }
 
 // ===================== EEPROM =====================
-void saveWiFi(String ssid, String pass) {
+void saveWiFi(const char *ssid, const char *pass) {
   EEPROM.write(ADDR_FLAG, 0xAA);
 
-  for (int i = 0; i < 32; i++) {
-    EEPROM.write(ADDR_SSID + i, i < ssid.length() ? ssid[i] : 0);
-    EEPROM.write(ADDR_PASS + i, i < pass.length() ? pass[i] : 0);
+  // Se rellena con ceros: el terminador queda en la EEPROM salvo con 32 caracteres
+  size_t ssidLen = strlen(ssid), passLen = strlen(pass);
+  for (size_t i = 0; i < WIFI_FIELD_MAX; i++) {
+    EEPROM.write(ADDR_SSID + i, i < ssidLen ? ssid[i] : 0);
+    EEPROM.write(ADDR_PASS + i, i < passLen ? pass[i] : 0);
   }
 
   EEPROM.commit();
 }
 
-bool loadWiFi(String &ssid, String &pass) {
+// ssid y pass deben tener lugar para WIFI_FIELD_MAX caracteres y el terminador
+bool loadWiFi(char *ssid, char *pass) {
   if (EEPROM.read(ADDR_FLAG) != 0xAA) return false;
 
-  ssid = "";
-  pass = "";
-
-  for (int i = 0; i < 32; i++) {
-    char c1 = EEPROM.read(ADDR_SSID + i);
-    char c2 = EEPROM.read(ADDR_PASS + i);
-    if (c1) ssid += c1;
-    if (c2) pass += c2;
+  for (int i = 0; i < WIFI_FIELD_MAX; i++) {
+    ssid[i] = EEPROM.read(ADDR_SSID + i);
+    pass[i] = EEPROM.read(ADDR_PASS + i);
   }
+  ssid[WIFI_FIELD_MAX] = '\0';
+  pass[WIFI_FIELD_MAX] = '\0';
 
-  return ssid.length() > 0;
+  return ssid[0] != '\0';
 }
 
 // ===================== WIFI AP =====================
-void startWiFiAP(String ssid, String pass) {
+// Apaga el AP (y suelta los clientes); wifiStep() lo levanta de nuevo
+// con wifiSsid/wifiPass pasados delayMs
+void restartWiFi(unsigned long delayMs, bool reply) {
+  for (int i = 0; i < MAX_CLIENTS; i++) clients[i].stop();
+  WiFi.softAPdisconnect(true);
+  WiFi.disconnect(true);
+  WiFi.mode(WIFI_OFF);
+  wifiOK = false;
+
+  wifiState = WIFI_RESTARTING;
+  wifiRestartAt = millis() + delayMs;
+  wifiReplyPending = reply;
+}
+
+void wifiStep() {
+  if (wifiState != WIFI_RESTARTING) return;
+  if ((long)(millis() - wifiRestartAt) < 0) return;
+
+  wifiState = WIFI_IDLE;
+  startWiFiAP(wifiSsid, wifiPass);
+  if (wifiReplyPending && wifiOK) Serial.println("OK_WIFI");
+  wifiReplyPending = false;
+}
+
+void startWiFiAP(const char *ssid, const char *pass) {
   WiFi.mode(WIFI_AP);
-  bool ok = WiFi.softAP(ssid.c_str(), pass.c_str());
+  bool ok = WiFi.softAP(ssid, pass);
 
   if (!ok) {
     wifiOK = false;
@@ -213,6 +631,7 @@ void startWiFiAP(String ssid, String pass) {
   }
 
   server.begin();
+  server.setNoDelay(true);
   wifiOK = true;
 
   Serial.print("📡 WiFi AP activo: ");
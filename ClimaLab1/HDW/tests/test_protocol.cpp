@@ -0,0 +1,209 @@
+// Pruebas del protocolo de la estación (protocol.h), compiladas en la PC:
+//
+//     make -C ClimaLab1/HDW/tests
+//
+// Los paquetes esperados son los que interpreta climalab/protocol.py.
+#include <stdio.h>
+#include <string.h>
+
+#include "protocol.h"
+
+static int failures = 0;
+
+#define CHECK(cond)                                                   \
+  do {                                                                \
+    if (!(cond)) {                                                    \
+      printf("%s:%d: falló %s\n", __FILE__, __LINE__, #cond);         \
+      failures++;                                                     \
+    }                                                                 \
+  } while (0)
+
+#define CHECK_STR(actual, expected)                                   \
+  do {                                                                \
+    if (strcmp((actual), (expected)) != 0) {                          \
+      printf("%s:%d: \"%s\" != \"%s\"\n", __FILE__, __LINE__,         \
+             (actual), (expected));                                   \
+      failures++;                                                     \
+    }                                                                 \
+  } while (0)
+
+// Interpreta una copia del texto (parseCommand modifica la línea)
+static Command parse(const char *text, char *buf) {
+  strcpy(buf, text);
+  return parseCommand(buf);
+}
+
+// ===================== LÍNEAS =====================
+static LineStatus feed(LineReader &r, const char *text) {
+  LineStatus status = LINE_PENDING;
+  for (; *text; text++) status = pushLineChar(r, *text);
+  return status;
+}
+
+static void testLines() {
+  LineReader r;
+  resetLine(r);
+
+  CHECK(feed(r, "DA") == LINE_PENDING);
+  CHECK(feed(r, "TA\r\n") == LINE_READY);
+  CHECK_STR(r.line, "DATA");
+
+  // Una línea demasiado larga se descarta entera y la siguiente se lee bien
+  char longLine[CMD_MAX + 10];
+  memset(longLine, 'X', sizeof(longLine) - 1);
+  longLine[sizeof(longLine) - 1] = '\0';
+  CHECK(feed(r, longLine) == LINE_PENDING);
+  CHECK(feed(r, "\n") == LINE_OVERFLOW);
+  CHECK(feed(r, "STOP\n") == LINE_READY);
+  CHECK_STR(r.line, "STOP");
+
+  // Justo en el límite todavía entra
+  char fits[CMD_MAX];
+  memset(fits, 'Y', CMD_MAX - 1);
+  fits[CMD_MAX - 1] = '\0';
+  feed(r, fits);
+  CHECK(feed(r, "\n") == LINE_READY);
+  CHECK(strlen(r.line) == CMD_MAX - 1);
+}
+
+// ===================== COMANDOS =====================
+static void testCommands() {
+  char buf[CMD_MAX];
+  Command c;
+
+  CHECK(parse("DATA", buf).kind == CMD_DATA);
+  CHECK(parse("  DATA \t", buf).kind == CMD_DATA);
+  CHECK(parse("", buf).kind == CMD_NONE);
+  CHECK(parse("   ", buf).kind == CMD_NONE);
+  CHECK(parse("HOLA", buf).kind == CMD_UNKNOWN);
+  CHECK(parse("DATA,1", buf).kind == CMD_UNKNOWN);
+  CHECK(parse("STOP", buf).kind == CMD_STOP);
+
+  c = parse("FORMAT,BIN", buf);
+  CHECK(c.kind == CMD_FORMAT && c.flag);
+  c = parse("FORMAT,TXT", buf);
+  CHECK(c.kind == CMD_FORMAT && !c.flag);
+  CHECK(parse("FORMAT,XML", buf).kind == CMD_UNKNOWN);
+
+  c = parse("RAW,ON", buf);
+  CHECK(c.kind == CMD_RAW && c.flag);
+  c = parse("RAW,OFF", buf);
+  CHECK(c.kind == CMD_RAW && !c.flag);
+
+  c = parse("STREAM,50", buf);
+  CHECK(c.kind == CMD_STREAM && c.ok && c.value == 50);
+  CHECK(!parse("STREAM,10", buf).ok);      // menos que STREAM_MIN_MS
+  CHECK(!parse("STREAM", buf).ok);
+  CHECK(!parse("STREAM,", buf).ok);
+  CHECK(!parse("STREAM,5x", buf).ok);
+  CHECK(!parse("STREAM,-50", buf).ok);
+
+  c = parse("SAMPLE,5", buf);
+  CHECK(c.kind == CMD_SAMPLE && c.ok && c.value == 5);
+  CHECK(!parse("SAMPLE,4", buf).ok);
+  CHECK(!parse("SAMPLE,10001", buf).ok);
+
+  c = parse("DUMP,0", buf);
+  CHECK(c.kind == CMD_DUMP && c.ok && c.value == 0);
+  c = parse("DUMP,4294967295", buf);
+  CHECK(c.ok && c.value == 0xFFFFFFFFu);
+  CHECK(!parse("DUMP", buf).ok);
+  CHECK(!parse("DUMP,abc", buf).ok);
+}
+
+static void testSetWifi() {
+  char buf[CMD_MAX];
+  Command c;
+
+  c = parse("SET_WIFI,ClimaLab,clave123", buf);
+  CHECK(c.kind == CMD_SET_WIFI && c.ok);
+  CHECK_STR(c.ssid, "ClimaLab");
+  CHECK_STR(c.pass, "clave123");
+
+  // La clave puede llevar comas; una clave vacía deja el AP abierto
+  c = parse("SET_WIFI,Red,a,b,c", buf);
+  CHECK(c.ok);
+  CHECK_STR(c.pass, "a,b,c");
+  c = parse("SET_WIFI,Red,", buf);
+  CHECK(c.ok);
+  CHECK_STR(c.pass, "");
+
+  CHECK(!parse("SET_WIFI", buf).ok);
+  CHECK(!parse("SET_WIFI,Red", buf).ok);
+  CHECK(!parse("SET_WIFI,,clave", buf).ok);
+  // Más de lo que cabe en la EEPROM
+  CHECK(!parse("SET_WIFI,123456789012345678901234567890123,clave", buf).ok);
+}
+
+// ===================== PAQUETES =====================
+static SensorReading reading() {
+  SensorReading r;
+  r.tMs = 123456;
+  r.valid = VALID_UV | VALID_UV_ADC | VALID_TEMP | VALID_HUM | VALID_PRES;
+  r.uv = 3;
+  r.uvAdc = 512;
+  r.temp = 24.56f;
+  r.hum = 55.04f;
+  r.pres = 101325.4f;
+  return r;
+}
+
+static void testPackets() {
+  char buf[PACKET_MAX];
+  SensorReading r = reading();
+
+  CHECK(formatDataPacket(buf, sizeof(buf), r, false) > 0);
+  CHECK_STR(buf, "3,Moderado,24.6,55.0,101325,123456");
+
+  CHECK(formatDataPacket(buf, sizeof(buf), r, true) > 0);
+  CHECK_STR(buf, "3,Moderado,24.56,55.04,101325.4,123456,512");
+
+  r.valid = VALID_UV;
+  r.uv = 0;
+  CHECK(formatDataPacket(buf, sizeof(buf), r, false) > 0);
+  CHECK_STR(buf, "0,Bajo,NA,NA,NA,123456");
+
+  // El caso más largo entra en PACKET_MAX
+  r = reading();
+  r.uv = 11;
+  r.uvAdc = 4095;
+  r.temp = -40.0f;
+  r.pres = 110000.0f;
+  r.tMs = 0xFFFFFFFFu;
+  CHECK(formatDataPacket(buf, sizeof(buf), r, true) > 0);
+  CHECK_STR(buf, "11,Extremo,-40.00,55.04,110000.0,4294967295,4095");
+
+  // Sin lugar no se corta a medias: se informa
+  char small[16];
+  CHECK(formatDataPacket(small, sizeof(small), reading(), false) == -1);
+}
+
+static void testUv() {
+  CHECK(uvIndexFromMv(0) == 0);
+  CHECK(uvIndexFromMv(49.9f) == 0);
+  CHECK(uvIndexFromMv(50) == 1);
+  CHECK(uvIndexFromMv(1078) == 10);
+  CHECK(uvIndexFromMv(1079) == 11);
+  CHECK(uvIndexFromMv(3300) == 11);
+
+  CHECK_STR(uvLevelWord(2), "Bajo");
+  CHECK_STR(uvLevelWord(5), "Moderado");
+  CHECK_STR(uvLevelWord(7), "Alto");
+  CHECK_STR(uvLevelWord(10), "Muy Alto");
+  CHECK_STR(uvLevelWord(11), "Extremo");
+}
+
+int main() {
+  testLines();
+  testCommands();
+  testSetWifi();
+  testPackets();
+  testUv();
+
+  if (failures) {
+    printf("%d pruebas fallaron\n", failures);
+    return 1;
+  }
+  printf("OK\n");
+  return 0;
+}
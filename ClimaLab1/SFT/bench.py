@@ -0,0 +1,359 @@
+"""Banco de pruebas de rendimiento de la adquisición, el gráfico y la exportación.
+
+Usa la estación simulada (``climalab.simulator``) en lugar de una placa,
+así que se puede correr en cualquier máquina::
+
+    python bench.py                         # todo, tamaños normales
+    python bench.py --quick                 # tamaños chicos (~1 min)
+    python bench.py --only latency --latency 30 --loss 0.02
+    python bench.py --json base.json        # guardar resultados
+    python bench.py --compare base.json     # fallar si algo empeoró
+
+Mide:
+- muestras/s al interpretar paquetes de texto y binarios, y al procesarlos
+  (store + estadísticas + alertas, lo que hace la app con cada bloque);
+- latencia de punta a punta (toma en la estación -> entrega al consumidor)
+  por TCP contra el simulador, con percentiles;
+- tiempo de redibujo del gráfico por actualización y por muestra;
+- filas/s al exportar a Excel y al guardar/leer el archivo columnar;
+- memoria retenida según la duración de la sesión.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+from climalab.archive import Archive
+from climalab.config import DEFAULTS
+from climalab.engine import AcquisitionEngine, StationConfig
+from climalab.export import export_xlsx
+from climalab.lod import LevelOfDetail
+from climalab.protocol import SampleParser
+from climalab.simulator import FakeStation, sample_blocks, serve_tcp
+from climalab.stats import AlertEngine, StationStats, load_rules
+from climalab.store import SampleStore
+
+
+BENCHMARKS = ("parse", "latency", "redraw", "export", "memory")
+
+
+class Results:
+    """Métricas de una corrida: nombre -> (valor, unidad, mejor "alto"/"bajo")"""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, better):
+        self.metrics[name] = (float(value), unit, better)
+        print(f"  {name:<40} {value:>12.4g} {unit}")
+
+    def to_dict(self):
+        return {name: {"value": v, "unit": u, "better": b} for name, (v, u, b) in self.metrics.items()}
+
+    def compare(self, baseline, tolerance):
+        """Métricas que empeoraron más de ``tolerance`` (fracción) respecto a la base"""
+        worse = []
+        for name, (value, unit, better) in self.metrics.items():
+            base = baseline.get(name)
+            if not base or not base["value"]:
+                continue
+            change = (value - base["value"]) / abs(base["value"])
+            if (better == "alto" and change < -tolerance) or (better == "bajo" and change > tolerance):
+                worse.append((name, base["value"], value, unit, change))
+        return worse
+
+
+def timed(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - t0, result
+
+
+def best_of(repeat, func, *args):
+    """Menor tiempo de ``repeat`` corridas (para operaciones cortas y ruidosas)"""
+    return min(timed(func, *args)[0] for _ in range(repeat))
+
+
+# ===================== DATOS SIMULADOS =====================
+def packets(n, binary, na_prob=0.02):
+    """``n`` paquetes como los enviaría la placa (bytes), con valores variables"""
+    station = FakeStation(na_prob=na_prob, noise=1.0, seed=1)
+    station.session.binary = binary
+    return [station._packet(station.session) for _ in range(n)]
+
+
+def filled_store(n, spill_path=None):
+    store = SampleStore(spill_path=spill_path)
+    for samples in sample_blocks(n, block=4096):
+        store.append(samples)
+    return store
+
+
+# ===================== INTERPRETACIÓN Y PROCESO =====================
+def bench_parse(results, n):
+    """Paquetes -> muestras, y muestras -> store + estadísticas + alertas"""
+    print(f"Interpretación ({n} paquetes)")
+    for binary in (False, True):
+        data = packets(n, binary)
+        # Lecturas de ~10 paquetes, como llegan por TCP a 50 Hz
+        reads = [b"".join(data[i:i + 10]) for i in range(0, n, 10)]
+
+        def parse():
+            parser = SampleParser()
+            if binary:
+                parser.set_binary()
+            return sum(len(parser.feed(chunk)) for chunk in reads)
+
+        count = parse()
+        if count != n:
+            print(f"  ¡Se esperaban {n} muestras y se obtuvieron {count}!")
+        results.add(f"parse.{'bin' if binary else 'txt'}", n / best_of(3, parse), "muestras/s", "alto")
+
+    rules = load_rules(DEFAULTS["alerts"])
+    blocks = list(sample_blocks(n, block=5))   # 0,1 s a 50 Hz por bloque
+
+    def process():
+        store = SampleStore()
+        stats = StationStats()
+        alerts = AlertEngine(rules)
+        for samples in blocks:
+            rows = store.append(samples, time.time())
+            stats.update(rows)
+            alerts.evaluate("bench", stats)
+
+    results.add("process.samples_per_s", n / best_of(3, process), "muestras/s", "alto")
+
+
+# ===================== LATENCIA DE PUNTA A PUNTA =====================
+class SimulatorThread:
+    """Simulador TCP en su propio hilo y bucle, para no competir con el motor"""
+
+    def __init__(self, station, **link_options):
+        self.station = station
+        self.link_options = link_options
+        self.ready = threading.Event()
+        self.loop = None
+        self.stop = None
+        self.port = None
+        self.thread = threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True)
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stop = asyncio.Event()
+        server = await serve_tcp(self.station, "127.0.0.1", 0, **self.link_options)
+        self.port = server.sockets[0].getsockname()[1]
+        self.ready.set()
+        await self.stop.wait()
+        server.close()
+        # Dejar que las conexiones terminen de cerrarse antes de salir del bucle
+        others = asyncio.all_tasks() - {asyncio.current_task()}
+        if others:
+            await asyncio.wait(others, timeout=1.0)
+
+    def __enter__(self):
+        self.thread.start()
+        self.ready.wait(5)
+        return self
+
+    def __exit__(self, *exc):
+        self.loop.call_soon_threadsafe(self.stop.set)
+        self.thread.join(5)
+
+
+def bench_latency(results, seconds, stream_hz, latency, jitter, loss, na_prob):
+    """Corre el motor real contra el simulador y mide cuánto tarda cada muestra
+    desde que la estación la toma hasta que llega a ``on_samples``"""
+    print(f"Latencia ({seconds:.0f} s por modo, retardo {latency * 1000:.0f} ms, pérdida {loss:.0%})")
+    modes = (
+        ("stream_txt", dict(stream_ms=int(1000 / stream_hz))),
+        ("stream_bin", dict(stream_ms=int(1000 / stream_hz), binary=True)),
+        ("poll", dict(interval=1.0 / stream_hz)),
+    )
+    for label, options in modes:
+        station = FakeStation(na_prob=na_prob, noise=1.0, seed=2)
+        delays = []
+        arrivals = []   # (hora, muestras) de cada entrega
+
+        def on_samples(name, samples):
+            now = time.monotonic()
+            t_ms = samples["t_ms"][samples["t_ms"] >= 0]
+            delays.append(now - (station.t0 + t_ms / 1000.0))
+            arrivals.append((now, len(samples)))
+
+        async def run(port):
+            engine = AcquisitionEngine(on_samples)
+            started = time.monotonic()
+            await engine.start_station(StationConfig("sim", "tcp", "127.0.0.1", port, **options))
+            await asyncio.sleep(seconds)
+            await engine.stop_stations()
+            return started
+
+        with SimulatorThread(station, latency=latency, jitter=jitter, loss=loss, seed=3) as sim:
+            started = asyncio.run(run(sim.port))
+
+        if len(arrivals) < 2:
+            print(f"  {label}: no llegaron muestras")
+            continue
+        # El ritmo se mide desde la primera entrega; la conexión se informa aparte
+        first, last = arrivals[0][0], arrivals[-1][0]
+        count = sum(n for _, n in arrivals[1:])
+        results.add(f"latency.{label}.first_sample", (first - started) * 1000, "ms", "bajo")
+        results.add(f"latency.{label}.rate", count / (last - first), "muestras/s", "alto")
+        d = np.concatenate(delays) * 1000
+        for q in (50, 95, 99):
+            results.add(f"latency.{label}.p{q}", np.percentile(d, q), "ms", "bajo")
+        results.add(f"latency.{label}.max", d.max(), "ms", "bajo")
+
+
+# ===================== GRÁFICO =====================
+def bench_redraw(results, sizes, updates, block):
+    """``LiveChart.update`` sobre un lienzo Agg con sesiones de distinto largo"""
+    try:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        from main_gui import LiveChart
+    except ImportError as e:
+        print(f"Gráfico omitido (falta {e.name})")
+        return
+
+    print(f"Redibujo ({updates} actualizaciones de {block} muestras)")
+    for n in sizes:
+        for view in ("Temperatura", "Todas las Variables"):
+            figure = Figure(figsize=(7, 3.5), dpi=90)
+            chart = LiveChart(figure, FigureCanvasAgg(figure))
+            blocks = sample_blocks(n + updates * block, block=block)
+            store = SampleStore()
+            for _ in range(n // block):
+                store.append(next(blocks))
+            chart.set_view(view, {"sim": store}, "sim")
+            chart.canvas.draw()
+
+            times = []
+            for samples in blocks:
+                store.append(samples)
+                t0 = time.perf_counter()
+                chart.update()
+                times.append(time.perf_counter() - t0)
+            times = np.array(times) * 1000
+            key = f"redraw.{n}.{'all' if len(chart.traces) > 1 else 'one'}"
+            results.add(f"{key}.median", np.median(times), "ms/actualización", "bajo")
+            results.add(f"{key}.p95", np.percentile(times, 95), "ms/actualización", "bajo")
+            results.add(f"{key}.per_sample", np.median(times) * 1000 / block, "µs/muestra", "bajo")
+
+
+# ===================== EXPORTACIÓN =====================
+def bench_export(results, n, folder):
+    print(f"Exportación ({n} filas)")
+    store = filled_store(n)
+
+    path = os.path.join(folder, "bench.xlsx")
+    elapsed, rows = timed(export_xlsx, path, {"sim": store})
+    results.add("export.xlsx", rows / elapsed, "filas/s", "alto")
+    results.add("export.xlsx.size", os.path.getsize(path) / n, "B/fila", "bajo")
+
+    chunks = list(store.iter_chunks(8192))
+    runs = iter(range(3))
+
+    def append():
+        archive = Archive(os.path.join(folder, f"archivo_{next(runs)}"))
+        for chunk in chunks:
+            archive.append("sim", chunk)
+
+    results.add("archive.append", n / best_of(3, append), "filas/s", "alto")
+    archive = Archive(os.path.join(folder, "archivo_0"))
+    elapsed = best_of(3, lambda: sum(len(c["time"]) for c in archive.iter_query("sim")))
+    results.add("archive.query", n / elapsed, "filas/s", "alto")
+
+
+# ===================== MEMORIA =====================
+def bench_memory(results, lengths, folder):
+    """Memoria retenida por store + estadísticas + nivel de detalle tras ``n`` muestras.
+
+    Debería dejar de crecer al llenarse el store (lo viejo pasa a disco).
+    Con tracemalloc activo todo va más lento, así que aquí no se mide tiempo.
+    """
+    print("Memoria según la duración de la sesión")
+    for n in lengths:
+        tracemalloc.start()
+        store = SampleStore(spill_path=os.path.join(folder, f"spill_{n}.bin"))
+        stats = StationStats()
+        lod = LevelOfDetail(store, ("uv", "temp", "hum", "pres"))
+        for samples in sample_blocks(n, block=500):
+            stats.update(store.append(samples))
+            lod.update()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        hours = n * 0.02 / 3600
+        results.add(f"memory.{n}.retained", current / 2**20, f"MB ({hours:.2g} h a 50 Hz)", "bajo")
+        results.add(f"memory.{n}.peak", peak / 2**20, "MB", "bajo")
+        del store, stats, lod
+
+
+# ===================== PRINCIPAL =====================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Mide el rendimiento de la adquisición con una estación simulada.")
+    parser.add_argument("--only", action="append", choices=BENCHMARKS,
+                        help="correr solo estas pruebas (se puede repetir)")
+    parser.add_argument("--quick", action="store_true", help="tamaños reducidos")
+    parser.add_argument("--seconds", type=float, default=10, help="duración de cada modo de latencia")
+    parser.add_argument("--hz", type=float, default=50, help="frecuencia de muestreo simulada")
+    parser.add_argument("--latency", type=float, default=5, metavar="MS", help="retardo del enlace simulado")
+    parser.add_argument("--jitter", type=float, default=2, metavar="MS", help="variación del retardo (±)")
+    parser.add_argument("--loss", type=float, default=0.0, metavar="P", help="probabilidad de perder una respuesta")
+    parser.add_argument("--na", type=float, default=0.02, metavar="P", help="probabilidad de campo NA")
+    parser.add_argument("--json", metavar="RUTA", help="guardar los resultados en JSON")
+    parser.add_argument("--compare", metavar="RUTA", help="comparar con resultados guardados")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="empeoramiento admitido al comparar (fracción, por defecto 0,3)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    selected = args.only or BENCHMARKS
+    quick = args.quick
+    results = Results()
+
+    with tempfile.TemporaryDirectory(prefix="climalab_bench_") as folder:
+        if "parse" in selected:
+            bench_parse(results, 20000 if quick else 200000)
+        if "latency" in selected:
+            bench_latency(results, min(args.seconds, 3) if quick else args.seconds, args.hz,
+                          args.latency / 1000, args.jitter / 1000, args.loss, args.na)
+        if "redraw" in selected:
+            bench_redraw(results, (1000, 100000) if quick else (1000, 100000, 500000),
+                         updates=50 if quick else 200, block=5)
+        if "export" in selected:
+            bench_export(results, 20000 if quick else 200000, folder)
+        if "memory" in selected:
+            bench_memory(results, (10000, 100000) if quick else (10000, 100000, 1000000), folder)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results.to_dict(), f, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en {args.json}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        worse = results.compare(baseline, args.tolerance)
+        for name, before, after, unit, change in worse:
+            print(f"EMPEORÓ {name}: {before:.4g} -> {after:.4g} {unit} ({change:+.0%})")
+        if worse:
+            return 1
+        print(f"Sin regresiones respecto a {args.compare} (tolerancia {args.tolerance:.0%})")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
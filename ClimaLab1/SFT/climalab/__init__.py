@@ -0,0 +1 @@
+"""Núcleo de adquisición de la estación ClimaLab (sin dependencias de Qt)."""
@@ -0,0 +1,8 @@
+"""Permite ``python -m climalab`` para registrar sin interfaz gráfica."""
+
+import sys
+
+from .cli import main
+
+
+sys.exit(main())
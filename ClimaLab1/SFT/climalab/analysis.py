@@ -0,0 +1,361 @@
+"""Análisis vectorizado de sesiones grabadas (archivo columnar o ``SampleStore``).
+
+Todo opera sobre columnas NumPy completas y las fuentes se recorren por
+bloques (``iter_chunks``): la memoria depende del número de intervalos
+del resultado, no de cuántas muestras haya, así que meses de datos de
+``Archive.view`` se procesan sin cargarlos enteros.
+
+- ``aggregate``: media/mín/máx por intervalo fijo, por hora o por día local.
+- ``summarize``: lo anterior más punto de rocío, índice de calor,
+  tendencia de presión y dosis UV por intervalo.
+- ``resample`` / ``fill_gaps``: serie a intervalos regulares con los
+  huecos cortos interpolados.
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+from .export import ExportCancelled
+from .store import VARIABLES
+
+
+# 1 de índice UV = 25 mW/m² de irradiancia eritémica; 1 SED = 100 J/m²
+UV_IRRADIANCE_PER_INDEX = 0.025
+SED = 100.0
+MAX_DOSE_GAP_S = 600      # entre muestras más separadas no se integra la dosis (corte)
+
+HOUR = 3600
+DAY = 86400
+PERIODS = {"hour": HOUR, "day": DAY}
+
+# Variables que agrega ``summarize`` (las derivadas se calculan por muestra)
+DERIVED = ("dew_point", "heat_index")
+
+
+# ===================== MAGNITUDES DERIVADAS =====================
+def dew_point(temp, hum):
+    """Punto de rocío (°C) con la fórmula de Magnus; NaN si falta algún dato"""
+    temp = np.asarray(temp, dtype=np.float64)
+    hum = np.asarray(hum, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gamma = np.log(np.where(hum > 0, hum, np.nan) / 100.0) + 17.62 * temp / (243.12 + temp)
+        return 243.12 * gamma / (17.62 - gamma)
+
+
+def heat_index(temp, hum):
+    """Índice de calor (°C) según la regresión de Rothfusz (NOAA).
+
+    Por debajo de ~27 °C la fórmula simple de Steadman ya basta y se usa
+    esa; con los ajustes de NOAA para humedad muy baja o muy alta.
+    """
+    t = np.asarray(temp, dtype=np.float64) * 9 / 5 + 32
+    rh = np.asarray(hum, dtype=np.float64)
+
+    simple = 0.5 * (t + 61.0 + (t - 68.0) * 1.2 + rh * 0.094)
+    full = (-42.379 + 2.04901523 * t + 10.14333127 * rh - 0.22475541 * t * rh
+            - 6.83783e-3 * t * t - 5.481717e-2 * rh * rh + 1.22874e-3 * t * t * rh
+            + 8.5282e-4 * t * rh * rh - 1.99e-6 * t * t * rh * rh)
+    with np.errstate(invalid="ignore"):
+        dry = (rh < 13) & (t >= 80) & (t <= 112)
+        full = np.where(dry, full - (13 - rh) / 4 * np.sqrt(np.abs(17 - np.abs(t - 95)) / 17), full)
+        humid = (rh > 85) & (t >= 80) & (t <= 87)
+        full = np.where(humid, full + (rh - 85) / 10 * (87 - t) / 5, full)
+        hi = np.where((simple + t) / 2 >= 80, full, simple)
+    return (hi - 32) * 5 / 9
+
+
+def pressure_tendency(pres, step, window=3 * HOUR):
+    """Cambio de presión por hora en las últimas ``window`` s de una serie regular.
+
+    ``pres`` debe venir de ``resample`` (paso ``step`` s); donde falta el
+    valor de hace ``window`` el resultado es NaN.
+    """
+    pres = np.asarray(pres, dtype=np.float64)
+    lag = max(int(round(window / step)), 1)
+    trend = np.full(len(pres), np.nan)
+    if len(pres) > lag:
+        trend[lag:] = (pres[lag:] - pres[:-lag]) / (lag * step) * HOUR
+    return trend
+
+
+def uv_dose(times, uv, max_gap=MAX_DOSE_GAP_S):
+    """Dosis eritémica (J/m²) de cada intervalo entre muestras consecutivas.
+
+    Regla del trapecio sobre ``uv × 0,025 W/m²``; los intervalos más largos
+    que ``max_gap`` (cortes) o con UV faltante no suman.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    uv = np.asarray(uv, dtype=np.float64)
+    dt = np.diff(times)
+    area = (uv[1:] + uv[:-1]) * 0.5 * dt * UV_IRRADIANCE_PER_INDEX
+    ok = (dt > 0) & (dt <= max_gap) & ~np.isnan(area)
+    return np.where(ok, area, 0.0)
+
+
+# ===================== INTERVALOS =====================
+def local_offsets(times):
+    """Desfase local respecto a UTC (s) de cada instante, con cambios de horario.
+
+    Se calcula una vez por hora distinta, no por muestra.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    if not len(times):
+        return np.zeros(0)
+
+    def offset(ts):
+        return datetime.fromtimestamp(ts).astimezone().utcoffset().total_seconds()
+
+    lo, hi = float(np.nanmin(times)), float(np.nanmax(times))
+    if offset(lo) == offset(hi) and hi - lo < DAY:
+        return np.full(len(times), offset(lo))
+    hours, inverse = np.unique(np.floor(times / HOUR).astype(np.int64), return_inverse=True)
+    return np.array([offset(h * HOUR) for h in hours.tolist()])[inverse]
+
+
+def bin_index(times, period):
+    """Número de intervalo de cada instante.
+
+    ``period`` en segundos alinea con la época (UTC); "hour" y "day" usan
+    la hora local, así un día va de medianoche a medianoche.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    if period in PERIODS:
+        return np.floor((times + local_offsets(times)) / PERIODS[period]).astype(np.int64)
+    return np.floor(times / float(period)).astype(np.int64)
+
+
+def bin_start(index, period):
+    """Inicio (epoch s) de cada intervalo"""
+    index = np.asarray(index, dtype=np.int64)
+    if period not in PERIODS:
+        return index * float(period)
+    local = index * float(PERIODS[period])
+    # Primero con el desfase aproximado y luego con el del propio inicio
+    return local - local_offsets(local - local_offsets(local))
+
+
+class BinAccumulator:
+    """Sumas, mínimos y máximos por intervalo que se acumulan bloque a bloque.
+
+    El orden de los bloques no importa; los arreglos crecen a medida que
+    aparecen intervalos nuevos.
+    """
+
+    def __init__(self):
+        self.first = None
+        self.sums = {}
+        self.mins = {}
+        self.maxs = {}
+        self.size = 0
+
+    def _grow(self, lo, hi):
+        if self.first is None:
+            self.first = lo
+        before = max(self.first - lo, 0)
+        after = max(hi - (self.first + self.size) + 1, 0)
+        if not (before or after):
+            return
+        for table, fill in ((self.sums, 0.0), (self.mins, np.inf), (self.maxs, -np.inf)):
+            for name, arr in table.items():
+                table[name] = np.pad(arr, (before, after), constant_values=fill)
+        self.first -= before
+        self.size += before + after
+
+    def _table(self, table, name, fill):
+        if name not in table:
+            table[name] = np.full(self.size, fill)
+        return table[name]
+
+    def add(self, index, sums=None, extremes=None):
+        """``sums``: nombre -> pesos a sumar; ``extremes``: nombre -> valores (NaN se ignora)"""
+        if not len(index):
+            return
+        self._grow(int(index.min()), int(index.max()))
+        rel = index - self.first
+
+        for name, weights in (sums or {}).items():
+            self._table(self.sums, name, 0.0)[:] += np.bincount(rel, weights, minlength=self.size)
+
+        if extremes:
+            order = np.argsort(rel, kind="stable")
+            rel_sorted = rel[order]
+            starts = np.flatnonzero(np.diff(rel_sorted, prepend=-1))
+            bins = rel_sorted[starts]
+            for name, values in extremes.items():
+                v = np.asarray(values, dtype=np.float64)[order]
+                lo = np.minimum.reduceat(np.where(np.isnan(v), np.inf, v), starts)
+                hi = np.maximum.reduceat(np.where(np.isnan(v), -np.inf, v), starts)
+                mins = self._table(self.mins, name, np.inf)
+                maxs = self._table(self.maxs, name, -np.inf)
+                mins[bins] = np.minimum(mins[bins], lo)
+                maxs[bins] = np.maximum(maxs[bins], hi)
+
+    def index(self):
+        return np.arange(self.size, dtype=np.int64) + (self.first or 0)
+
+    def total(self, name):
+        return self.sums.get(name, np.zeros(self.size))
+
+    def mean(self, name, count):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.total(name) / self.total(count)
+
+    def extreme(self, table, name):
+        values = table.get(name, np.full(self.size, np.nan))
+        return np.where(np.isfinite(values), values, np.nan)
+
+
+def _accumulate(acc, chunk, period, variables):
+    """Suma y extremos de cada variable del bloque en sus intervalos"""
+    index = bin_index(chunk["time"], period)
+    sums = {"samples": np.ones(len(index))}
+    extremes = {}
+    for name in variables:
+        values = np.asarray(chunk[name], dtype=np.float64)
+        valid = ~np.isnan(values)
+        sums[f"{name}_count"] = valid.astype(np.float64)
+        sums[name] = np.where(valid, values, 0.0)
+        extremes[name] = values
+    acc.add(index, sums, extremes)
+    return index
+
+
+def _columns(acc, period, variables):
+    count = acc.total("samples")
+    keep = count > 0
+    result = {"start": bin_start(acc.index(), period)[keep], "samples": count[keep].astype(np.int64)}
+    for name in variables:
+        result[f"{name}_mean"] = acc.mean(name, f"{name}_count")[keep]
+        result[f"{name}_min"] = acc.extreme(acc.mins, name)[keep]
+        result[f"{name}_max"] = acc.extreme(acc.maxs, name)[keep]
+        result[f"{name}_count"] = acc.total(f"{name}_count")[keep].astype(np.int64)
+    return result, keep
+
+
+def _chunks(source, chunk_size, progress=None, cancelled=None):
+    """Bloques de una fuente con ``iter_chunks`` (store, vista del archivo) o un dict de columnas.
+
+    Igual que en la exportación: ``progress(hechas, total)`` por bloque y
+    ``ExportCancelled`` si ``cancelled()`` lo pide entre bloques.
+    """
+    if not hasattr(source, "iter_chunks"):
+        yield source
+        return
+    total = source.session_length() if progress else 0
+    done = 0
+    for chunk in source.iter_chunks(chunk_size):
+        if cancelled and cancelled():
+            raise ExportCancelled()
+        yield chunk
+        done += len(chunk["time"])
+        if progress:
+            progress(done, total)
+
+
+# ===================== AGREGACIÓN =====================
+def aggregate(source, period="hour", variables=VARIABLES, chunk_size=1 << 18, progress=None, cancelled=None):
+    """Media, mínimo, máximo y cantidad de cada variable por intervalo.
+
+    Devuelve columnas ``start``, ``samples`` y ``<var>_mean/_min/_max/_count``
+    (solo intervalos con datos, en orden). ``period``: "hour", "day" o segundos.
+    ``progress`` y ``cancelled`` funcionan como en ``export_xlsx``.
+    """
+    acc = BinAccumulator()
+    for chunk in _chunks(source, chunk_size, progress, cancelled):
+        _accumulate(acc, chunk, period, variables)
+    return _columns(acc, period, variables)[0]
+
+
+def summarize(source, period="day", chunk_size=1 << 18, max_gap=MAX_DOSE_GAP_S, progress=None, cancelled=None):
+    """``aggregate`` de todas las variables y además, por intervalo:
+
+    - ``dew_point_*`` y ``heat_index_*``: derivados de temperatura y humedad;
+    - ``pres_trend``: pendiente de la presión (Pa/h, mínimos cuadrados);
+    - ``uv_dose``: dosis eritémica integrada (J/m²; ``/ SED`` para SED).
+
+    La dosis une los bloques con la última muestra del anterior, así que
+    supone que la fuente viene en orden temporal (``ArchiveView`` ordena
+    cada día).
+    """
+    acc = BinAccumulator()
+    last = None     # (hora, uv) de la última muestra del bloque anterior
+    for chunk in _chunks(source, chunk_size, progress, cancelled):
+        times = np.asarray(chunk["time"], dtype=np.float64)
+        if not len(times):
+            continue
+        derived = dict(chunk)
+        derived["dew_point"] = dew_point(chunk["temp"], chunk["hum"])
+        derived["heat_index"] = heat_index(chunk["temp"], chunk["hum"])
+        index = _accumulate(acc, derived, period, VARIABLES + DERIVED)
+
+        # Pendiente de la presión: sumas de mínimos cuadrados con la hora
+        # relativa al intervalo (evita perder precisión con epoch)
+        pres = np.asarray(chunk["pres"], dtype=np.float64)
+        ok = ~np.isnan(pres)
+        rel = np.where(ok, (times - bin_start(index, period)) / HOUR, 0.0)
+        p = np.where(ok, pres, 0.0)
+        acc.add(index, {"tp_n": ok.astype(np.float64), "tp_t": rel, "tp_p": p,
+                        "tp_tt": rel * rel, "tp_tp": rel * p})
+
+        # Dosis UV: cada intervalo entre muestras cuenta para el de su inicio
+        t, uv = times, np.asarray(chunk["uv"], dtype=np.float64)
+        if last is not None:
+            t, uv = np.concatenate(([last[0]], t)), np.concatenate(([last[1]], uv))
+            index = np.concatenate((bin_index(t[:1], period), index))
+        acc.add(index[:-1], {"uv_dose": uv_dose(t, uv, max_gap)})
+        last = (t[-1], uv[-1])
+
+    result, keep = _columns(acc, period, VARIABLES + DERIVED)
+    n, st, sp, stt, stp = (acc.total(k)[keep] for k in ("tp_n", "tp_t", "tp_p", "tp_tt", "tp_tp"))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        denom = n * stt - st * st
+        result["pres_trend"] = np.where((n >= 2) & (denom > 1e-12), (n * stp - st * sp) / denom, np.nan)
+    result["uv_dose"] = acc.total("uv_dose")[keep]
+    return result
+
+
+# ===================== SERIES REGULARES =====================
+def resample(source, step, variables=VARIABLES, max_gap=0, chunk_size=1 << 18):
+    """Serie con un valor (media) cada ``step`` segundos, alineada con la época.
+
+    Los intervalos sin datos quedan en NaN; con ``max_gap`` > 0 los huecos
+    de hasta ``max_gap`` segundos se rellenan interpolando (``fill_gaps``).
+    Devuelve columnas ``time`` (inicio de cada intervalo) + ``variables``.
+    """
+    acc = BinAccumulator()
+    for chunk in _chunks(source, chunk_size):
+        _accumulate(acc, chunk, step, variables)
+    index = acc.index()
+    result = {"time": index * float(step)}
+    for name in variables:
+        result[name] = acc.mean(name, f"{name}_count")
+    if max_gap > 0:
+        limit = int(max_gap // step)
+        for name in variables:
+            result[name] = fill_gaps(result[name], limit)
+    return result
+
+
+def fill_gaps(values, limit):
+    """Interpola linealmente los tramos de NaN de hasta ``limit`` muestras.
+
+    Los tramos más largos (cortes reales) y los de los extremos se dejan
+    en NaN: no se inventan datos donde no hubo medición cerca.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(values)
+    if not missing.any() or missing.all() or limit <= 0:
+        return values.copy()
+
+    x = np.arange(len(values))
+    filled = np.interp(x, x[~missing], values[~missing])
+
+    # Largo del tramo de NaN al que pertenece cada posición
+    edges = np.diff(np.concatenate(([0], missing.astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    run = np.zeros(len(values), dtype=np.int64)
+    inner = (starts > 0) & (ends < len(values)) & (ends - starts <= limit)
+    for s, e in zip(starts[inner].tolist(), ends[inner].tolist()):
+        run[s:e] = 1
+    return np.where(missing & (run == 0), np.nan, filled)
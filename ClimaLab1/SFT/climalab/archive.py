@@ -0,0 +1,322 @@
+"""Archivo columnar de mediciones: una carpeta por estación y día.
+
+Estructura en disco::
+
+    <raíz>/estaciones.json             nombre de carpeta -> nombre de estación
+    <raíz>/<estación>/<AAAA-MM-DD>/time.bin, seq.bin, ..., pres.bin, uv_adc.bin, ..., pres_raw.bin
+    <raíz>/<estación>/huecos.jsonl     periodos sin datos por desconexión
+
+Cada ``.bin`` es un arreglo NumPy crudo (little-endian) con el tipo de su
+columna en ``RECORD_DTYPE``; se leen con ``np.memmap`` sin cargar nada
+más que las columnas y días que pide la consulta.
+"""
+
+import json
+import os
+import re
+from datetime import date, datetime
+
+import numpy as np
+
+from .store import COLUMNS, RECORD_DTYPE, VARIABLES
+
+
+INDEX_FILE = "estaciones.json"
+GAPS_FILE = "huecos.jsonl"
+
+
+class Archive:
+    """Acceso de escritura (por bloques) y consulta a un archivo de mediciones"""
+
+    def __init__(self, root):
+        self.root = root
+        self._index = self._load_index()
+
+    # ---------- estaciones y particiones ----------
+    def stations(self):
+        return sorted(self._index.values())
+
+    def days(self, station):
+        """Días (``AAAA-MM-DD``) con datos de una estación"""
+        folder = self._folder(station)
+        if folder is None:
+            return []
+        path = os.path.join(self.root, folder)
+        return sorted(d for d in os.listdir(path) if os.path.isdir(os.path.join(path, d)))
+
+    def _load_index(self):
+        path = os.path.join(self.root, INDEX_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_index(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = os.path.join(self.root, INDEX_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, os.path.join(self.root, INDEX_FILE))
+
+    def _folder(self, station, create=False):
+        for folder, name in self._index.items():
+            if name == station:
+                return folder
+        if not create:
+            return None
+        base = re.sub(r"[^0-9A-Za-z_-]+", "_", station).strip("_") or "estacion"
+        folder, n = base, 1
+        while folder in self._index:
+            n += 1
+            folder = f"{base}_{n}"
+        self._index[folder] = station
+        self._save_index()
+        return folder
+
+    # ---------- escritura ----------
+    def append(self, station, rows):
+        """Añade filas (columnas de ``SampleStore``) repartidas por día local"""
+        times = np.asarray(rows["time"])
+        if not len(times):
+            return
+        folder = self._folder(station, create=True)
+
+        days = np.array([_day_start(t) for t in (times.min(), times.max())])
+        if days[0] == days[1]:
+            groups = [(days[0], slice(None))]
+        else:
+            # Sesiones que cruzan la medianoche: un grupo por día
+            keys = np.array([_day_start(t) for t in times.tolist()])
+            groups = [(day, keys == day) for day in np.unique(keys)]
+
+        for day, sel in groups:
+            part = os.path.join(self.root, folder, date.fromtimestamp(day).isoformat())
+            os.makedirs(part, exist_ok=True)
+            _align_partition(part)
+            for name in COLUMNS:
+                values = np.ascontiguousarray(np.asarray(rows[name])[sel], dtype=RECORD_DTYPE[name])
+                with open(os.path.join(part, f"{name}.bin"), "ab") as f:
+                    values.tofile(f)
+
+    def append_gap(self, station, start, end, reason=""):
+        folder = self._folder(station, create=True)
+        os.makedirs(os.path.join(self.root, folder), exist_ok=True)
+        with open(os.path.join(self.root, folder, GAPS_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"start": start, "end": end, "reason": reason}, ensure_ascii=False) + "\n")
+
+    def gaps(self, station, start=None, stop=None):
+        """``[(inicio, fin, motivo)]`` que se solapan con el rango"""
+        folder = self._folder(station)
+        path = os.path.join(self.root, folder, GAPS_FILE) if folder else None
+        if not path or not os.path.exists(path):
+            return []
+        found = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    gap = json.loads(line)
+                except ValueError:
+                    continue   # línea cortada por una escritura interrumpida
+                if (start is None or gap["end"] >= start) and (stop is None or gap["start"] < stop):
+                    found.append((gap["start"], gap["end"], gap.get("reason", "")))
+        return found
+
+    # ---------- consulta ----------
+    def _partitions(self, station, start, stop, names):
+        """Memmaps de cada día que toca el rango y la máscara de filas (None = todas)"""
+        folder = self._folder(station)
+        if folder is None:
+            return
+        first = date.fromtimestamp(start).isoformat() if start is not None else None
+        last = date.fromtimestamp(stop).isoformat() if stop is not None else None
+
+        for day in self.days(station):
+            if (first and day < first) or (last and day > last):
+                continue
+            cols = _open_partition(os.path.join(self.root, folder, day), names)
+            if cols is None:
+                continue
+            t = cols["time"]
+            mask = np.ones(len(t), dtype=bool)
+            if start is not None:
+                mask &= t >= start
+            if stop is not None:
+                mask &= t < stop
+            if mask.all():
+                yield cols, None
+            elif mask.any():
+                yield cols, mask
+
+    def iter_query(self, station, start=None, stop=None, variables=VARIABLES):
+        """Recorre por días las filas con ``start <= time < stop`` (epoch s).
+
+        Solo se abren las columnas pedidas y los días que tocan el rango.
+        """
+        names = ("time",) + tuple(v for v in variables if v != "time")
+        for cols, mask in self._partitions(station, start, stop, names):
+            if mask is None:
+                yield {name: np.array(col) for name, col in cols.items()}
+            else:
+                yield {name: col[mask] for name, col in cols.items()}
+
+    def query(self, station, start=None, stop=None, variables=VARIABLES):
+        """Columnas ``time`` + ``variables`` en el rango, ordenadas por hora"""
+        chunks = list(self.iter_query(station, start, stop, variables))
+        names = ("time",) + tuple(v for v in variables if v != "time")
+        if not chunks:
+            return {name: np.empty(0, dtype=RECORD_DTYPE[name]) for name in names}
+        result = {name: np.concatenate([c[name] for c in chunks]) for name in names}
+        order = np.argsort(result["time"], kind="stable")
+        return {name: col[order] for name, col in result.items()}
+
+    def view(self, station, start=None, stop=None):
+        """Rango de una estación con la interfaz de lectura de ``SampleStore``"""
+        return ArchiveView(self, station, start, stop)
+
+    # ---------- reescritura ----------
+    def rewrite(self, station, compute, start=None, stop=None, chunk_size=65536):
+        """Reemplaza columnas en el sitio: ``compute(bloque)`` devuelve las nuevas.
+
+        Recorre los días por bloques (memmap en lectura y escritura) y solo
+        toca las filas con ``start <= time < stop``; devuelve cuántas fueron.
+        """
+        folder = self._folder(station)
+        if folder is None:
+            return 0
+        first = date.fromtimestamp(start).isoformat() if start is not None else None
+        last = date.fromtimestamp(stop).isoformat() if stop is not None else None
+
+        done = 0
+        for day in self.days(station):
+            if (first and day < first) or (last and day > last):
+                continue
+            part = os.path.join(self.root, folder, day)
+            _align_partition(part)
+            cols = _open_partition(part, COLUMNS, mode="r+")
+            if cols is None:
+                continue
+            for i in range(0, len(cols["time"]), chunk_size):
+                chunk = {name: np.array(col[i:i + chunk_size]) for name, col in cols.items()}
+                t = chunk["time"]
+                mask = np.ones(len(t), dtype=bool)
+                if start is not None:
+                    mask &= t >= start
+                if stop is not None:
+                    mask &= t < stop
+                if not mask.any():
+                    continue
+                for name, values in compute(chunk).items():
+                    cols[name][i:i + chunk_size] = np.where(mask, values, chunk[name])
+                done += int(mask.sum())
+            for col in cols.values():
+                col.flush()
+        return done
+
+
+class ArchiveView:
+    """Permite exportar (p. ej. a Excel) directamente desde el archivo"""
+
+    def __init__(self, archive, station, start=None, stop=None):
+        self.archive = archive
+        self.station = station
+        self.start = start
+        self.stop = stop
+
+    @property
+    def gaps(self):
+        return self.archive.gaps(self.station, self.start, self.stop)
+
+    def session_length(self):
+        return sum(
+            len(cols["time"]) if mask is None else int(mask.sum())
+            for cols, mask in self.archive._partitions(self.station, self.start, self.stop, ("time",))
+        )
+
+    def iter_chunks(self, chunk_size=65536):
+        """Bloques de columnas en orden de hora.
+
+        Se lee del memmap bloque a bloque: un día entero nunca pasa a
+        memoria. Un relleno por DUMP añade al final del día filas más
+        viejas; solo entonces ese día se recorre por índices ordenados.
+        """
+        for cols, mask in self.archive._partitions(self.station, self.start, self.stop, COLUMNS):
+            order = _time_order(cols["time"], mask)
+            if order is not None:
+                for i in range(0, len(order), chunk_size):
+                    idx = order[i:i + chunk_size]
+                    yield {name: np.asarray(col[idx]) for name, col in cols.items()}
+                continue
+            for i in range(0, len(cols["time"]), chunk_size):
+                if mask is None:
+                    yield {name: np.array(col[i:i + chunk_size]) for name, col in cols.items()}
+                    continue
+                sel = mask[i:i + chunk_size]
+                if sel.any():
+                    yield {name: col[i:i + chunk_size][sel] for name, col in cols.items()}
+
+
+def archive_stores(archive, stores, since=None, progress=None):
+    """Guarda en el archivo las filas y huecos de cada store que aún no estén.
+
+    ``since[nombre]`` es ``(filas, huecos)`` ya archivados; se devuelve
+    actualizado para que la siguiente llamada solo añada lo nuevo.
+    """
+    since = dict(since or {})
+    total = sum(store.session_length() - since.get(name, (0, 0))[0] for name, store in stores.items())
+    done = 0
+    for name, store in stores.items():
+        rows, gaps = since.get(name, (0, 0))
+        for chunk in store.iter_chunks(start=rows):
+            archive.append(name, chunk)
+            n = len(chunk["time"])
+            rows += n
+            done += n
+            since[name] = (rows, gaps)
+            if progress:
+                progress(done, total)
+        for gap in store.gaps[gaps:]:
+            archive.append_gap(name, *gap)
+        since[name] = (rows, len(store.gaps))
+    return since
+
+
+def _day_start(ts):
+    """Medianoche local (epoch s) del día de ``ts``"""
+    d = datetime.fromtimestamp(ts).replace(hour=0, minute=0, second=0, microsecond=0)
+    return d.timestamp()
+
+
+def _time_order(time, mask=None):
+    """Índices que ordenan por hora las filas de un día (con ``mask``), o None si ya lo están"""
+    t = np.asarray(time) if mask is None else time[mask]
+    if np.all(t[1:] >= t[:-1]):
+        return None
+    order = np.argsort(t, kind="stable")
+    return order if mask is None else np.flatnonzero(mask)[order]
+
+
+def _align_partition(part):
+    """Recorta las columnas de un día al largo de la más corta antes de añadir"""
+    lengths = {}
+    for name in COLUMNS:
+        path = os.path.join(part, f"{name}.bin")
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        lengths[name] = size // RECORD_DTYPE[name].itemsize
+    n = min(lengths.values())
+    for name, length in lengths.items():
+        if length > n:
+            with open(os.path.join(part, f"{name}.bin"), "r+b") as f:
+                f.truncate(n * RECORD_DTYPE[name].itemsize)
+
+
+def _open_partition(part, names, mode="r"):
+    """Memmaps de las columnas pedidas de un día (recortadas a la más corta)"""
+    cols = {}
+    for name in names:
+        path = os.path.join(part, f"{name}.bin")
+        if not os.path.exists(path) or not os.path.getsize(path):
+            return None
+        cols[name] = np.memmap(path, dtype=RECORD_DTYPE[name], mode=mode)
+    # Una escritura interrumpida puede dejar columnas de distinto largo
+    n = min(len(col) for col in cols.values())
+    return {name: col[:n] for name, col in cols.items()}
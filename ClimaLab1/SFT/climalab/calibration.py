@@ -0,0 +1,164 @@
+"""Calibración por estación y conversión de unidades, sobre bloques completos.
+
+El firmware manda valores sin corregir (presión en Pa, UV por umbrales
+fijos en mV). ``Calibration`` los corrige por sensor con offset/ganancia
+o un polinomio, y el UV con una curva propia sobre la lectura del ADC.
+Siempre se calcula desde las columnas ``*_raw``/``uv_adc``, así que se
+puede rehacer sobre lo ya archivado (``recalibrate_archive``).
+
+Lo guardado queda en unidades base (°C, %, Pa); ``convert`` pasa a las
+que se elijan solo para mostrar.
+"""
+
+import numpy as np
+
+from .store import VARIABLES
+
+
+# ADC de 12 bits de la ESP32 con referencia de 3,3 V (``readSensors()``)
+ADC_MAX = 4095
+ADC_REF_MV = 3300.0
+
+# Umbrales (mV) con los que el firmware pasa al índice siguiente
+FIRMWARE_UV_MV = (50, 227, 318, 408, 503, 606, 696, 795, 881, 976, 1079)
+
+
+def adc_to_mv(adc):
+    return np.asarray(adc, dtype=np.float64) * (ADC_REF_MV / ADC_MAX)
+
+
+def firmware_uv_index(mv):
+    """Índice UV que calcula el firmware para una tensión (escalones fijos)"""
+    return np.searchsorted(FIRMWARE_UV_MV, np.asarray(mv, dtype=np.float64), side="right").astype(np.float64)
+
+
+# ===================== CALIBRACIÓN =====================
+class SensorCalibration:
+    """Corrección de un sensor: ``valor = polinomio(crudo)``.
+
+    - ``offset``/``gain``: ``gain * crudo + offset`` (lo habitual).
+    - ``poly``: coeficientes en orden creciente ``[c0, c1, c2, ...]``;
+      si está, reemplaza a offset/ganancia.
+    - ``curve``: solo UV, pares ``[mV, índice]`` interpolados sobre la
+      lectura del ADC; el polinomio se aplica después. Las muestras sin
+      ADC (firmware viejo) se quedan con el índice del firmware.
+    """
+
+    FIELDS = ("offset", "gain", "poly", "curve")
+
+    def __init__(self, offset=0.0, gain=1.0, poly=None, curve=None):
+        self.offset = float(offset)
+        self.gain = float(gain)
+        self.poly = [float(c) for c in poly] if poly else None
+        self.curve = sorted((float(mv), float(v)) for mv, v in curve) if curve else None
+        if self.curve is not None and len(self.curve) < 2:
+            raise ValueError("La curva de UV necesita al menos dos puntos")
+
+    @property
+    def coefficients(self):
+        return self.poly if self.poly else [self.offset, self.gain]
+
+    @property
+    def identity(self):
+        return self.curve is None and self.coefficients == [0.0, 1.0]
+
+    def apply(self, raw, adc=None):
+        """Valores corregidos de una columna cruda (NaN se conserva)"""
+        values = np.asarray(raw, dtype=np.float64)
+        if self.curve is not None and adc is not None:
+            mv, index = np.array(self.curve).T
+            adc = np.asarray(adc, dtype=np.float64)
+            values = np.where(np.isnan(adc), values, np.interp(adc_to_mv(adc), mv, index))
+        # Horner: un recorrido por coeficiente sobre la columna entera
+        coefficients = self.coefficients
+        result = np.full(values.shape, coefficients[-1])
+        for c in reversed(coefficients[:-1]):
+            result = result * values + c
+        return result
+
+    def to_dict(self):
+        data = {}
+        if self.poly:
+            data["poly"] = self.poly
+        elif self.coefficients != [0.0, 1.0]:
+            data.update(offset=self.offset, gain=self.gain)
+        if self.curve:
+            data["curve"] = [list(point) for point in self.curve]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data[field] for field in cls.FIELDS if field in data})
+
+
+class Calibration:
+    """Calibración de una estación: ``SensorCalibration`` por variable.
+
+    Se describe en la configuración como ``{"temp": {"offset": -0.4},
+    "pres": {"gain": 1.0002}, "uv": {"curve": [[50, 0], [1079, 11]]}}``.
+    """
+
+    def __init__(self, sensors=None):
+        sensors = dict(sensors or {})
+        unknown = set(sensors) - set(VARIABLES)
+        if unknown:
+            raise ValueError(f"Variables desconocidas en la calibración: {', '.join(sorted(unknown))}")
+        self.sensors = {name: sensor for name, sensor in sensors.items() if not sensor.identity}
+
+    def __bool__(self):
+        return bool(self.sensors)
+
+    def values(self, block):
+        """Variables calibradas de un bloque (estructurado o dict de columnas con ``*_raw``)"""
+        result = {}
+        for name in VARIABLES:
+            raw = np.asarray(block[f"{name}_raw"], dtype=np.float64)
+            sensor = self.sensors.get(name)
+            if sensor is None:
+                result[name] = raw
+            else:
+                result[name] = sensor.apply(raw, block["uv_adc"] if name == "uv" else None)
+        return result
+
+    def apply(self, block):
+        """Reescribe las variables del bloque en el sitio; devuelve el mismo bloque"""
+        if self.sensors:
+            for name, values in self.values(block).items():
+                block[name] = values
+        return block
+
+    def to_dict(self):
+        return {name: sensor.to_dict() for name, sensor in self.sensors.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls({name: SensorCalibration.from_dict(spec) for name, spec in (data or {}).items()})
+
+
+def recalibrate_archive(archive, station, calibration, start=None, stop=None):
+    """Recalcula lo archivado de una estación con otra calibración.
+
+    Parte de las columnas crudas guardadas, así que no hace falta volver a
+    medir; devuelve cuántas filas se reescribieron.
+    """
+    return archive.rewrite(station, calibration.values, start, stop)
+
+
+# ===================== UNIDADES =====================
+# Unidad -> (factor, desplazamiento) desde la unidad base de la variable
+UNITS = {
+    "temp": {"°C": (1.0, 0.0), "°F": (9 / 5, 32.0)},
+    "hum": {"%": (1.0, 0.0)},
+    "pres": {"Pa": (1.0, 0.0), "hPa": (0.01, 0.0)},
+    "uv": {"": (1.0, 0.0)},
+}
+
+# Decimales con que se muestra cada unidad
+UNIT_DECIMALS = {"°C": 1, "°F": 1, "%": 1, "Pa": 0, "hPa": 1, "": 1}
+
+
+def convert(values, variable, unit, delta=False):
+    """Pasa valores (o diferencias, con ``delta``) de la unidad base a ``unit``"""
+    scale, shift = UNITS[variable][unit]
+    values = np.asarray(values, dtype=np.float64) * scale
+    return values if delta else values + shift
@@ -0,0 +1,282 @@
+"""Registro desatendido por línea de comandos (sin Qt ni matplotlib).
+
+Ejemplos::
+
+    python -m climalab --port /dev/ttyUSB0 --interval 2 --duration 3600
+    python -m climalab --tcp 192.168.4.1:3333 --stream 20 --binary --out archivo
+    python -m climalab --port COM3 --tcp 192.168.4.1 --xlsx mediciones.xlsx
+    python -m climalab --port /dev/ttyUSB0 --serve          # tablero en http://<ip>:8765/
+    python -m climalab --port COM3 --raw --calibration calibracion.json
+    python -m climalab --recalibrate --calibration calibracion.json --out archivo
+
+``calibracion.json`` asocia cada estación (por nombre) a su calibración,
+p. ej. ``{"COM3": {"temp": {"offset": -0.4}, "pres": {"gain": 1.0002}}}``.
+"""
+
+import argparse
+import asyncio
+import json
+import signal
+import sys
+import time
+
+import numpy as np
+
+from .archive import Archive
+from .calibration import Calibration, recalibrate_archive
+from .config import DEFAULTS
+from .engine import DEFAULT_TCP_PORT, AcquisitionEngine, StationConfig
+from .live import DEFAULT_LIVE_PORT, LiveServer
+from .stats import AlertEngine, StationStats, load_rules
+from .store import COLUMNS, sample_rows
+
+
+FLUSH_INTERVAL = 5.0  # s entre escrituras al archivo
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m climalab",
+        description="Registra mediciones de una o varias estaciones ClimaLab en un archivo columnar.",
+    )
+    parser.add_argument("--port", action="append", default=[], metavar="PUERTO",
+                        help="puerto serial de una estación (se puede repetir)")
+    parser.add_argument("--tcp", action="append", default=[], metavar="HOST[:PUERTO]",
+                        help=f"estación por WiFi, puerto {DEFAULT_TCP_PORT} por defecto (se puede repetir)")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="segundos entre consultas DATA (por defecto 1)")
+    parser.add_argument("--stream", type=float, default=0, metavar="HZ",
+                        help="pedir envío continuo a esta frecuencia en lugar de consultar")
+    parser.add_argument("--binary", action="store_true",
+                        help="negociar tramas binarias con la estación")
+    parser.add_argument("--raw", action="store_true",
+                        help="pedir la lectura cruda del ADC de UV también en modo texto")
+    parser.add_argument("--calibration", metavar="RUTA",
+                        help="JSON con la calibración de cada estación (por nombre)")
+    parser.add_argument("--recalibrate", action="store_true",
+                        help="recalcular lo ya archivado en --out con --calibration y salir")
+    parser.add_argument("--duration", type=float, default=0,
+                        help="segundos de registro; 0 = hasta Ctrl+C")
+    parser.add_argument("--out", default="archivo",
+                        help="carpeta del archivo de mediciones (por defecto ./archivo)")
+    parser.add_argument("--xlsx", metavar="RUTA",
+                        help="al terminar, exportar también la sesión a Excel")
+    parser.add_argument("--quiet", action="store_true", help="no mostrar el resumen periódico")
+    parser.add_argument("--serve", type=int, nargs="?", const=DEFAULT_LIVE_PORT, metavar="PUERTO",
+                        help=f"publicar en vivo por HTTP/SSE (puerto {DEFAULT_LIVE_PORT} por defecto)")
+    parser.add_argument("--serve-host", default="0.0.0.0",
+                        help="dirección del servidor en vivo (por defecto todas las interfaces)")
+    return parser.parse_args(argv)
+
+
+def station_configs(args):
+    """StationConfig de cada ``--port`` y ``--tcp``"""
+    options = dict(
+        interval=args.interval,
+        stream_ms=int(1000 / args.stream) if args.stream > 0 else 0,
+        binary=args.binary,
+        raw=args.raw,
+    )
+    configs = [StationConfig(port, "serial", port, **options) for port in args.port]
+    for target in args.tcp:
+        host, _, port = target.partition(":")
+        tcp_port = int(port) if port else DEFAULT_TCP_PORT
+        configs.append(StationConfig(f"{host}:{tcp_port}", "tcp", host, tcp_port, **options))
+    return configs
+
+
+class Recorder:
+    """Acumula los bloques del motor y los vuelca al archivo cada cierto tiempo"""
+
+    def __init__(self, archive, names, quiet=False, rules=(), live=None):
+        self.archive = archive
+        self.quiet = quiet
+        self.live = live
+        self.stats = {name: StationStats() for name in names}
+        self.alerts = AlertEngine(rules)
+        self.pending = {name: [] for name in names}
+        self.counts = {name: 0 for name in names}
+        self.dropped = {}
+        self.spans = {}
+
+    def on_samples(self, name, samples):
+        rows = sample_rows(samples, time.time())
+        self.pending[name].append(rows)
+        if self.live is not None:
+            self.live.publish(name, rows)
+        self.stats[name].update(rows)
+        for rule, active, value in self.alerts.evaluate(name, self.stats[name]):
+            if active:
+                print(f"[{name}] ALERTA: {rule.label} ({rule.metric} = {value:.2f})")
+            else:
+                print(f"[{name}] Fin de alerta: {rule.label}")
+            if self.live is not None:
+                self.live.alert(name, rule.label, rule.variable, active, value)
+
+    def on_status(self, name, state, detail=""):
+        if self.live is not None:
+            self.live.status(name, state, detail)
+        if state == "error":
+            print(f"[{name}] Error: {detail}")
+        elif state == "reconnecting":
+            print(f"[{name}] Reintento en {detail} s")
+        elif state == "connected":
+            print(f"[{name}] Conectado")
+        elif state == "recovered":
+            print(f"[{name}] {detail} muestras recuperadas del registro de la estación")
+        elif state == "dropped":
+            self.dropped[name] = self.dropped.get(name, 0) + int(detail)
+            print(f"[{name}] {detail} tramas perdidas (saltos de secuencia), {self.dropped[name]} en total")
+
+    def on_gap(self, name, start, end, reason):
+        print(f"[{name}] Reconectada tras {end - start:.1f} s sin datos")
+        if self.live is not None:
+            self.live.gap(name, start, end, reason)
+        try:
+            self.archive.append_gap(name, start, end, reason)
+        except OSError as e:
+            print(f"[{name}] Error al escribir el archivo: {e}")
+
+    def flush(self):
+        written = 0
+        for name, blocks in self.pending.items():
+            if not blocks:
+                continue
+            rows = {col: np.concatenate([b[col] for b in blocks]) for col in COLUMNS}
+            self.pending[name] = []
+            try:
+                self.archive.append(name, rows)
+            except OSError as e:
+                print(f"[{name}] Error al escribir el archivo: {e}")
+                continue
+            lo, hi = float(rows["time"].min()), float(rows["time"].max())
+            span = self.spans.get(name, (lo, hi))
+            self.spans[name] = (min(span[0], lo), max(span[1], hi))
+            self.counts[name] += len(rows["time"])
+            written += len(rows["time"])
+
+        if written and not self.quiet:
+            summary = ", ".join(f"{name}: {n}" for name, n in self.counts.items())
+            print(f"{time.strftime('%H:%M:%S')} muestras guardadas -> {summary}")
+
+
+async def record(configs, recorder, duration=0, flush_interval=FLUSH_INTERVAL):
+    """Corre el motor en este bucle hasta ``duration`` o Ctrl+C.
+
+    Las estaciones que se desconectan se reintentan solas; el registro no
+    termina por un corte.
+    """
+    engine = AcquisitionEngine(recorder.on_samples, recorder.on_status, on_gap=recorder.on_gap)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C llega como KeyboardInterrupt
+
+    for config in configs:
+        await engine.start_station(config)
+
+    deadline = loop.time() + duration if duration > 0 else None
+    try:
+        while not stop.is_set():
+            timeout = flush_interval
+            if deadline is not None:
+                timeout = min(timeout, max(deadline - loop.time(), 0))
+            try:
+                await asyncio.wait_for(stop.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            recorder.flush()
+            if deadline is not None and loop.time() >= deadline:
+                break
+    finally:
+        await engine.stop_stations()
+        recorder.flush()
+        for config in configs:
+            summary = engine.timing_summary(config.name)
+            if summary:
+                print(f"[{config.name}] {summary}")
+
+
+def load_calibrations(path):
+    """``{estación: descripción}`` de un JSON; se valida cada calibración"""
+    with open(path, encoding="utf-8") as f:
+        calibrations = json.load(f)
+    if not isinstance(calibrations, dict):
+        raise ValueError("se esperaba un objeto {estación: calibración}")
+    for spec in calibrations.values():
+        Calibration.from_dict(spec)
+    return calibrations
+
+
+def recalibrate(archive, calibrations):
+    """Aplica de nuevo la calibración a todo lo archivado de cada estación"""
+    for name, spec in calibrations.items():
+        if name not in archive.stations():
+            print(f"[{name}] No está en el archivo")
+            continue
+        rows = recalibrate_archive(archive, name, Calibration.from_dict(spec))
+        print(f"[{name}] {rows} filas recalibradas")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    calibrations = {}
+    if args.calibration:
+        try:
+            calibrations = load_calibrations(args.calibration)
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Error en la calibración {args.calibration}: {e}")
+            return 2
+    if args.recalibrate:
+        if not calibrations:
+            print("Indique la calibración con --calibration")
+            return 2
+        recalibrate(Archive(args.out), calibrations)
+        return 0
+
+    configs = station_configs(args)
+    for config in configs:
+        config.calibration = calibrations.get(config.name, {})
+    if not configs:
+        print("Indique al menos una estación con --port o --tcp")
+        return 2
+
+    live = None
+    if args.serve is not None:
+        live = LiveServer(args.serve_host, args.serve)
+        try:
+            live.start()
+        except OSError as e:
+            print(f"Error al iniciar el servidor en vivo: {e}")
+            return 2
+        print(f"Servidor en vivo: {live.url}")
+
+    archive = Archive(args.out)
+    recorder = Recorder(archive, [c.name for c in configs], args.quiet, load_rules(DEFAULTS["alerts"]), live)
+    print(f"Registrando {len(configs)} estación(es) en {args.out} (Ctrl+C para terminar)")
+    try:
+        asyncio.run(record(configs, recorder, args.duration))
+    except KeyboardInterrupt:
+        recorder.flush()
+    finally:
+        if live is not None:
+            live.shutdown()
+
+    if args.xlsx and recorder.spans:
+        from .export import export_xlsx
+
+        views = {
+            name: archive.view(name, lo, np.nextafter(hi, np.inf))
+            for name, (lo, hi) in recorder.spans.items()
+        }
+        rows = export_xlsx(args.xlsx, views)
+        print(f"Excel guardado: {args.xlsx} ({rows} filas)")
+
+    return 1 if not any(recorder.counts.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
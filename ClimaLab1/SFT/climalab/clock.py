@@ -0,0 +1,142 @@
+"""Hora de las muestras a partir del millis() de la estación, y su temporización.
+
+La hora de recepción incluye la latencia del enlace (variable); el
+millis() del paquete no. ``DeviceClock`` estima el desfase entre ambos
+relojes y fecha cada muestra con la hora en que el dispositivo la tomó.
+"""
+
+import numpy as np
+
+from .stats import RunningStats
+
+
+WRAP_MS = 1 << 32     # millis() es uint32: da la vuelta cada ~49,7 días
+DRIFT_PPM = 100       # deriva máxima esperada entre el cristal de la ESP32 y el host
+
+
+class DeviceClock:
+    """Convierte millis() de una estación en hora del host (epoch s).
+
+    Cada bloque da una cota superior del desfase (hora de recepción menos
+    millis de la última muestra): la latencia solo puede sumar. Se toma el
+    mínimo, que corresponde al paquete que menos tardó; para seguir la
+    deriva entre cristales ese mínimo se deja crecer ``drift_ppm``.
+
+    Las vueltas de millis() se desenrollan; si el contador retrocede sin
+    dar la vuelta (la placa se reinició) se empieza una estimación nueva.
+    """
+
+    def __init__(self, drift_ppm=DRIFT_PPM):
+        self.drift = drift_ppm * 1e-6
+        self.resets = 0
+        self.reset()
+
+    def reset(self):
+        self.offset = None     # hora del host - segundos del dispositivo
+        self.updated = None    # segundos del dispositivo en la última estimación
+        self.last_raw = None   # último millis() crudo visto
+        self.wraps = 0
+        self.latency = None    # latencia del último bloque (s)
+
+    def host_times(self, t_ms, received_at):
+        """Hora de cada muestra; las que no traen millis() (-1) toman ``received_at``"""
+        t_ms = np.asarray(t_ms, dtype=np.int64)
+        times = np.full(len(t_ms), received_at, dtype=np.float64)
+        stamped = np.flatnonzero(t_ms >= 0)
+        if not len(stamped):
+            return times
+
+        raw = t_ms[stamped]
+        prev = np.concatenate(([raw[0] if self.last_raw is None else self.last_raw], raw))
+        step = np.diff(prev)
+        wrapped = step < -WRAP_MS // 2
+        rebooted = np.flatnonzero((step < 0) & ~wrapped)
+        if len(rebooted):
+            # Lo anterior al reinicio se fecha con la estimación vieja (si la hay)
+            cut = rebooted[-1]
+            if cut and self.offset is not None:
+                times[stamped[:cut]] = self._map(raw[:cut], wrapped[:cut], None)
+            self.reset()
+            self.resets += 1
+            stamped, raw, wrapped = stamped[cut:], raw[cut:], np.zeros(len(raw) - cut, dtype=bool)
+
+        times[stamped] = self._map(raw, wrapped, received_at)
+        return times
+
+    def past_times(self, t_ms):
+        """Hora de muestras tomadas antes de la última vista (p. ej. del registro
+        de la estación), sin tocar la estimación"""
+        t_ms = np.asarray(t_ms, dtype=np.int64)
+        wraps = self.wraps - (t_ms > self.last_raw)
+        return (t_ms + wraps * WRAP_MS) / 1000.0 + self.offset
+
+    def _map(self, raw, wrapped, received_at):
+        """Segundos del dispositivo (desenrollados) + desfase; actualiza la estimación"""
+        wraps = self.wraps + np.cumsum(wrapped)
+        device = (raw + wraps * WRAP_MS) / 1000.0
+        self.wraps = int(wraps[-1])
+        self.last_raw = int(raw[-1])
+
+        if received_at is not None:
+            bound = received_at - device[-1]
+            if self.offset is None:
+                self.offset = bound
+            else:
+                aged = self.offset + self.drift * max(device[-1] - self.updated, 0.0)
+                self.offset = min(aged, bound)
+            self.updated = device[-1]
+            self.latency = bound - self.offset
+        return device + self.offset
+
+
+class TimingStats:
+    """Regularidad de una sesión de adquisición.
+
+    - ``spacing``: separación entre muestras consecutivas según el
+      dispositivo, menos el periodo pedido (jitter de muestreo).
+    - ``latency``: cuánto tardó cada bloque en llegar por encima del
+      paquete más rápido (la parte variable de la latencia).
+    - ``lateness``: retraso del envío de cada DATA respecto a su plazo.
+
+    Las separaciones de más de 2,5 periodos (muestras perdidas, cortes) no
+    entran al jitter; se cuentan en ``missed``.
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.spacing = RunningStats()
+        self.latency = RunningStats()
+        self.lateness = RunningStats()
+        self.missed = 0
+        self._last = None
+
+    def add_samples(self, times, t_ms, latency):
+        times = np.asarray(times)[np.asarray(t_ms) >= 0]
+        if not len(times):
+            return
+        if self._last is not None:
+            times = np.concatenate(([self._last], times))
+        self._last = times[-1]
+        step = np.diff(times)
+        regular = step <= 2.5 * self.period
+        self.missed += int((~regular).sum())
+        self.spacing.extend((step[regular] - self.period).tolist())
+        if latency is not None:
+            self.latency.add(latency)
+
+    def restart(self):
+        """Tras una reconexión la separación con la muestra anterior no cuenta"""
+        self._last = None
+
+    def summary(self):
+        """Texto de una línea con lo esencial (ms)"""
+        parts = []
+        if self.spacing.count:
+            parts.append(f"jitter {self.spacing.std * 1000:.1f} ms (máx {self.spacing.max * 1000:+.0f})")
+        if self.latency.count:
+            parts.append(f"latencia variable {self.latency.mean * 1000:.0f} ms (máx {self.latency.max * 1000:.0f})")
+        if self.lateness.count:
+            parts.append(f"retraso de consulta {self.lateness.mean * 1000:.1f} ms")
+        if self.missed:
+            parts.append(f"{self.missed} saltos")
+        return ", ".join(parts)
@@ -0,0 +1,90 @@
+"""Configuración persistente de la estación (estacion_config.json)."""
+
+import json
+import os
+
+
+DEFAULTS = {
+    "wifi_configured": False,
+    "wifi_ssid": "",
+    "last_port": "",
+    "duration": 10,          # minutos
+    "interval": 5,           # segundos entre consultas
+    "window_size": [1150, 750],
+    "mode": "Serial",
+    "wifi_ip": "192.168.4.1",
+    "wifi_port": 3333,
+    "acq_mode": 0,           # 0 = consulta (DATA), 1 = continua (STREAM)
+    "rate": 10,              # Hz en modo continuo
+    "binary": False,
+    "raw": False,            # pedir la lectura cruda del ADC de UV en modo texto (RAW,ON)
+    "stations": [],          # estaciones agregadas (StationConfig.to_dict)
+    "auto_connect": True,    # retomar la medición si la app se cerró midiendo
+    "was_measuring": False,
+    "live_server": False,    # publicar las muestras para tableros remotos (climalab.live)
+    "live_port": 8765,
+    # Calibración por nombre de estación (climalab.calibration.Calibration), p. ej.
+    # {"COM3": {"temp": {"offset": -0.4}, "uv": {"curve": [[50, 0], [1079, 11]]}}}
+    "calibration": {},
+    "units": {"temp": "°C", "pres": "Pa"},   # solo para mostrar; se guarda en °C y Pa
+    # Reglas de alerta (climalab.stats.AlertRule); métricas: value, ema,
+    # mean, std, min, max, rate (cambio por hora). Presión en Pa.
+    "alerts": [
+        {"variable": "uv", "op": ">=", "threshold": 8, "label": "Índice UV muy alto", "hysteresis": 1},
+        {"variable": "pres", "metric": "rate", "op": "<=", "threshold": -100,
+         "label": "Caída rápida de presión (más de 1 hPa/h)", "hysteresis": 30},
+    ],
+}
+
+
+class Config:
+    """Valores de ``DEFAULTS`` leídos de un JSON y guardados solo si cambian.
+
+    Las claves desconocidas del archivo se conservan al guardar.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.values = dict(DEFAULTS)
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error leyendo la configuración: {e}")
+            return
+        if isinstance(stored, dict):
+            self.values.update(stored)
+
+    def __getitem__(self, key):
+        return self.values.get(key, DEFAULTS.get(key))
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def set(self, key, value):
+        if self.values.get(key) != value:
+            self.values[key] = value
+            self.dirty = True
+
+    def update(self, **values):
+        for key, value in values.items():
+            self.set(key, value)
+
+    def save(self, force=False):
+        """Escribe el JSON de forma atómica (archivo temporal + reemplazo)"""
+        if not (self.dirty or force):
+            return
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.values, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+            self.dirty = False
+        except OSError as e:
+            print(f"Error guardando la configuración: {e}")
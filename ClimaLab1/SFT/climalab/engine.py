@@ -0,0 +1,675 @@
+"""Motor asyncio que adquiere datos de varias estaciones a la vez.
+
+Un solo hilo con su propio bucle de eventos atiende todas las estaciones,
+sean seriales o TCP (puerto 3333). Cada estación tiene su tarea de
+lectura, su propio calendario de sondeo y una cola acotada hacia el
+consumidor: si el consumidor se atrasa se descartan los bloques más
+antiguos en lugar de frenar la lectura.
+
+Si el enlace se cae (o deja de llegar nada) la estación se reconecta sola
+con espera exponencial. Al volver, lo que la placa guardó en su registro
+durante el corte se descarga con DUMP; lo que no se pudo recuperar se
+informa como un hueco.
+
+La calibración de cada estación (``StationConfig.calibration``) se aplica
+aquí, antes de entregar: todos los consumidores reciben lo mismo.
+"""
+
+import asyncio
+import collections
+import math
+import random
+import threading
+import time
+
+import numpy as np
+
+from .calibration import Calibration
+from .clock import DeviceClock, TimingStats
+from .frames import FRAME_SIZE, FrameDecoder
+from .protocol import (
+    DATA_CMD, DUMP_HEAD_ONLY, FORMAT_BIN_CMD, RAW_ON_CMD, SAMPLE_DTYPE, STOP_CMD, SampleParser,
+    dump_cmd, parse_dump_header, stream_cmd,
+)
+
+
+DEFAULT_TCP_PORT = 3333
+
+# Espera entre reintentos de conexión: se duplica hasta el máximo
+RECONNECT_MIN = 0.5
+RECONNECT_MAX = 30.0
+
+# Espera de la cabecera de DUMP; sin respuesta se asume firmware sin registro
+DUMP_TIMEOUT = 3.0
+DUMP_RATE = 5000   # bytes/s mínimos que se esperan durante la descarga
+
+# DATA enviados sin respuesta que se permiten a la vez (modo consulta)
+PIPELINE_DEPTH = 4
+
+
+class StationConfig:
+    """Cómo conectarse a una estación y cómo pedirle los datos.
+
+    ``raw`` pide que los paquetes de texto traigan la lectura del ADC de UV
+    (las tramas binarias ya la traen); ``calibration`` es la descripción de
+    ``climalab.calibration.Calibration``.
+    """
+
+    def __init__(self, name, kind, target, tcp_port=DEFAULT_TCP_PORT,
+                 interval=1.0, stream_ms=0, binary=False, reconnect=True, raw=False, calibration=None):
+        if kind not in ("serial", "tcp"):
+            raise ValueError(f"Tipo de estación desconocido: {kind}")
+        self.name = name
+        self.kind = kind
+        self.target = target
+        self.tcp_port = tcp_port
+        self.interval = interval
+        self.stream_ms = stream_ms
+        self.binary = binary
+        self.reconnect = reconnect
+        self.raw = raw
+        self.calibration = calibration or {}
+
+    @property
+    def address(self):
+        if self.kind == "tcp":
+            return f"{self.target}:{self.tcp_port}"
+        return self.target
+
+    def __repr__(self):
+        return f"StationConfig({self.name!r}, {self.kind!r}, {self.address!r})"
+
+    # La calibración no va aquí: se guarda aparte, por nombre de estación
+    FIELDS = ("name", "kind", "target", "tcp_port", "interval", "stream_ms", "binary", "reconnect", "raw")
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data[field] for field in cls.FIELDS if field in data})
+
+
+# ===================== TRANSPORTES =====================
+class TcpTransport:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host, port, timeout=3.0):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        return cls(reader, writer)
+
+    async def read(self):
+        data = await self.reader.read(4096)
+        if not data:
+            raise ConnectionError("La estación cerró la conexión")
+        return data
+
+    async def write(self, data):
+        self.writer.write(data)
+        await self.writer.drain()
+
+    def close(self):
+        self.writer.close()
+
+
+class SerialTransport:
+    """Puerto serial no bloqueante dentro del bucle de eventos.
+
+    En POSIX espera con ``add_reader`` sobre el descriptor del puerto; donde
+    el bucle no lo permite (p. ej. Windows) consulta ``in_waiting`` cada
+    ``POLL_S`` segundos. En ningún caso usa un hilo por dispositivo.
+    """
+
+    POLL_S = 0.01
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.loop = asyncio.get_running_loop()
+        self.fd = None
+        try:
+            fd = conn.fileno()
+            self.loop.add_reader(fd, lambda: None)
+            self.loop.remove_reader(fd)
+            self.fd = fd
+        except (AttributeError, NotImplementedError, OSError, ValueError):
+            pass
+
+    @classmethod
+    async def open(cls, port, baudrate=115200):
+        import serial
+
+        loop = asyncio.get_running_loop()
+        conn = await loop.run_in_executor(None, lambda: serial.Serial(port, baudrate, timeout=0, write_timeout=1))
+        return cls(conn)
+
+    async def read(self):
+        while True:
+            waiting = self.conn.in_waiting
+            if waiting:
+                return self.conn.read(waiting)
+            await self._wait_readable()
+
+    async def _wait_readable(self):
+        if self.fd is None:
+            await asyncio.sleep(self.POLL_S)
+            return
+
+        ready = self.loop.create_future()
+        self.loop.add_reader(self.fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            await ready
+        finally:
+            self.loop.remove_reader(self.fd)
+
+    async def write(self, data):
+        self.conn.write(data)
+
+    def close(self):
+        self.conn.close()
+
+
+async def open_transport(config):
+    if config.kind == "tcp":
+        return await TcpTransport.open(config.target, config.tcp_port)
+    transport = await SerialTransport.open(config.target)
+    # Pequeña pausa para estabilizar (la ESP32 se reinicia al abrir el puerto)
+    await asyncio.sleep(1.0)
+    return transport
+
+
+# ===================== ESTACIÓN EN EJECUCIÓN =====================
+class Station:
+    """Estado de una estación mientras el motor la atiende."""
+
+    def __init__(self, config, queue_size):
+        self.config = config
+        self.queue = asyncio.Queue(queue_size)
+        self.parser = SampleParser()
+        self.transport = None
+        self.tasks = []
+        self.received = 0
+        self.overflow = 0
+        self.dropped = 0              # tramas perdidas según los saltos de seq
+        self.wake = asyncio.Event()   # adelanta el próximo reintento
+        self.last_data = None         # hora (epoch) del último bloque recibido
+        self.lost_at = None           # inicio del hueco en curso
+        self.lost_reason = ""
+        self.reconnects = 0
+        self.downtime = 0.0
+        self.log_period = 1.0         # periodo del registro de la placa (s), según DUMP
+        self.in_flight = collections.deque()   # envío (monotonic) de cada DATA pendiente
+        self.rtt = None               # ida y vuelta de DATA, media móvil (s)
+        self.skipped = 0              # consultas no enviadas por ventana llena
+        self.clock = DeviceClock()    # millis() de la estación -> hora del host
+        self.dump_supported = True    # False si el firmware no responde a DUMP
+        self.recovered = 0            # muestras recuperadas del registro de la estación
+        self.timing = TimingStats(config.stream_ms / 1000 if config.stream_ms else config.interval)
+        try:
+            self.calibration = Calibration.from_dict(config.calibration)
+        except (ValueError, TypeError) as e:
+            print(f"Error en la calibración de {config.name}: {e}; se usan los valores crudos")
+            self.calibration = Calibration()
+
+    @property
+    def name(self):
+        return self.config.name
+
+    @property
+    def silence_timeout(self):
+        """Segundos sin recibir nada tras los que el enlace se da por muerto"""
+        if self.config.stream_ms:
+            return max(3.0, 20 * self.config.stream_ms / 1000)
+        return max(5.0, 3 * self.config.interval)
+
+    def sent(self):
+        """Registra un DATA enviado; False si la ventana de pendientes está llena"""
+        now = time.monotonic()
+        # Una respuesta corrupta (descartada) no debe ocupar la ventana para siempre
+        while self.in_flight and now - self.in_flight[0] > self.silence_timeout:
+            self.in_flight.popleft()
+        if len(self.in_flight) >= PIPELINE_DEPTH:
+            self.skipped += 1
+            return False
+        self.in_flight.append(now)
+        return True
+
+    def answered(self, count):
+        """Las respuestas llegan en orden: cada muestra cierra el DATA más antiguo"""
+        now = time.monotonic()
+        for _ in range(min(count, len(self.in_flight))):
+            rtt = now - self.in_flight.popleft()
+            self.rtt = rtt if self.rtt is None else 0.8 * self.rtt + 0.2 * rtt
+
+    def enqueue(self, samples):
+        """Encola sin bloquear; con la cola llena se descarta el bloque más viejo"""
+        if self.queue.full():
+            self.overflow += len(self.queue.get_nowait())
+        self.queue.put_nowait(samples)
+
+
+# ===================== MOTOR =====================
+class AcquisitionEngine:
+    """Adquisición concurrente de N estaciones desde un solo bucle asyncio.
+
+    ``on_samples(nombre, bloque)``, ``on_status(nombre, estado, detalle)`` y
+    ``on_gap(nombre, inicio, fin, motivo)`` se llaman desde el hilo del
+    motor. Con ``start()`` el motor usa su propio hilo; las corutinas también
+    pueden correr en un bucle ajeno (CLI).
+    """
+
+    def __init__(self, on_samples, on_status=None, queue_size=64, delivery_interval=0.05, on_gap=None):
+        self.on_samples = on_samples
+        self.on_status = on_status or (lambda name, state, detail="": None)
+        self.on_gap = on_gap or (lambda name, start, end, reason: None)
+        self.queue_size = queue_size
+        self.delivery_interval = delivery_interval
+        self.stations = {}
+        self.timing = {}    # nombre -> TimingStats de la última sesión (sigue tras detenerla)
+        self.loop = None
+        self._thread = None
+
+    # -------- hilo propio --------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="climalab-engine", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        self.loop.close()
+
+    def shutdown(self, timeout=5.0):
+        """Detiene todas las estaciones y el hilo del motor"""
+        if not self._thread:
+            return
+        try:
+            self.submit(self.stop_stations()).result(timeout)
+        except Exception as e:
+            print(f"Error deteniendo estaciones: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, coro):
+        """Ejecuta una corutina en el hilo del motor; devuelve un Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    # -------- estaciones --------
+    async def start_station(self, config):
+        if config.name in self.stations:
+            await self.stop_station(config.name)
+
+        station = Station(config, self.queue_size)
+        self.stations[config.name] = station
+        self.timing[config.name] = station.timing
+        station.tasks = [
+            asyncio.create_task(self._acquire(station)),
+            asyncio.create_task(self._deliver(station)),
+        ]
+
+    async def stop_station(self, name):
+        station = self.stations.pop(name, None)
+        if not station:
+            return
+
+        if station.transport:
+            try:
+                await asyncio.wait_for(station.transport.write(STOP_CMD), 0.5)
+            except Exception:
+                pass
+
+        for task in station.tasks:
+            task.cancel()
+        await asyncio.gather(*station.tasks, return_exceptions=True)
+        self._close(station)
+        self.on_status(name, "stopped", "")
+
+    async def stop_stations(self):
+        for name in list(self.stations):
+            await self.stop_station(name)
+
+    def link_stats(self, name):
+        """``(ida y vuelta en s o None, DATA pendientes)`` de una estación"""
+        station = self.stations.get(name)
+        if station is None:
+            return None, 0
+        return station.rtt, len(station.in_flight)
+
+    def timing_summary(self, name):
+        """Jitter y latencia de la última sesión de una estación (texto)"""
+        timing = self.timing.get(name)
+        return timing.summary() if timing is not None else ""
+
+    async def retry_station(self, name):
+        """Reintenta ya la conexión de una estación que espera para reconectar"""
+        station = self.stations.get(name)
+        if station:
+            station.wake.set()
+
+    def _close(self, station):
+        if station.transport:
+            try:
+                station.transport.close()
+            except Exception:
+                pass
+            station.transport = None
+
+    # -------- adquisición --------
+    async def _acquire(self, station):
+        """Conecta y lee; si el enlace cae, reintenta con espera exponencial"""
+        config = station.config
+        delay = RECONNECT_MIN
+        while True:
+            started = time.monotonic()
+            reason = await self._session(station)
+            if not config.reconnect:
+                return
+
+            # Solo hay hueco si ya se habían recibido datos
+            if station.lost_at is None and station.last_data is not None:
+                station.lost_at = station.last_data
+                station.lost_reason = reason
+            # Una conexión que aguantó un buen rato reinicia la espera
+            if time.monotonic() - started > RECONNECT_MAX:
+                delay = RECONNECT_MIN
+
+            wait = delay * random.uniform(0.8, 1.2)
+            self.on_status(station.name, "reconnecting", f"{wait:.1f}")
+            station.wake.clear()
+            try:
+                await asyncio.wait_for(station.wake.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, RECONNECT_MAX)
+
+    async def _session(self, station):
+        """Una conexión completa; devuelve el motivo por el que terminó"""
+        config = station.config
+        station.parser = SampleParser()
+        station.in_flight.clear()
+        # Al reconectar la placa puede haberse reiniciado: el desfase se estima de nuevo
+        station.clock.reset()
+        station.timing.restart()
+        self.on_status(station.name, "connecting", config.address)
+        try:
+            station.transport = await open_transport(config)
+        except Exception as e:
+            self.on_status(station.name, "error", str(e))
+            return str(e)
+
+        poller = None
+        try:
+            recovered, live = await self._backfill(station)
+            if recovered is not None and len(recovered):
+                station.recovered += len(recovered)
+                station.enqueue(station.calibration.apply(recovered))
+                self.on_status(station.name, "recovered", str(len(recovered)))
+            # Lo que llegó detrás de las tramas del DUMP va después del registro
+            self._received(station, live)
+
+            if config.raw and not config.binary and not await self._request(station, RAW_ON_CMD, "OK_RAW"):
+                print(f"{station.name}: la estación no admite RAW; los paquetes llegan sin ADC")
+            if config.binary and not await self._negotiate_binary(station):
+                print(f"{station.name}: la estación no admite FORMAT,BIN; se usa texto")
+
+            if config.stream_ms:
+                await station.transport.write(stream_cmd(config.stream_ms))
+            else:
+                poller = asyncio.create_task(self._poll(station))
+
+            self.on_status(station.name, "connected", config.address)
+            self._close_gap(station, recovered)
+
+            reported = station.parser.dropped   # el parser es nuevo en cada sesión
+            while True:
+                samples = station.parser.feed(await self._read(station))
+                if station.parser.dropped > reported:
+                    lost = station.parser.dropped - reported
+                    reported = station.parser.dropped
+                    station.dropped += lost
+                    self.on_status(station.name, "dropped", str(lost))
+                self._received(station, samples)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.on_status(station.name, "error", str(e))
+            return str(e)
+        finally:
+            if poller:
+                poller.cancel()
+            self._close(station)
+
+    async def _read(self, station):
+        """Lee del transporte; si no llega nada en ``silence_timeout`` el enlace está muerto.
+
+        Se usa asyncio.wait y no wait_for: wait_for puede tragarse una
+        cancelación que coincide con la llegada de datos y la estación no
+        se detendría.
+        """
+        read = asyncio.ensure_future(station.transport.read())
+        try:
+            done, _ = await asyncio.wait((read,), timeout=station.silence_timeout)
+        finally:
+            if not read.done():
+                read.cancel()
+        if not done:
+            raise ConnectionError(f"Sin datos de la estación en {station.silence_timeout:.0f} s")
+        return read.result()
+
+    def _received(self, station, samples):
+        """Fecha, calibra y encola las muestras recibidas en vivo"""
+        if not len(samples):
+            return
+        self._stamp(station, samples)
+        station.calibration.apply(samples)
+        if not station.config.stream_ms:
+            station.answered(len(samples))
+        station.received += len(samples)
+        station.last_data = time.time()
+        station.enqueue(samples)
+
+    def _stamp(self, station, samples):
+        """Fecha las muestras con el reloj del dispositivo y acumula su temporización"""
+        stamped = samples["t_ms"] >= 0
+        samples["time"] = station.clock.host_times(samples["t_ms"], time.time())
+        if stamped.any():
+            station.timing.add_samples(samples["time"], samples["t_ms"], station.clock.latency)
+
+    def _close_gap(self, station, recovered=None):
+        """Al reconectar, informa el hueco desde el último dato recibido.
+
+        Lo que cubren las muestras recuperadas del registro no es hueco:
+        solo quedan los tramos sin cubrir antes y después de ellas.
+        """
+        if station.lost_at is None:
+            return
+        now = time.time()
+        station.reconnects += 1
+        holes = [(station.lost_at, now)]
+        if recovered is not None and len(recovered):
+            slack = 2 * station.log_period
+            first, last = float(recovered["time"][0]), float(recovered["time"][-1])
+            holes = [(a, b) for a, b in ((station.lost_at, first), (last, now)) if b - a > slack]
+        for start, end in holes:
+            station.downtime += end - start
+            try:
+                self.on_gap(station.name, start, end, station.lost_reason)
+            except Exception as e:
+                print(f"Error informando hueco de {station.name}: {e}")
+        station.lost_at = None
+
+    # -------- registro de la estación (DUMP) --------
+    async def _backfill(self, station):
+        """Descarga del registro de la estación las muestras del corte.
+
+        Primero se pide solo la cabecera (último seq y su millis, periodo de
+        registro): con eso se calcula desde qué seq hace falta y se baja
+        todo de una vez en binario. Devuelve ``(recuperadas, en_vivo)``: las
+        muestras del registro ya fechadas y ordenadas por seq (None si no hay
+        nada que recuperar) y las que llegaron detrás de la descarga.
+        """
+        if not station.dump_supported:
+            return None, np.empty(0, dtype=SAMPLE_DTYPE)
+        # Por serial la sesión de la placa sobrevive al corte: si seguía en
+        # modo continuo, sus paquetes se mezclarían con la descarga
+        await station.transport.write(STOP_CMD)
+        try:
+            head, _, live, received = await asyncio.wait_for(self._dump(station, DUMP_HEAD_ONLY), DUMP_TIMEOUT)
+        except asyncio.TimeoutError:
+            station.dump_supported = False
+            print(f"{station.name}: la estación no tiene registro (DUMP); los cortes quedan como huecos")
+            return None, np.empty(0, dtype=SAMPLE_DTYPE)
+
+        _, head_seq, head_ms, period_ms, now_ms = head
+        station.log_period = period_ms / 1000
+        # La cabecera también sirve para empezar a estimar el reloj de la placa
+        station.clock.host_times([now_ms], received)
+        if station.lost_at is None or not head_seq:
+            return None, live
+
+        # seq del registro tomado cuando se perdió el enlace (con margen)
+        lost_ms = now_ms - (received - station.lost_at) * 1000
+        since = max(head_seq - math.ceil((head_ms - lost_ms) / period_ms) - 2, 0)
+        if since >= head_seq:
+            return None, live
+        timeout = DUMP_TIMEOUT + (head_seq - since) * FRAME_SIZE / DUMP_RATE
+        try:
+            _, samples, more, _ = await asyncio.wait_for(self._dump(station, since), timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError("La descarga del registro de la estación no terminó")
+
+        samples = samples[np.argsort(samples["seq"], kind="stable")]
+        samples["time"] = station.clock.past_times(samples["t_ms"])
+        live = np.concatenate([live, more]) if len(more) else live
+        return samples[(samples["seq"] > since) & (samples["time"] > station.lost_at)], live
+
+    async def _dump(self, station, since):
+        """Envía DUMP y lee la cabecera y las tramas anunciadas.
+
+        Devuelve ``(cabecera, tramas, en_vivo, hora)``; ``en_vivo`` son las
+        muestras de lo que llegó detrás de las tramas.
+        """
+        await station.transport.write(dump_cmd(since))
+        buffer = b""
+        while True:
+            line, sep, rest = buffer.partition(b"\n")
+            if not sep:
+                buffer += await station.transport.read()
+                continue
+            buffer = rest
+            # Antes de la cabecera puede haber restos (p. ej. mensajes de arranque)
+            head = parse_dump_header(line.decode(errors="ignore").strip())
+            if head is not None:
+                break
+        received = time.time()
+
+        size = head[0] * FRAME_SIZE
+        while len(buffer) < size:
+            buffer += await station.transport.read()
+        samples = FrameDecoder().feed(buffer[:size])
+        live = station.parser.feed(buffer[size:])
+        return head, samples, live, received
+
+    async def _poll(self, station):
+        """Modo consulta: un DATA por intervalo (la respuesta la recoge _session).
+
+        No se espera la respuesta antes de la siguiente consulta: puede haber
+        hasta ``PIPELINE_DEPTH`` pendientes, así un intervalo menor que la
+        ida y vuelta de la red no frena el ritmo. Con la ventana llena (enlace
+        atascado) se salta la consulta en lugar de acumular pedidos.
+
+        Los envíos apuntan a plazos absolutos del reloj monotónico del bucle
+        (``inicio + k * intervalo``): el retraso de un envío no se arrastra
+        al siguiente. Si se pierde un plazo entero se salta, sin cambiar la fase.
+        """
+        loop = asyncio.get_running_loop()
+        interval = station.config.interval
+        deadline = loop.time() + 0.5
+        while True:
+            await asyncio.sleep(max(deadline - loop.time(), 0))
+            now = loop.time()
+            station.timing.lateness.add(now - deadline)
+            if station.sent():
+                await station.transport.write(DATA_CMD)
+            deadline += interval
+            if now > deadline:
+                deadline += math.ceil((now - deadline) / interval) * interval
+
+    async def _negotiate_binary(self, station, timeout=1.0):
+        """Pide FORMAT,BIN; si no llega OK_FORMAT se sigue en texto"""
+        if not await self._request(station, FORMAT_BIN_CMD, "OK_FORMAT", timeout):
+            return False
+        station.parser.set_binary()
+        return True
+
+    async def _request(self, station, cmd, reply, timeout=1.0):
+        """Envía un comando de control y espera su respuesta; False si no llega"""
+        async def wait_ok():
+            while reply not in station.parser.control:
+                station.parser.feed(await station.transport.read())
+
+        await station.transport.write(cmd)
+        try:
+            await asyncio.wait_for(wait_ok(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def _deliver(self, station):
+        """Entrega al consumidor, agrupando lo acumulado entre entregas"""
+        while True:
+            blocks = [await station.queue.get()]
+            while not station.queue.empty():
+                blocks.append(station.queue.get_nowait())
+
+            samples = blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+            try:
+                self.on_samples(station.name, samples)
+            except Exception as e:
+                print(f"Error entregando muestras de {station.name}: {e}")
+
+            await asyncio.sleep(self.delivery_interval)
+
+    # -------- configuración WiFi --------
+    async def configure_wifi(self, port, ssid, password, timeout=8.0):
+        """Envía SET_WIFI por serial y espera OK_WIFI; devuelve (ok, mensaje).
+
+        La ESP32 se reinicia al abrir el puerto: se espera a que arranque y se
+        descarta lo que imprime antes de enviar. OK_WIFI llega recién cuando
+        el AP nuevo está activo (~1 s después), de ahí el ``timeout`` holgado.
+        """
+        try:
+            transport = await SerialTransport.open(port)
+        except Exception as e:
+            error_msg = str(e)
+            if "denied" in error_msg.lower():
+                return False, "🔴 Puerto en uso. Cierre otras apps"
+            return False, f"🔴 Error: {error_msg[:30]}"
+
+        async def wait_ok():
+            # Se acumula por si la respuesta llega partida
+            received = b""
+            while b"OK_WIFI" not in received:
+                received += await transport.read()
+
+        try:
+            # Pausa para que termine de arrancar; se descarta su salida de inicio
+            await asyncio.sleep(1.0)
+            transport.conn.reset_input_buffer()
+            await transport.write(f"SET_WIFI,{ssid},{password}\n".encode())
+            await asyncio.wait_for(wait_ok(), timeout)
+            return True, "✅ WiFi configurado correctamente"
+        except asyncio.TimeoutError:
+            return False, "⚠️ Sin respuesta del ESP32"
+        except Exception as e:
+            return False, f"🔴 Error: {str(e)[:30]}"
+        finally:
+            transport.close()
+
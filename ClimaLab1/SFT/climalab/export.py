@@ -0,0 +1,144 @@
+"""Exportación a Excel en streaming (memoria constante)."""
+
+import os
+from datetime import datetime
+
+from .protocol import uv_level_word
+
+
+HEADER = ["Fecha y Hora", "Índice UV", "Nivel UV", "Temperatura (°C)", "Humedad (%)", "Presión (Pa)"]
+GAPS_HEADER = ["Estación", "Desde", "Hasta", "Duración (s)", "Motivo"]
+GAPS_SHEET = "Desconexiones"
+
+MAX_SHEET_ROWS = 1048576   # filas de una hoja de Excel, encabezado incluido
+SHEET_TITLE_MAX = 31
+
+# Caracteres que Excel no admite en el nombre de una hoja
+_SHEET_CHARS = str.maketrans(":/\\?*[]", "-------")
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def sheet_title(name, index, count, part=1):
+    """Nombre de hoja válido (máx. 31 caracteres y único entre estaciones).
+
+    ``part`` > 1 numera las hojas que continúan una estación: "<estación> (2)".
+    """
+    prefix = "" if count == 1 else f"{index + 1}-"
+    suffix = "" if part == 1 else f" ({part})"
+    title = name.translate(_SHEET_CHARS)[:SHEET_TITLE_MAX - len(prefix) - len(suffix)]
+    return f"{prefix}{title}{suffix}"
+
+
+def _unique_title(title, used):
+    """``title`` o una variante "~n" que no esté en ``used`` (Excel ignora mayúsculas)"""
+    base, n = title, 2
+    while title.lower() in used:
+        tail = f"~{n}"
+        title = base[:SHEET_TITLE_MAX - len(tail)] + tail
+        n += 1
+    used.add(title.lower())
+    return title
+
+
+def iter_rows(chunk):
+    """Filas de Excel de un bloque de columnas: números reales y vacío si falta"""
+    columns = [chunk[name].tolist() for name in ("time", "uv", "temp", "hum", "pres")]
+    for ts, uv, t, h, p in zip(*columns):
+        valid_uv = uv == uv
+        yield [
+            datetime.fromtimestamp(ts),
+            uv if valid_uv else None,
+            uv_level_word(uv) if valid_uv else None,
+            t if t == t else None,
+            h if h == h else None,
+            p if p == p else None,
+        ]
+
+
+def _discard(wb, tmp_path):
+    """Descarta un libro a medio escribir.
+
+    Guardarlo es la forma pública de cerrar las hojas de solo escritura y
+    borrar sus temporales; lo guardado va a ``tmp_path`` y se borra.
+    """
+    try:
+        wb.save(tmp_path)
+    except Exception as e:
+        print(f"Error al descartar el libro: {e}")
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+
+def export_xlsx(path, stores, progress=None, cancelled=None, chunk_size=8192, sheet_rows=MAX_SHEET_ROWS):
+    """Escribe una hoja por estación con un libro de solo escritura.
+
+    Las filas se vuelcan a disco a medida que se generan, así que la
+    memoria no crece con la sesión. Una estación que no cabe en una hoja
+    (``sheet_rows`` filas con el encabezado) sigue en "<estación> (2)",
+    etc. Si alguna fuente tiene ``gaps`` (desconexiones) se añade la hoja
+    "Desconexiones" con cada periodo sin datos.
+    ``progress(hechas, total)`` se llama por bloque y
+    ``cancelled()`` se consulta entre bloques; al cancelar se lanza
+    ``ExportCancelled``. Se escribe en un temporal junto a ``path`` que
+    solo al terminar lo reemplaza: cancelar no deja un archivo a medias ni
+    toca uno anterior.
+    """
+    # openpyxl solo se carga al exportar (tarda en importarse)
+    from openpyxl import Workbook
+
+    total = sum(store.session_length() for store in stores.values())
+    done = 0
+    tmp_path = f"{path}.tmp"
+
+    wb = Workbook(write_only=True)
+    # La hoja de desconexiones conserva su nombre; las estaciones se ajustan
+    used = {GAPS_SHEET.lower()}
+
+    def new_sheet(name, index, part):
+        ws = wb.create_sheet(_unique_title(sheet_title(name, index, len(stores), part), used))
+        ws.append(HEADER)
+        return ws
+
+    try:
+        for i, (name, store) in enumerate(stores.items()):
+            part = 1
+            ws = new_sheet(name, i, part)
+            room = sheet_rows - 1
+
+            for chunk in store.iter_chunks(chunk_size):
+                if cancelled and cancelled():
+                    raise ExportCancelled()
+                for row in iter_rows(chunk):
+                    if not room:
+                        part += 1
+                        ws = new_sheet(name, i, part)
+                        room = sheet_rows - 1
+                    ws.append(row)
+                    room -= 1
+                done += len(chunk["time"])
+                if progress:
+                    progress(done, total)
+
+        gaps = [(name, gap) for name, store in stores.items() for gap in getattr(store, "gaps", ())]
+        if gaps:
+            ws = wb.create_sheet(GAPS_SHEET)
+            ws.append(GAPS_HEADER)
+            for name, (start, end, reason) in gaps:
+                ws.append([name, datetime.fromtimestamp(start), datetime.fromtimestamp(end),
+                           round(end - start, 1), reason])
+    except BaseException:
+        _discard(wb, tmp_path)
+        raise
+
+    try:
+        wb.save(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return done
@@ -0,0 +1,207 @@
+"""Tramas binarias de la estación (``FORMAT,BIN``) y su decodificación vectorizada.
+
+Cada trama ocupa 24 bytes, little-endian y sin relleno::
+
+    sync   u16  0x5AA5 (bytes A5 5A)
+    seq    u32  número de secuencia del dispositivo
+    t_ms   u32  millis() al tomar la muestra
+    valid  u8   bit0 UV, bit1 temperatura, bit2 humedad, bit3 presión, bit4 ADC de UV
+    uv     u8   índice UV
+    temp   i16  temperatura en décimas de °C
+    hum    u16  humedad en décimas de %
+    pres   u32  presión en Pa
+    uv_adc u16  lectura cruda del ADC del sensor UV (0..4095)
+    crc    u16  CRC-16/CCITT-FALSE de los bytes 2..21
+
+Debe coincidir con ``DataFrame`` en el sketch.
+"""
+
+import binascii
+import struct
+
+import numpy as np
+
+from .protocol import SAMPLE_DTYPE
+
+
+FRAME_SYNC = b"\xa5\x5a"
+FRAME_STRUCT = struct.Struct("<2sIIBBhHIHH")
+FRAME_SIZE = FRAME_STRUCT.size
+
+FRAME_DTYPE = np.dtype([
+    ("sync", "<u2"),
+    ("seq", "<u4"),
+    ("t_ms", "<u4"),
+    ("valid", "u1"),
+    ("uv", "u1"),
+    ("temp", "<i2"),
+    ("hum", "<u2"),
+    ("pres", "<u4"),
+    ("uv_adc", "<u2"),
+    ("crc", "<u2"),
+])
+assert FRAME_DTYPE.itemsize == FRAME_SIZE
+
+VALID_UV, VALID_TEMP, VALID_HUM, VALID_PRES, VALID_UV_ADC = 1, 2, 4, 8, 16
+
+_CRC_OFFSET = 2
+_CRC_END = FRAME_SIZE - 2
+
+
+def _crc_table():
+    table = np.zeros(256, dtype=np.uint16)
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table[i] = crc & 0xFFFF
+    return table
+
+
+CRC_TABLE = _crc_table()
+CRC_VECTOR_MIN = 256   # filas desde las que crc16_rows usa el bucle vectorizado
+
+
+def crc16(data):
+    """CRC-16/CCITT-FALSE de un bloque de bytes"""
+    crc = 0xFFFF
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ int(CRC_TABLE[((crc >> 8) ^ byte) & 0xFF])
+    return crc
+
+
+def crc16_rows(rows):
+    """CRC de cada fila de una matriz (N, k) de uint8.
+
+    Los lotes chicos (lo normal en vivo) van trama a trama con
+    ``binascii.crc_hqx``; el bucle vectorizado sobre N solo compensa en
+    lotes grandes como una descarga DUMP.
+    """
+    if len(rows) < CRC_VECTOR_MIN:
+        data = rows.tobytes()
+        k = rows.shape[1]
+        return np.fromiter(
+            (binascii.crc_hqx(data[i:i + k], 0xFFFF) for i in range(0, len(data), k)),
+            dtype=np.uint16, count=len(rows),
+        )
+    crc = np.full(len(rows), 0xFFFF, dtype=np.uint16)
+    for col in range(rows.shape[1]):
+        idx = ((crc >> 8) ^ rows[:, col]) & 0xFF
+        crc = (crc << 8) ^ CRC_TABLE[idx]
+    return crc
+
+
+def encode_frame(seq, t_ms, uv=None, temp=None, hum=None, pres=None, uv_adc=None):
+    """Construye una trama; ``None`` marca el sensor como no disponible"""
+    valid = 0
+    if uv is not None:
+        valid |= VALID_UV
+    if temp is not None:
+        valid |= VALID_TEMP
+    if hum is not None:
+        valid |= VALID_HUM
+    if pres is not None:
+        valid |= VALID_PRES
+    if uv_adc is not None:
+        valid |= VALID_UV_ADC
+
+    body = FRAME_STRUCT.pack(
+        FRAME_SYNC, seq & 0xFFFFFFFF, t_ms & 0xFFFFFFFF, valid,
+        int(uv or 0), round((temp or 0) * 10), round((hum or 0) * 10), round(pres or 0), int(uv_adc or 0), 0,
+    )
+    return body[:_CRC_END] + struct.pack("<H", crc16(body[_CRC_OFFSET:_CRC_END]))
+
+
+def frames_to_samples(frames):
+    """Convierte tramas crudas en muestras con NaN donde falta el sensor"""
+    out = np.empty(len(frames), dtype=SAMPLE_DTYPE)
+    out["seq"] = frames["seq"]
+    out["t_ms"] = frames["t_ms"]
+
+    valid = frames["valid"]
+    out["uv"] = np.where(valid & VALID_UV, frames["uv"], np.nan)
+    out["temp"] = np.where(valid & VALID_TEMP, frames["temp"] / 10.0, np.nan)
+    out["hum"] = np.where(valid & VALID_HUM, frames["hum"] / 10.0, np.nan)
+    out["pres"] = np.where(valid & VALID_PRES, frames["pres"], np.nan)
+    out["time"] = np.nan
+    out["uv_adc"] = np.where(valid & VALID_UV_ADC, frames["uv_adc"], np.nan)
+    for name in ("uv", "temp", "hum", "pres"):
+        out[f"{name}_raw"] = out[name]
+    return out
+
+
+class FrameDecoder:
+    """Extrae todas las tramas válidas de cada lectura de una sola vez.
+
+    Localiza los bytes de sincronía, valida el CRC de todos los candidatos
+    en bloque y conserva la trama incompleta del final para la próxima
+    lectura. Los saltos en ``seq`` se acumulan en ``dropped``.
+    """
+
+    def __init__(self):
+        self._pending = b""
+        self.last_seq = None
+        self.dropped = 0
+        self.corrupted = 0
+
+    def feed(self, data):
+        buf = self._pending + data
+        raw = np.frombuffer(buf, dtype=np.uint8)
+        n = len(raw)
+
+        if n < FRAME_SIZE:
+            self._pending = buf
+            return frames_to_samples(np.empty(0, dtype=FRAME_DTYPE))
+
+        # Camino rápido: tramas contiguas y alineadas desde el inicio
+        count = n // FRAME_SIZE
+        frames = np.frombuffer(buf, dtype=FRAME_DTYPE, count=count)
+        if np.all(frames["sync"] == 0x5AA5):
+            rows = raw[:count * FRAME_SIZE].reshape(count, FRAME_SIZE)
+            ok = crc16_rows(rows[:, _CRC_OFFSET:_CRC_END]) == frames["crc"]
+            if ok.all():
+                self._pending = buf[count * FRAME_SIZE:]
+                return self._accept(frames)
+
+        # Camino general: buscar sincronías en cualquier posición
+        cand = np.flatnonzero((raw[:-1] == 0xA5) & (raw[1:] == 0x5A))
+        complete = cand[cand + FRAME_SIZE <= n]
+        incomplete = cand[cand + FRAME_SIZE > n]
+
+        if len(complete):
+            rows = raw[complete[:, None] + np.arange(FRAME_SIZE)]
+            stored = rows[:, _CRC_END].astype(np.uint16) | (rows[:, _CRC_END + 1].astype(np.uint16) << 8)
+            ok = crc16_rows(rows[:, _CRC_OFFSET:_CRC_END]) == stored
+            starts = complete[ok]
+            # Descartar coincidencias falsas dentro de otra trama
+            starts = starts[np.diff(starts, prepend=-FRAME_SIZE) >= FRAME_SIZE]
+            self.corrupted += int(np.count_nonzero(~ok))
+            frames = rows[ok][np.isin(complete[ok], starts)].copy().view(FRAME_DTYPE).ravel()
+            end = int(starts[-1]) + FRAME_SIZE if len(starts) else 0
+        else:
+            frames = np.empty(0, dtype=FRAME_DTYPE)
+            end = 0
+
+        # Conservar desde la primera trama que aún no llega completa
+        tail = [int(i) for i in incomplete if i >= end]
+        if tail:
+            self._pending = buf[tail[0]:]
+        elif raw[-1] == 0xA5:
+            self._pending = buf[-1:]
+        else:
+            self._pending = b""
+
+        return self._accept(frames)
+
+    def _accept(self, frames):
+        if len(frames):
+            seq = frames["seq"].astype(np.int64)
+            prev = self.last_seq if self.last_seq is not None else seq[0] - 1
+            gaps = np.diff(seq, prepend=prev) - 1
+            self.dropped += int(gaps[gaps > 0].sum())
+            self.last_seq = int(seq[-1])
+        return frames_to_samples(frames)
+
+    def clear(self):
+        self._pending = b""
+        self.last_seq = None
@@ -0,0 +1,351 @@
+"""Servidor HTTP de datos en vivo para tableros remotos (solo biblioteca estándar).
+
+Republica las muestras ya procesadas por la app (o la CLI); no consulta a
+las estaciones, así que da igual cuántos visores haya: la ESP32 sigue
+atendiendo a un solo cliente.
+
+Rutas (todas GET, con CORS abierto)::
+
+    /                      tablero mínimo en HTML
+    /api/stations          estado y última muestra de cada estación
+    /api/history?station=N&seconds=600&points=1000[&since=epoch]
+    /api/events[?station=N]    Server-Sent Events: samples, status, gap, alert
+
+Cada visor tiene una cola acotada: si no lee a tiempo se descartan sus
+mensajes más viejos (y se le avisa con un evento ``dropped``); nunca se
+frena la adquisición ni a los demás visores.
+"""
+
+import asyncio
+import collections
+import json
+import threading
+import urllib.parse
+
+import numpy as np
+
+from .store import VARIABLES, SampleStore
+
+
+DEFAULT_LIVE_PORT = 8765
+HISTORY_CAPACITY = 1 << 16   # muestras por estación (~22 min a 50 Hz, ~18 h a 1 Hz)
+CLIENT_QUEUE = 256           # mensajes pendientes por visor antes de descartar
+HEARTBEAT_S = 15.0           # comentario SSE si no hay nada que enviar
+STALL_S = 30.0               # un visor que no acepta datos en este tiempo se desconecta
+REQUEST_TIMEOUT = 10.0
+MAX_POINTS = 5000
+
+
+def json_column(values):
+    """Lista JSON de una columna: NaN (sensor no detectado) -> null"""
+    return [v if v == v else None for v in np.asarray(values).tolist()]
+
+
+def sse_event(event, data):
+    """Mensaje SSE ya codificado (se codifica una vez y se reparte a todos)"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return f"event: {event}\ndata: {payload}\n\n".encode()
+
+
+class _Viewer:
+    """Un cliente de /api/events con su cola acotada"""
+
+    def __init__(self, station=None):
+        self.station = station
+        self.queue = collections.deque(maxlen=CLIENT_QUEUE)
+        self.ready = asyncio.Event()
+        self.dropped = 0
+
+    def put(self, station, message):
+        if self.station and station != self.station:
+            return
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(message)
+        self.ready.set()
+
+
+class LiveServer:
+    """Reparte las muestras procesadas a los visores por HTTP/SSE.
+
+    ``publish``, ``status``, ``gap`` y ``alert`` se pueden llamar desde
+    cualquier hilo; todo lo demás corre en el hilo propio del servidor.
+    Guarda un historial reciente por estación para ``/api/history``.
+    """
+
+    def __init__(self, host="0.0.0.0", port=DEFAULT_LIVE_PORT, history=HISTORY_CAPACITY):
+        self.host = host
+        self.port = port
+        self.history = history
+        self.stores = {}    # nombre -> SampleStore con lo más reciente
+        self.states = {}    # nombre -> (estado, detalle)
+        self.viewers = set()
+        self.closing = False
+        self.server = None
+        self.loop = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host = "localhost" if self.host in ("0.0.0.0", "", "::") else self.host
+        return f"http://{host}:{self.port}/"
+
+    # -------- hilo propio --------
+    def start(self):
+        """Arranca el hilo y abre el puerto; lanza OSError si no se puede"""
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="climalab-live", daemon=True)
+        self._thread.start()
+        try:
+            asyncio.run_coroutine_threadsafe(self._listen(), self.loop).result(5)
+        except BaseException:
+            self.shutdown()
+            raise
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        self.loop.close()
+
+    async def _listen(self):
+        self.closing = False
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def shutdown(self, timeout=5.0):
+        if not self._thread:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close(), self.loop).result(timeout)
+        except Exception as e:
+            print(f"Error cerrando el servidor en vivo: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+        self.loop = None
+
+    async def _close(self):
+        if self.server:
+            self.server.close()
+        # Los visores terminan solos al despertar; solo se cancela lo que no termine
+        self.closing = True
+        for viewer in self.viewers:
+            viewer.ready.set()
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=1.0)
+            for task in pending:
+                task.cancel()
+
+    def _call(self, func, *args):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(func, *args)
+
+    # -------- publicación (desde cualquier hilo) --------
+    def publish(self, station, rows):
+        """Bloque de filas procesadas (columnas de ``SampleStore``, hora ya calculada)"""
+        self._call(self._publish, station, rows)
+
+    def status(self, station, state, detail=""):
+        self._call(self._status, station, state, str(detail))
+
+    def gap(self, station, start, end, reason=""):
+        self._call(self._gap, station, float(start), float(end), reason)
+
+    def alert(self, station, label, variable, active, value):
+        data = {"station": station, "label": label, "variable": variable,
+                "active": bool(active), "value": float(value)}
+        self._call(self._broadcast, station, sse_event("alert", data))
+
+    def clear(self):
+        """Olvida el historial (p. ej. al reiniciar la app)"""
+        self._call(self._clear)
+
+    # -------- en el hilo del servidor --------
+    def _store(self, station):
+        store = self.stores.get(station)
+        if store is None:
+            store = self.stores[station] = SampleStore(self.history)
+        return store
+
+    def _publish(self, station, rows):
+        self._store(station).append_rows(rows)
+        if not self.viewers:
+            return
+        data = {"station": station}
+        data.update({name: json_column(rows[name]) for name in ("time",) + VARIABLES})
+        self._broadcast(station, sse_event("samples", data))
+
+    def _status(self, station, state, detail):
+        # "dropped" y "recovered" son avisos, no cambian el estado de la estación
+        if state not in ("dropped", "recovered"):
+            self.states[station] = (state, detail)
+        self._broadcast(station, sse_event("status", {"station": station, "state": state, "detail": detail}))
+
+    def _gap(self, station, start, end, reason):
+        self._store(station).add_gap(start, end, reason)
+        data = {"station": station, "start": start, "end": end, "reason": reason}
+        self._broadcast(station, sse_event("gap", data))
+
+    def _clear(self):
+        self.stores.clear()
+        self.states.clear()
+
+    def _broadcast(self, station, message):
+        for viewer in self.viewers:
+            viewer.put(station, message)
+
+    # -------- HTTP --------
+    async def _handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), REQUEST_TIMEOUT)
+            method, target, _ = request.split(b"\r\n", 1)[0].decode("latin-1").split(" ", 2)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+                ConnectionError, ValueError):
+            writer.close()
+            return
+
+        url = urllib.parse.urlsplit(target)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        try:
+            if method != "GET":
+                self._respond(writer, 405, {"error": "Solo GET"})
+            elif url.path == "/api/events":
+                await self._stream(writer, query.get("station"))
+            elif url.path == "/api/stations":
+                self._respond(writer, 200, self._stations())
+            elif url.path == "/api/history":
+                self._respond(writer, *self._history(query))
+            elif url.path in ("/", "/index.html"):
+                self._respond(writer, 200, DASHBOARD.encode(), "text/html; charset=utf-8")
+            else:
+                self._respond(writer, 404, {"error": "Ruta desconocida"})
+            await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, writer, code, body, content_type="application/json"):
+        if not isinstance(body, bytes):
+            body = json.dumps(body, ensure_ascii=False).encode()
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}[code]
+        writer.write(
+            f"HTTP/1.1 {code} {reason}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nAccess-Control-Allow-Origin: *\r\n"
+            "Cache-Control: no-cache\r\nConnection: close\r\n\r\n".encode() + body
+        )
+
+    async def _stream(self, writer, station):
+        """Envía eventos hasta que el visor se va o deja de leer"""
+        writer.transport.set_write_buffer_limits(high=64 * 1024)
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+            b"Access-Control-Allow-Origin: *\r\nConnection: keep-alive\r\n\r\nretry: 3000\n\n"
+        )
+        viewer = _Viewer(station)
+        # Primero el estado actual, para que el tablero arranque completo
+        for name, (state, detail) in self.states.items():
+            viewer.put(name, sse_event("status", {"station": name, "state": state, "detail": detail}))
+        self.viewers.add(viewer)
+        try:
+            while not self.closing:
+                try:
+                    await asyncio.wait_for(viewer.ready.wait(), HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    writer.write(b": ping\n\n")   # mantiene viva la conexión y detecta visores idos
+                viewer.ready.clear()
+                if viewer.dropped:
+                    writer.write(sse_event("dropped", {"count": viewer.dropped}))
+                    viewer.dropped = 0
+                while viewer.queue:
+                    writer.write(viewer.queue.popleft())
+                # Mientras espera, solo se llena (y recorta) su propia cola
+                await asyncio.wait_for(writer.drain(), STALL_S)
+        except asyncio.TimeoutError:
+            print("Visor en vivo desconectado: no leía los datos")
+        finally:
+            self.viewers.discard(viewer)
+
+    def _stations(self):
+        stations = {}
+        for name in set(self.stores) | set(self.states):
+            state, detail = self.states.get(name, ("", ""))
+            store = self.stores.get(name)
+            last = store.last() if store is not None else None
+            stations[name] = {
+                "state": state,
+                "detail": detail,
+                "samples": store.total if store is not None else 0,
+                "last": {k: (float(v) if v == v else None) for k, v in last.items()} if last else None,
+            }
+        return {"stations": stations, "viewers": len(self.viewers)}
+
+    def _history(self, query):
+        """Lo más reciente de una estación, diezmado a ``points`` como mucho"""
+        station = query.get("station") or next(iter(self.stores), None)
+        store = self.stores.get(station)
+        if store is None or not len(store):
+            return 404, {"error": f"Sin datos de la estación {station}"}
+        try:
+            seconds = float(query.get("seconds", 600))
+            points = min(max(int(query.get("points", 1000)), 1), MAX_POINTS)
+            since = float(query["since"]) if "since" in query else None
+        except ValueError as e:
+            return 400, {"error": str(e)}
+
+        times = store.column("time")
+        start = times[-1] - seconds
+        if since is not None:
+            start = max(start, np.nextafter(since, np.inf))
+        first = int(np.searchsorted(times, start))
+        step = max(-(-(len(times) - first) // points), 1)
+        sel = slice(first, None, step)
+
+        data = {"station": station, "step": step}
+        data.update({name: json_column(store.column(name)[sel]) for name in ("time",) + VARIABLES})
+        data["gaps"] = [list(gap) for gap in store.gaps if gap[1] >= start]
+        return 200, data
+
+
+DASHBOARD = """<!DOCTYPE html>
+<html lang="es"><head><meta charset="utf-8"><title>ClimaLab en vivo</title>
+<style>
+body{font-family:sans-serif;background:#F3E5F5;color:#4A148C;margin:2em}
+table{border-collapse:collapse;background:white}
+td,th{padding:.5em 1em;border:1px solid #D1C4E9;text-align:right}
+.alert{background:#FFEBEE;color:#C62828}
+</style></head><body>
+<h2>🌦️ ClimaLab en vivo</h2>
+<table><thead><tr><th>Estación</th><th>Estado</th><th>Hora</th><th>UV</th>
+<th>Temp (°C)</th><th>Hum (%)</th><th>Pres (Pa)</th></tr></thead><tbody id="rows"></tbody></table>
+<p id="log"></p>
+<script>
+const rows = {}, fmt = v => v === null || v === undefined ? "—" : v.toFixed(1);
+function row(name) {
+  if (!rows[name]) {
+    const tr = document.createElement("tr");
+    tr.innerHTML = "<td></td>".repeat(7);
+    tr.cells[0].textContent = name;
+    document.getElementById("rows").appendChild(tr);
+    rows[name] = tr;
+  }
+  return rows[name];
+}
+const es = new EventSource("/api/events");
+es.addEventListener("samples", e => {
+  const d = JSON.parse(e.data), i = d.time.length - 1, c = row(d.station).cells;
+  c[2].textContent = new Date(d.time[i] * 1000).toLocaleTimeString();
+  ["uv", "temp", "hum", "pres"].forEach((k, j) => c[3 + j].textContent = fmt(d[k][i]));
+});
+es.addEventListener("status", e => {
+  const d = JSON.parse(e.data);
+  row(d.station).cells[1].textContent = d.state;
+});
+es.addEventListener("alert", e => {
+  const d = JSON.parse(e.data);
+  row(d.station).classList.toggle("alert", d.active);
+  document.getElementById("log").textContent = (d.active ? "⚠️ " : "✔️ ") + d.station + ": " + d.label;
+});
+</script></body></html>
+"""
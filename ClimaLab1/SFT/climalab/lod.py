@@ -0,0 +1,160 @@
+"""Resúmenes min/max por nivel de zoom para dibujar series largas.
+
+Cada variable tiene una pirámide de niveles: el nivel 0 agrupa
+``base`` muestras por cubeta y cada nivel siguiente agrupa ``factor``
+cubetas del anterior. Las muestras nuevas solo recalculan la última
+cubeta de cada nivel, y una consulta elige el nivel cuyo número de
+cubetas se acerca al ancho en píxeles, así que los puntos dibujados no
+dependen de la longitud del historial.
+"""
+
+import numpy as np
+
+
+class _Level:
+    """Mínimos y máximos por cubeta, indexados por número absoluto de cubeta."""
+
+    def __init__(self, size):
+        self.size = size
+        self.reset()
+
+    def reset(self):
+        self.first = 0        # primera cubeta guardada
+        self.end = 0          # una después de la última
+        self._start = 0       # posición de ``first`` en los arreglos
+        self.mins = np.empty(0)
+        self.maxs = np.empty(0)
+
+    def write(self, b0, mins, maxs):
+        """Escribe las cubetas [b0, b0 + len) reemplazando las existentes"""
+        if self.end == self.first:
+            self.first = self.end = b0
+            self._start = 0
+
+        b1 = b0 + len(mins)
+        needed = self._start + (b1 - self.first)
+        if needed > len(self.mins):
+            count = self.end - self.first
+            size = max(2 * (b1 - self.first), 64)
+            for attr in ("mins", "maxs"):
+                old = getattr(self, attr)
+                new = np.empty(size)
+                new[:count] = old[self._start:self._start + count]
+                setattr(self, attr, new)
+            self._start = 0
+
+        i = self._start + (b0 - self.first)
+        self.mins[i:i + len(mins)] = mins
+        self.maxs[i:i + len(maxs)] = maxs
+        self.end = max(self.end, b1)
+
+    def trim(self, first):
+        """Olvida las cubetas anteriores a ``first`` (búfer circular)"""
+        if first <= self.first:
+            return
+        if first >= self.end:
+            self.reset()
+            return
+        self._start += first - self.first
+        self.first = first
+
+    def get(self, b0, b1):
+        b0 = max(b0, self.first)
+        b1 = min(b1, self.end)
+        i0 = self._start + (b0 - self.first)
+        i1 = self._start + max(b1 - self.first, b0 - self.first)
+        return b0, self.mins[i0:i1], self.maxs[i0:i1]
+
+
+def _reduce(values, first, size):
+    """min/max (ignorando NaN) por cubeta de ``size`` de ``values``, que empieza
+    en el índice absoluto ``first``; devuelve la primera cubeta y los arreglos"""
+    b0 = first // size
+    edges = np.arange((b0 + 1) * size, first + len(values), size) - first
+    starts = np.concatenate(([0], edges)).astype(np.intp)
+    return b0, np.fmin.reduceat(values, starts), np.fmax.reduceat(values, starts)
+
+
+class LevelOfDetail:
+    """Pirámides min/max de las columnas de un ``SampleStore``."""
+
+    def __init__(self, store, names, base=8, factor=4):
+        self.store = store
+        self.names = tuple(names)
+        self.factor = factor
+
+        sizes = [base]
+        while sizes[-1] < store.capacity:
+            sizes.append(sizes[-1] * factor)
+        self.levels = {name: [_Level(s) for s in sizes] for name in self.names}
+        self.seen = 0
+
+    def reset(self):
+        for levels in self.levels.values():
+            for level in levels:
+                level.reset()
+        self.seen = 0
+
+    def update(self):
+        """Incorpora las muestras llegadas desde la última llamada"""
+        store = self.store
+        total, first = store.total, store.first_index
+        if total < self.seen:
+            self.reset()
+        if total == self.seen or not len(store):
+            return
+
+        for name in self.names:
+            levels = self.levels[name]
+
+            # Nivel 0: desde el inicio de la cubeta que quedó a medias
+            base = levels[0].size
+            start = max((self.seen // base) * base, first)
+            b0, mins, maxs = _reduce(store.range(name, start, total), start, base)
+            levels[0].write(b0, mins, maxs)
+
+            # Niveles superiores: solo las cubetas afectadas
+            for lower, level in zip(levels, levels[1:]):
+                lo_first = max((b0 // self.factor) * self.factor, lower.first)
+                _, lo_mins, lo_maxs = lower.get(lo_first, lower.end)
+                b0, mins, _ = _reduce(lo_mins, lo_first, self.factor)
+                _, _, maxs = _reduce(lo_maxs, lo_first, self.factor)
+                level.write(b0, mins, maxs)
+
+            for level in levels:
+                level.trim(first // level.size)
+
+        self.seen = total
+
+    def view(self, name, x0, x1, width):
+        """Puntos (x, y) a dibujar para el rango absoluto [x0, x1) en ``width`` píxeles"""
+        store = self.store
+        x0 = max(int(x0), store.first_index)
+        x1 = min(int(np.ceil(x1)), store.total)
+        span = x1 - x0
+        if span <= 0:
+            return np.empty(0), np.empty(0)
+
+        # Pocos puntos: se dibujan tal cual
+        if span <= width:
+            return np.arange(x0, x1), store.range(name, x0, x1)
+
+        # Dos puntos (mínimo y máximo) por cubeta, como mucho ~``width`` en total
+        for level in self.levels[name]:
+            if span / level.size <= width / 2:
+                break
+
+        size = level.size
+        b0, mins, maxs = level.get(x0 // size, -(-x1 // size))
+        bx = (b0 + np.arange(len(mins))) * size
+        x = np.column_stack((bx, bx + size / 2)).ravel()
+        y = np.column_stack((mins, maxs)).ravel()
+        return x, y
+
+    def bounds(self, name):
+        """(mínimo, máximo) de toda la serie en memoria desde el nivel más grueso"""
+        level = self.levels[name][-1]
+        _, mins, maxs = level.get(level.first, level.end)
+        if not len(mins) or np.isnan(mins).all():
+            return None
+        return np.nanmin(mins), np.nanmax(maxs)
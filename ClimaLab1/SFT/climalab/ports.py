@@ -0,0 +1,187 @@
+"""Descubrimiento de puertos serie con detección de conexión/desconexión.
+
+``PortWatcher`` corre en su propio hilo: en Linux espera eventos de udev
+(si ``pyudev`` está instalado) y en cualquier otro caso vuelve a listar los
+puertos cada pocos segundos. Los puertos con VID/PID de los adaptadores
+USB habituales de la ESP32 se confirman enviando ``DATA``.
+"""
+
+import threading
+import time
+
+from .protocol import DATA_CMD, is_data_line
+
+
+# (VID, PID) de los puentes USB-serie que traen las placas ESP32
+ESP32_USB_IDS = {
+    (0x10C4, 0xEA60): "CP210x",
+    (0x1A86, 0x7523): "CH340",
+    (0x1A86, 0x55D4): "CH9102",
+    (0x0403, 0x6001): "FT232",
+    (0x303A, 0x1001): "ESP32 USB nativo",
+}
+
+POLL_INTERVAL = 2.0
+
+
+class PortInfo:
+    """Un puerto serie visto por el sistema"""
+
+    def __init__(self, device, description="", vid=None, pid=None):
+        self.device = device
+        self.description = description
+        self.vid = vid
+        self.pid = pid
+        self.station = None   # True/False tras sondear con DATA; None = sin sondear
+
+    @property
+    def chip(self):
+        return ESP32_USB_IDS.get((self.vid, self.pid))
+
+    @property
+    def is_candidate(self):
+        return self.chip is not None
+
+    def __repr__(self):
+        return f"PortInfo({self.device!r}, chip={self.chip!r}, station={self.station!r})"
+
+
+def list_ports():
+    """Puertos presentes; los candidatos a ESP32 primero"""
+    import serial.tools.list_ports
+
+    ports = [
+        PortInfo(p.device, p.description or "", p.vid, p.pid)
+        for p in serial.tools.list_ports.comports()
+    ]
+    ports.sort(key=lambda p: (not p.is_candidate, p.device))
+    return ports
+
+
+def probe(device, timeout=2.5, baudrate=115200):
+    """True si en ``device`` responde una estación al comando DATA.
+
+    Se abre sin activar DTR/RTS para no reiniciar la placa; si aun así se
+    reinicia, se repite DATA hasta ``timeout`` mientras termina de arrancar.
+    """
+    import serial
+
+    conn = serial.Serial()
+    conn.port = device
+    conn.baudrate = baudrate
+    conn.timeout = 0.2
+    conn.dtr = False
+    conn.rts = False
+    try:
+        conn.open()
+    except (OSError, serial.SerialException):
+        return False
+
+    try:
+        deadline = time.monotonic() + timeout
+        buffer = b""
+        while time.monotonic() < deadline:
+            conn.write(DATA_CMD)
+            end = min(time.monotonic() + 0.5, deadline)
+            while time.monotonic() < end:
+                buffer += conn.read(conn.in_waiting or 1)
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    if is_data_line(line.decode(errors="ignore").strip()):
+                        return True
+        return False
+    except (OSError, serial.SerialException):
+        return False
+    finally:
+        conn.close()
+
+
+class PortWatcher:
+    """Avisa con ``on_change(puertos)`` cada vez que cambia la lista de puertos.
+
+    ``busy()`` devuelve los dispositivos que ya están en uso (no se
+    sondean). ``rescan()`` fuerza una revisión inmediata.
+    """
+
+    def __init__(self, on_change, busy=None, interval=POLL_INTERVAL, probe_ports=True):
+        self.on_change = on_change
+        self.busy = busy or (lambda: ())
+        self.interval = interval
+        self.probe_ports = probe_ports
+        self.ports = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._monitor = None
+
+    def start(self):
+        if self._thread:
+            return
+        self._monitor = self._udev_monitor()
+        self._thread = threading.Thread(target=self._run, name="climalab-ports", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(self.interval + 1)
+            self._thread = None
+
+    def rescan(self):
+        self.ports = {}   # se vuelve a informar aunque no haya cambios
+        self._wake.set()
+
+    def _udev_monitor(self):
+        """Monitor de udev para el subsistema tty, o None si no hay pyudev"""
+        try:
+            import pyudev
+        except ImportError:
+            return None
+        try:
+            monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+            monitor.filter_by("tty")
+            monitor.start()
+            return monitor
+        except Exception as e:
+            print(f"udev no disponible, se sondea periódicamente: {e}")
+            return None
+
+    def _wait(self):
+        """Espera un evento de udev, un rescan() o a que pase el intervalo"""
+        if self._monitor is None:
+            self._wake.wait(self.interval)
+        else:
+            # poll() corta en cuanto llega un evento; luego se deja que se
+            # asiente el dispositivo (el nodo /dev aparece algo después)
+            deadline = time.monotonic() + self.interval
+            while not self._wake.is_set() and time.monotonic() < deadline:
+                if self._monitor.poll(timeout=0.25) is not None:
+                    time.sleep(0.3)
+                    break
+        self._wake.clear()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._scan()
+            except Exception as e:
+                print(f"Error actualizando puertos: {e}")
+                self.on_change(None)
+            self._wait()
+
+    def _scan(self):
+        current = {p.device: p for p in list_ports()}
+        if current.keys() == self.ports.keys():
+            return
+
+        busy = set(self.busy())
+        for device, port in current.items():
+            known = self.ports.get(device)
+            if known is not None:
+                port.station = known.station
+            elif self.probe_ports and port.is_candidate and device not in busy:
+                port.station = probe(device)
+
+        self.ports = current
+        self.on_change(list(current.values()))
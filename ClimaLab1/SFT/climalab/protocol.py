@@ -0,0 +1,173 @@
+"""Protocolo de la estación: comandos, framing por líneas y paquetes de texto."""
+
+import numpy as np
+
+
+DATA_CMD = b"DATA\n"
+STOP_CMD = b"STOP\n"
+FORMAT_BIN_CMD = b"FORMAT,BIN\n"
+FORMAT_TXT_CMD = b"FORMAT,TXT\n"
+# Con RAW,ON los paquetes de texto agregan la lectura del ADC de UV
+RAW_ON_CMD = b"RAW,ON\n"
+
+# Muestra ya interpretada; seq/t_ms valen -1 si el paquete no los trae.
+# ``time`` (epoch s) lo completa el motor a partir de t_ms; NaN = sin fechar.
+# ``*_raw`` guardan lo que mandó el firmware y ``uv_adc`` la lectura del
+# ADC (NaN si no vino); la calibración reescribe las variables a partir de ellos
+SAMPLE_DTYPE = np.dtype([
+    ("seq", "<i8"),
+    ("t_ms", "<i8"),
+    ("uv", "<f8"),
+    ("temp", "<f8"),
+    ("hum", "<f8"),
+    ("pres", "<f8"),
+    ("time", "<f8"),
+    ("uv_adc", "<f8"),
+    ("uv_raw", "<f8"),
+    ("temp_raw", "<f8"),
+    ("hum_raw", "<f8"),
+    ("pres_raw", "<f8"),
+])
+
+# Respuestas de control que no son paquetes de datos
+CONTROL_PREFIXES = ("OK_", "ERR_")
+
+
+def stream_cmd(period_ms):
+    """Comando para que la estación envíe un paquete cada ``period_ms``"""
+    return f"STREAM,{int(period_ms)}\n".encode()
+
+
+# DUMP con este valor solo devuelve la cabecera (qué hay en el registro)
+DUMP_HEAD_ONLY = 0xFFFFFFFF
+
+
+def dump_cmd(since_seq):
+    """Pide los registros guardados en la estación con seq > ``since_seq``"""
+    return f"DUMP,{int(since_seq)}\n".encode()
+
+
+def parse_dump_header(line):
+    """``OK_DUMP,n,último_seq,su_millis,periodo_ms,millis`` -> tupla de enteros, o None si es inválida"""
+    if not line.startswith("OK_DUMP,"):
+        return None
+    try:
+        count, head_seq, head_ms, period_ms, now_ms = (int(v) for v in line.split(",")[1:6])
+    except ValueError:
+        return None
+    # El periodo divide al calcular desde qué seq descargar
+    if count < 0 or period_ms <= 0:
+        return None
+    return count, head_seq, head_ms, period_ms, now_ms
+
+
+def is_data_line(line):
+    return bool(line) and not line.startswith(CONTROL_PREFIXES)
+
+
+def _field(value):
+    return np.nan if value == "NA" else float(value)
+
+
+def parse_lines(lines):
+    """Interpreta paquetes CSV ``uv,nivel,t,h,p[,millis[,adc_uv]]``; descarta los inválidos"""
+    rows = []
+    for line in lines:
+        parts = line.split(",")
+        if len(parts) < 5:
+            continue
+        try:
+            t_ms = int(parts[5]) if len(parts) > 5 else -1
+            adc = _field(parts[6]) if len(parts) > 6 else np.nan
+            uv, temp, hum, pres = _field(parts[0]), _field(parts[2]), _field(parts[3]), _field(parts[4])
+            rows.append((-1, t_ms, uv, temp, hum, pres, np.nan, adc, uv, temp, hum, pres))
+        except ValueError:
+            print(f"Error procesando datos, línea: {line}")
+    return np.array(rows, dtype=SAMPLE_DTYPE)
+
+
+def uv_level_word(uv):
+    """Misma clasificación que ``buildDataPacket()``"""
+    if uv <= 2:
+        return "Bajo"
+    if uv <= 5:
+        return "Moderado"
+    if uv <= 7:
+        return "Alto"
+    if uv <= 10:
+        return "Muy Alto"
+    return "Extremo"
+
+
+# ===================== FRAMING POR LÍNEAS =====================
+class LineBuffer:
+    """Acumula bytes y entrega solo líneas completas.
+
+    La línea parcial que queda al final se conserva hasta que llega su
+    salto de línea, así que ninguna lectura se pierde ni se parte.
+    """
+
+    def __init__(self, max_line=4096):
+        self.max_line = max_line
+        self._pending = b""
+
+    def feed(self, data):
+        if not data:
+            return []
+
+        chunks = (self._pending + data).split(b"\n")
+        self._pending = chunks.pop()
+
+        # Basura sin salto de línea (p. ej. baudios incorrectos)
+        if len(self._pending) > self.max_line:
+            self._pending = b""
+
+        lines = []
+        for chunk in chunks:
+            line = chunk.decode(errors="ignore").strip()
+            if line:
+                lines.append(line)
+        return lines
+
+    def clear(self):
+        self._pending = b""
+
+
+class SampleParser:
+    """Convierte los bytes recibidos de una estación en bloques de muestras.
+
+    En texto separa los paquetes de las respuestas de control (``OK_*``,
+    ``ERR_*``), que quedan en ``control``; tras ``set_binary`` decodifica
+    tramas binarias.
+    """
+
+    def __init__(self):
+        self.lines = LineBuffer()
+        self.decoder = None
+        self.control = []
+
+    @property
+    def binary(self):
+        return self.decoder is not None
+
+    @property
+    def dropped(self):
+        return self.decoder.dropped if self.decoder is not None else 0
+
+    def set_binary(self):
+        from .frames import FrameDecoder
+
+        self.lines.clear()
+        self.decoder = FrameDecoder()
+
+    def feed(self, data):
+        if self.decoder is not None:
+            return self.decoder.feed(data)
+
+        packets = []
+        for line in self.lines.feed(data):
+            if is_data_line(line):
+                packets.append(line)
+            else:
+                self.control.append(line)
+        return parse_lines(packets)
@@ -0,0 +1,226 @@
+"""Registro de sesión en disco (SQLite en modo WAL) para recuperar tras un cierre inesperado."""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from .store import COLUMNS
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS stations (id INTEGER PRIMARY KEY, name TEXT UNIQUE);
+CREATE TABLE IF NOT EXISTS samples (
+    station INTEGER, time REAL, seq INTEGER, t_ms INTEGER,
+    uv REAL, temp REAL, hum REAL, pres REAL,
+    uv_adc REAL, uv_raw REAL, temp_raw REAL, hum_raw REAL, pres_raw REAL
+);
+CREATE TABLE IF NOT EXISTS gaps (station INTEGER, start REAL, end REAL, reason TEXT);
+"""
+
+FLUSH_INTERVAL = 1.0  # s entre confirmaciones (cada una es un fsync)
+
+
+def new_session_path(directory):
+    """Ruta para una sesión nueva dentro de ``directory``"""
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(directory, f"sesion_{stamp}.db")
+    n = 1
+    while os.path.exists(path):
+        path = os.path.join(directory, f"sesion_{stamp}_{n}.db")
+        n += 1
+    return path
+
+
+def _connect(path):
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=FULL")
+    db.executescript(SCHEMA)
+    return db
+
+
+def session_info(path):
+    """(inicio, fin o None, nº de muestras) de una sesión guardada"""
+    db = sqlite3.connect(path)
+    try:
+        meta = dict(db.execute("SELECT key, value FROM meta"))
+        count = db.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+    finally:
+        db.close()
+    started = float(meta["started"]) if "started" in meta else None
+    finished = float(meta["finished"]) if "finished" in meta else None
+    return started, finished, count
+
+
+def unfinished_sessions(directory):
+    """Sesiones que no se cerraron (la app se cerró de golpe)"""
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for entry in sorted(os.listdir(directory)):
+        if not entry.endswith(".db"):
+            continue
+        path = os.path.join(directory, entry)
+        try:
+            started, finished, count = session_info(path)
+        except sqlite3.Error as e:
+            print(f"Error al leer la sesión {entry}: {e}")
+            continue
+        if finished is None:
+            found.append((path, started, count))
+    return found
+
+
+def mark_finished(path):
+    """Da por cerrada una sesión sin recuperarla (los datos se conservan)"""
+    db = _connect(path)
+    try:
+        with db:
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('finished', ?)", (str(time.time()),))
+    finally:
+        db.close()
+
+
+def read_session(path, chunk_size=65536):
+    """Devuelve ``(estación, filas)`` por bloques, en el orden en que se guardaron.
+
+    Las filas son columnas como las de ``SampleStore``; los sensores
+    ausentes (NULL en la base) vuelven como NaN.
+    """
+    db = sqlite3.connect(path)
+    try:
+        stations = db.execute("SELECT id, name FROM stations ORDER BY id").fetchall()
+        for station_id, name in stations:
+            cur = db.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM samples WHERE station = ? ORDER BY rowid",
+                (station_id,),
+            )
+            while True:
+                block = cur.fetchmany(chunk_size)
+                if not block:
+                    break
+                values = np.array(block, dtype=np.float64)
+                rows = {col: values[:, i] for i, col in enumerate(COLUMNS)}
+                rows["seq"] = np.nan_to_num(rows["seq"], nan=-1).astype(np.int64)
+                rows["t_ms"] = np.nan_to_num(rows["t_ms"], nan=-1).astype(np.int64)
+                yield name, rows
+    finally:
+        db.close()
+
+
+def read_gaps(path):
+    """``[(estación, inicio, fin, motivo)]`` de los huecos registrados"""
+    db = sqlite3.connect(path)
+    try:
+        return db.execute(
+            "SELECT stations.name, start, end, reason FROM gaps "
+            "JOIN stations ON stations.id = gaps.station ORDER BY gaps.rowid"
+        ).fetchall()
+    finally:
+        db.close()
+
+
+class SessionLog:
+    """Guarda cada bloque de muestras en cuanto llega, sin frenar la adquisición.
+
+    ``write`` solo encola; un hilo propio inserta por lotes y confirma (y
+    sincroniza a disco) como mucho una vez por ``flush_interval``. Si la
+    app se cierra sin ``close`` la sesión queda marcada como no terminada.
+    """
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = None
+        self._station_ids = {}
+
+    def start(self):
+        db = _connect(self.path)
+        try:
+            with db:
+                db.execute("INSERT OR IGNORE INTO meta VALUES ('started', ?)", (str(time.time()),))
+                # Al recuperar una sesión se sigue escribiendo en el mismo archivo
+                db.execute("DELETE FROM meta WHERE key = 'finished'")
+            self._station_ids = {name: sid for sid, name in db.execute("SELECT id, name FROM stations")}
+        finally:
+            db.close()
+
+        self._thread = threading.Thread(target=self._run, name="climalab-sessionlog", daemon=True)
+        self._thread.start()
+
+    def write(self, station, rows):
+        """Encola filas (columnas de ``SampleStore``) de una estación"""
+        if len(rows["time"]):
+            self._queue.put((station, rows))
+
+    def write_gap(self, station, start, end, reason=""):
+        """Encola un hueco (periodo sin datos por desconexión)"""
+        self._queue.put((station, (start, end, reason)))
+
+    def close(self, finished=True):
+        """Vacía lo pendiente y, si ``finished``, marca la sesión como cerrada"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if finished:
+            mark_finished(self.path)
+
+    def _run(self):
+        db = _connect(self.path)
+        pending = []
+        deadline = time.monotonic() + self.flush_interval
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    item = False
+
+                if item:
+                    pending.append(item)
+                if item is None or time.monotonic() >= deadline:
+                    self._flush(db, pending)
+                    pending = []
+                    deadline = time.monotonic() + self.flush_interval
+                if item is None:
+                    break
+        finally:
+            db.close()
+
+    def _flush(self, db, pending):
+        if not pending:
+            return
+        try:
+            with db:
+                for station, rows in pending:
+                    sid = self._station_id(db, station)
+                    if isinstance(rows, tuple):
+                        db.execute("INSERT INTO gaps VALUES (?, ?, ?, ?)", (sid,) + rows)
+                        continue
+                    columns = [np.asarray(rows[name]).tolist() for name in COLUMNS]
+                    db.executemany(
+                        f"INSERT INTO samples (station, {', '.join(COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * (len(COLUMNS) + 1))})",
+                        ((sid,) + row for row in zip(*columns)),
+                    )
+        except sqlite3.Error as e:
+            print(f"Error al guardar la sesión: {e}")
+            # Las estaciones creadas en el lote fallido se deshicieron
+            self._station_ids = {name: sid for sid, name in db.execute("SELECT id, name FROM stations")}
+
+    def _station_id(self, db, name):
+        sid = self._station_ids.get(name)
+        if sid is None:
+            sid = db.execute("INSERT INTO stations (name) VALUES (?)", (name,)).lastrowid
+            self._station_ids[name] = sid
+        return sid
@@ -0,0 +1,503 @@
+"""Estación simulada en Python puro que habla el mismo protocolo que el firmware.
+
+Además de ``FakeSerial`` (en memoria), la estación se puede servir por un
+par pty y por TCP, como una placa real::
+
+    python -m climalab.simulator --tcp 3333 --pty --latency 30 --loss 0.01 --na 0.05
+"""
+
+import argparse
+import asyncio
+import collections
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from .calibration import ADC_MAX, ADC_REF_MV, FIRMWARE_UV_MV
+from .engine import DEFAULT_TCP_PORT
+from .frames import encode_frame
+from .protocol import SAMPLE_DTYPE, LineBuffer, uv_level_word
+
+
+class FakeStation:
+    """Emula ``handleCommand``: DATA, SET_WIFI, STREAM,<ms>, STOP, FORMAT, RAW, SAMPLE y DUMP.
+
+    Las respuestas se devuelven ya codificadas (bytes), como saldrían por el
+    puerto: líneas terminadas en CRLF o tramas binarias tras ``FORMAT,BIN``.
+
+    Los valores son fijos salvo que se indique lo contrario; los sensores
+    listados en ``missing`` responden "NA" como cuando no se detectan. Con
+    ``na_prob`` cada campo de cada paquete puede faltar al azar y con
+    ``noise`` los valores hacen una caminata aleatoria (desvío por paquete).
+
+    Como la placa, guarda una muestra cada ``LOG_PERIOD_MS`` en un registro
+    circular que se descarga con ``DUMP,<desde_seq>``.
+
+    El formato y el streaming son de cada conexión (``Session``); si no se
+    indica una se usa ``self.session``, la del puerto serial.
+    """
+
+    STREAM_MIN_MS = 20
+    SAMPLE_MIN_MS = 5
+    SAMPLE_MAX_MS = 10000
+    WIFI_FIELD_MAX = 32
+    CMD_MAX = 96
+    LOG_PERIOD_MS = 1000
+    LOG_CAPACITY = 3600
+
+    def __init__(self, uv=3, temp=24.5, hum=55.0, pres=101325, missing=(), clock=time.monotonic,
+                 na_prob=0.0, noise=0.0, seed=None):
+        self.uv = uv
+        self.temp = temp
+        self.hum = hum
+        self.pres = pres
+        self.missing = set(missing)
+        self.clock = clock
+        self.na_prob = na_prob
+        self.noise = noise
+        self.rng = random.Random(seed)
+        self.t0 = clock()
+
+        self.session = Session()
+        self.sample_ms = 20     # periodo del muestreo de UV en segundo plano
+
+        self.log = collections.deque(maxlen=self.LOG_CAPACITY)   # (seq, millis, trama)
+        self.log_head = 0
+        self.log_next = self.t0
+
+    def millis(self):
+        return int((self.clock() - self.t0) * 1000) & 0xFFFFFFFF
+
+    def reading(self):
+        """Valores de un paquete; None = sensor que responde NA"""
+        if self.noise:
+            step = self.rng.gauss
+            self.temp += step(0, self.noise * 0.1)
+            self.hum = min(max(self.hum + step(0, self.noise * 0.2), 0.0), 100.0)
+            self.pres += step(0, self.noise * 5)
+            if self.rng.random() < self.noise * 0.01:
+                self.uv = min(max(self.uv + self.rng.choice((-1, 1)), 0), 11)
+
+        values = {"uv": self.uv, "temp": self.temp, "hum": self.hum, "pres": self.pres}
+        for name in values:
+            if name in self.missing or (self.na_prob and self.rng.random() < self.na_prob):
+                values[name] = None
+        values["uv_adc"] = uv_adc(self.uv) if values["uv"] is not None else None
+        return values
+
+    def data_packet(self, raw=False):
+        v = self.reading()
+        uv = str(v["uv"]) if v["uv"] is not None else "NA"
+        nivel = uv_level_word(self.uv)
+        t = f"{v['temp']:.1f}" if v["temp"] is not None else "NA"
+        h = f"{v['hum']:.1f}" if v["hum"] is not None else "NA"
+        p = f"{v['pres']:.0f}" if v["pres"] is not None else "NA"
+        packet = f"{uv},{nivel},{t},{h},{p},{self.millis()}"
+        if raw:
+            packet += f",{v['uv_adc'] if v['uv_adc'] is not None else 0}"
+        return packet
+
+    def data_frame(self, session=None):
+        """Trama binaria con el seq propio de la conexión, como el firmware"""
+        session = session or self.session
+        session.frame_seq += 1
+        return self._frame(session.frame_seq, self.millis())
+
+    def _frame(self, seq, t_ms):
+        return encode_frame(seq, t_ms, **self.reading())
+
+    def _packet(self, session):
+        if session.binary:
+            return self.data_frame(session)
+        return _line(self.data_packet(session.raw))
+
+    def handle_line(self, cmd, session=None):
+        """Procesa un comando y devuelve las respuestas codificadas"""
+        session = session or self.session
+        return [reply if isinstance(reply, bytes) else _line(reply) for reply in self._handle(cmd.strip(), session)]
+
+    def _handle(self, cmd, session):
+        if len(cmd) >= self.CMD_MAX:
+            return ["ERR_CMD"]
+
+        if cmd.startswith("SET_WIFI"):
+            # Como protocol.h: SSID no vacío y ambos campos caben en la EEPROM
+            fields = cmd.split(",", 2)
+            ok = len(fields) == 3 and 0 < len(fields[1]) <= self.WIFI_FIELD_MAX and len(fields[2]) <= self.WIFI_FIELD_MAX
+            return ["OK_WIFI"] if ok else ["ERR_WIFI"]
+
+        if cmd == "DATA":
+            return [self._packet(session)]
+
+        if cmd == "FORMAT,BIN":
+            session.binary = True
+            return ["OK_FORMAT"]
+
+        if cmd == "FORMAT,TXT":
+            session.binary = False
+            return ["OK_FORMAT"]
+
+        if cmd in ("RAW,ON", "RAW,OFF"):
+            session.raw = cmd.endswith("ON")
+            return ["OK_RAW"]
+
+        if cmd.startswith("SAMPLE"):
+            try:
+                ms = int(cmd.split(",", 1)[1])
+            except (IndexError, ValueError):
+                ms = -1
+            if not self.SAMPLE_MIN_MS <= ms <= self.SAMPLE_MAX_MS:
+                return ["ERR_SAMPLE"]
+            self.sample_ms = ms
+            return ["OK_SAMPLE"]
+
+        if cmd.startswith("STREAM"):
+            try:
+                ms = int(cmd.split(",", 1)[1])
+            except (IndexError, ValueError):
+                ms = -1
+            if ms < self.STREAM_MIN_MS:
+                return ["ERR_STREAM"]
+            session.stream_ms = ms
+            session.next_push = self.clock()
+            session.streaming = True
+            return ["OK_STREAM"]
+
+        if cmd == "STOP":
+            session.streaming = False
+            return ["OK_STOP"]
+
+        if cmd.startswith("DUMP"):
+            try:
+                since = int(cmd.split(",", 1)[1])
+            except (IndexError, ValueError):
+                return ["ERR_DUMP"]
+            self.update_log()
+            records = [frame for seq, _, frame in self.log if seq > since]
+            head_ms = self.log[-1][1] if self.log else 0
+            header = f"OK_DUMP,{len(records)},{self.log_head},{head_ms},{self.LOG_PERIOD_MS},{self.millis()}"
+            return [header] + records
+
+        return []
+
+    def update_log(self):
+        """Añade al registro las muestras que la placa habría tomado hasta ahora"""
+        now = self.clock()
+        while self.log_next <= now:
+            self.log_head += 1
+            t_ms = int((self.log_next - self.t0) * 1000) & 0xFFFFFFFF
+            self.log.append((self.log_head, t_ms, self._frame(self.log_head, t_ms)))
+            self.log_next += self.LOG_PERIOD_MS / 1000
+
+    def poll(self, session=None):
+        """Paquetes de streaming vencidos desde la última llamada"""
+        session = session or self.session
+        if not session.streaming:
+            return []
+
+        now = self.clock()
+        period = session.stream_ms / 1000.0
+        packets = []
+        while session.next_push <= now:
+            packets.append(self._packet(session))
+            session.next_push += period
+        return packets
+
+
+class Session:
+    """Estado de una conexión con la estación (como ``Session`` en el firmware)"""
+
+    def __init__(self):
+        self.binary = False
+        self.raw = False
+        self.streaming = False
+        self.stream_ms = 0
+        self.next_push = 0.0
+        self.frame_seq = 0    # cada canal numera sus tramas (FrameDecoder cuenta los saltos)
+
+
+def uv_adc(index):
+    """Lectura de ADC en el medio del escalón del firmware para ese índice UV"""
+    bounds = (0,) + FIRMWARE_UV_MV + (FIRMWARE_UV_MV[-1] + 100,)
+    index = min(max(int(index), 0), len(bounds) - 2)
+    return round((bounds[index] + bounds[index + 1]) / 2 * ADC_MAX / ADC_REF_MV)
+
+
+def _line(text):
+    return (text + "\r\n").encode()
+
+
+class FakeSerial:
+    """Puerto en memoria con la interfaz de ``serial.Serial`` que usa la app."""
+
+    def __init__(self, station=None):
+        self.station = station or FakeStation()
+        self.is_open = True
+        self._rx = b""
+        self._out = b""
+
+    def _pump(self):
+        for packet in self.station.poll():
+            self._out += packet
+
+    @property
+    def in_waiting(self):
+        self._pump()
+        return len(self._out)
+
+    def write(self, data):
+        self._rx += data
+        while b"\n" in self._rx:
+            line, self._rx = self._rx.split(b"\n", 1)
+            for reply in self.station.handle_line(line.decode(errors="ignore")):
+                self._out += reply
+        return len(data)
+
+    def read(self, size=1):
+        self._pump()
+        data, self._out = self._out[:size], self._out[size:]
+        return data
+
+    def readline(self):
+        self._pump()
+        line, sep, rest = self._out.partition(b"\n")
+        if not sep:
+            return b""
+        self._out = rest
+        return line + sep
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+def sample_blocks(n, block=50, period=0.02, t0=1.7e9, start=0):
+    """Bloques ``SAMPLE_DTYPE`` ya fechados, como los entrega el motor, con ``seq`` desde ``start``"""
+    rng = np.random.default_rng(1)
+    for first in range(start, start + n, block):
+        seq = np.arange(first, min(first + block, start + n))
+        count = len(seq)
+        samples = np.empty(count, dtype=SAMPLE_DTYPE)
+        samples["seq"] = seq
+        samples["t_ms"] = seq * int(period * 1000)
+        samples["time"] = t0 + seq * period
+        samples["uv"] = np.round(5 + 3 * np.sin(seq / 5000))
+        samples["temp"] = 24 + 2 * np.sin(seq / 3000) + rng.normal(0, 0.05, count)
+        samples["hum"] = 55 + 5 * np.cos(seq / 4000) + rng.normal(0, 0.1, count)
+        samples["pres"] = 101325 + 50 * np.sin(seq / 10000) + rng.normal(0, 2, count)
+        samples["uv_adc"] = np.nan
+        for name in ("uv", "temp", "hum", "pres"):
+            samples[f"{name}_raw"] = samples[name]
+        yield samples
+
+
+# ===================== SERVIDORES =====================
+class SimulatedLink:
+    """Salida de una conexión con latencia, jitter y pérdida simulados.
+
+    Cada paquete sale ``latency`` s (± ``jitter``) después de generarse,
+    sin adelantar al anterior: el enlace no reordena. Con probabilidad
+    ``loss`` se descarta el paquete entero (respuesta que nunca llega).
+    """
+
+    def __init__(self, write, latency=0.0, jitter=0.0, loss=0.0, seed=None):
+        self.write = write
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.loop = asyncio.get_running_loop()
+        self.sent = 0
+        self.lost = 0
+        self._last = 0.0
+
+    def send(self, packets):
+        for packet in packets:
+            if self.loss and self.rng.random() < self.loss:
+                self.lost += 1
+                continue
+            self.sent += 1
+            delay = self.latency + self.rng.uniform(-self.jitter, self.jitter) if self.jitter else self.latency
+            now = self.loop.time()
+            due = self._last = max(now + max(delay, 0.0), self._last)
+            if due <= now:
+                self.write(packet)
+            else:
+                self.loop.call_at(due, self.write, packet)
+
+
+async def run_session(read, link, station, session):
+    """Atiende una conexión: comandos de ``read()`` y streaming a su plazo.
+
+    Termina cuando ``read()`` devuelve b"" (el cliente cerró).
+    """
+    lines = LineBuffer()
+    pending = asyncio.ensure_future(read())
+    try:
+        while True:
+            timeout = None
+            if session.streaming:
+                timeout = max(session.next_push - station.clock(), 0.0)
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if done:
+                data = pending.result()
+                if not data:
+                    return
+                for line in lines.feed(data):
+                    link.send(station.handle_line(line, session))
+                pending = asyncio.ensure_future(read())
+            link.send(station.poll(session))
+    finally:
+        pending.cancel()
+
+
+async def serve_tcp(station, host="127.0.0.1", port=DEFAULT_TCP_PORT, **link_options):
+    """Servidor TCP como el de la placa en el puerto 3333; devuelve el ``Server``.
+
+    Todas las conexiones ven la misma estación (mismo registro y reloj),
+    cada una con su propia sesión.
+    """
+
+    async def handle(reader, writer):
+        peer = writer.get_extra_info("peername")
+        print(f"Cliente TCP conectado: {peer}")
+
+        def write(data):
+            if not writer.is_closing():
+                writer.write(data)
+
+        link = SimulatedLink(write, **link_options)
+        try:
+            await run_session(lambda: reader.read(4096), link, station, Session())
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+            print(f"Cliente TCP desconectado: {peer}")
+
+    return await asyncio.start_server(handle, host, port)
+
+
+class PtyPort:
+    """Puerto serial simulado con un par pty (solo POSIX).
+
+    La app abre ``name`` (p. ej. /dev/pts/5) como cualquier puerto serial.
+    El lado esclavo se mantiene abierto para que el puerto sobreviva a que
+    la app lo cierre y lo vuelva a abrir, como un cable USB conectado.
+    """
+
+    def __init__(self, station, **link_options):
+        import tty
+
+        self.station = station
+        self.link_options = link_options
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)   # sin eco ni conversión de fin de línea
+        os.set_blocking(self.master, False)
+        self.name = os.ttyname(self.slave)
+        self.task = None
+
+    def start(self):
+        link = SimulatedLink(self._write, **self.link_options)
+        self.task = asyncio.ensure_future(run_session(self._read, link, self.station, self.station.session))
+        return self.task
+
+    async def _read(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                return os.read(self.master, 4096)
+            except BlockingIOError:
+                pass
+            ready = loop.create_future()
+            loop.add_reader(self.master, lambda: ready.done() or ready.set_result(None))
+            try:
+                await ready
+            finally:
+                loop.remove_reader(self.master)
+
+    def _write(self, data):
+        try:
+            os.write(self.master, data)
+        except (BlockingIOError, OSError):
+            pass   # búfer del pty lleno (nadie lee): se pierde, como en la UART
+
+    def close(self):
+        if self.task:
+            self.task.cancel()
+        os.close(self.master)
+        os.close(self.slave)
+
+
+# ===================== LÍNEA DE COMANDOS =====================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m climalab.simulator",
+        description="Estación ClimaLab simulada por TCP y/o por un puerto serial virtual (pty).",
+    )
+    parser.add_argument("--tcp", type=int, nargs="?", const=DEFAULT_TCP_PORT, metavar="PUERTO",
+                        help=f"servir por TCP (puerto {DEFAULT_TCP_PORT} por defecto)")
+    parser.add_argument("--host", default="127.0.0.1", help="dirección TCP (por defecto 127.0.0.1)")
+    parser.add_argument("--pty", action="store_true", help="crear un puerto serial virtual")
+    parser.add_argument("--latency", type=float, default=0, metavar="MS",
+                        help="retardo de cada respuesta en ms")
+    parser.add_argument("--jitter", type=float, default=0, metavar="MS",
+                        help="variación aleatoria del retardo en ms (±)")
+    parser.add_argument("--loss", type=float, default=0, metavar="P",
+                        help="probabilidad de perder cada respuesta (0-1)")
+    parser.add_argument("--na", type=float, default=0, metavar="P",
+                        help="probabilidad de que cada campo llegue como NA (0-1)")
+    parser.add_argument("--missing", action="append", default=[], choices=("uv", "temp", "hum", "pres"),
+                        help="sensor que responde siempre NA (se puede repetir)")
+    parser.add_argument("--noise", type=float, default=1.0,
+                        help="amplitud de la variación de los valores (0 = fijos)")
+    parser.add_argument("--seed", type=int, help="semilla para repetir la misma secuencia")
+    return parser.parse_args(argv)
+
+
+async def serve(args):
+    station = FakeStation(missing=args.missing, na_prob=args.na, noise=args.noise, seed=args.seed)
+    link = dict(latency=args.latency / 1000, jitter=args.jitter / 1000, loss=args.loss, seed=args.seed)
+
+    port = None
+    if args.pty:
+        port = PtyPort(station, **link)
+        port.start()
+        print(f"Puerto serial simulado: {port.name}")
+
+    server = None
+    if args.tcp or not args.pty:
+        server = await serve_tcp(station, args.host, args.tcp or DEFAULT_TCP_PORT, **link)
+        print(f"Estación TCP en {args.host}:{args.tcp or DEFAULT_TCP_PORT}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        if server:
+            server.close()
+        if port:
+            port.close()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.pty and not hasattr(os, "openpty"):
+        print("Los puertos pty solo existen en Linux/macOS; use --tcp")
+        return 2
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Error al iniciar el simulador: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""Estadísticas en vivo, actualizadas muestra a muestra, y alertas por umbral.
+
+Cada muestra cuesta O(1) (amortizado) sin importar cuánto dure la sesión:
+no se recorre el historial, solo se actualizan acumuladores.
+"""
+
+import collections
+import math
+import operator
+
+from .store import VARIABLES
+
+
+WINDOW_S = 3600        # mínimo/máximo móviles: última hora
+EMA_TAU_S = 300        # constante de tiempo del promedio exponencial
+RATE_WINDOW_S = 3600   # tendencia: cambio en la última hora
+RATE_POINTS = 512      # puntos que guarda la tendencia dentro de su ventana
+
+
+class RunningStats:
+    """Media, desviación, mínimo y máximo de una serie sin guardarla (Welford)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def extend(self, values):
+        for x in values:
+            self.add(x)
+
+    @property
+    def std(self):
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+class WindowMinMax:
+    """Mínimo y máximo de los últimos ``window`` segundos con colas monótonas.
+
+    Cada valor entra y sale de cada cola una sola vez; el extremo vigente
+    está siempre al frente.
+    """
+
+    def __init__(self, window=WINDOW_S):
+        self.window = window
+        self._min = collections.deque()
+        self._max = collections.deque()
+
+    def add(self, t, x):
+        while self._min and self._min[-1][1] >= x:
+            self._min.pop()
+        self._min.append((t, x))
+        while self._max and self._max[-1][1] <= x:
+            self._max.pop()
+        self._max.append((t, x))
+
+        cutoff = t - self.window
+        while self._min[0][0] < cutoff:
+            self._min.popleft()
+        while self._max[0][0] < cutoff:
+            self._max.popleft()
+
+    @property
+    def min(self):
+        return self._min[0][1] if self._min else math.nan
+
+    @property
+    def max(self):
+        return self._max[0][1] if self._max else math.nan
+
+
+class Ema:
+    """Promedio exponencial con constante de tiempo ``tau`` (s).
+
+    El peso depende del tiempo transcurrido, no del número de muestras:
+    da lo mismo medir a 1 Hz que a 50 Hz o con huecos.
+    """
+
+    def __init__(self, tau=EMA_TAU_S):
+        self.tau = tau
+        self.value = math.nan
+        self._last = None
+
+    def add(self, t, x):
+        if self._last is None:
+            self.value = x
+        else:
+            alpha = 1.0 - math.exp(-max(t - self._last, 0.0) / self.tau)
+            self.value += alpha * (x - self.value)
+        self._last = t
+
+
+class RateOfChange:
+    """Cambio por hora entre la muestra más antigua de la ventana y la última.
+
+    Dentro de la ventana se guardan como mucho ``RATE_POINTS`` puntos
+    (uno cada ``window / RATE_POINTS`` s), así la memoria no crece con la
+    frecuencia de muestreo.
+    """
+
+    def __init__(self, window=RATE_WINDOW_S):
+        self.window = window
+        self._step = window / RATE_POINTS
+        self._points = collections.deque()
+        self._last = None
+
+    def add(self, t, x):
+        self._last = (t, x)
+        if not self._points or t - self._points[-1][0] >= self._step:
+            self._points.append((t, x))
+        while t - self._points[0][0] > self.window:
+            self._points.popleft()
+
+    @property
+    def per_hour(self):
+        """NaN hasta cubrir al menos una décima de la ventana"""
+        if self._last is None:
+            return math.nan
+        t0, x0 = self._points[0]
+        t1, x1 = self._last
+        if t1 - t0 < self.window / 10:
+            return math.nan
+        return (x1 - x0) / (t1 - t0) * 3600.0
+
+
+class VariableStats:
+    """Todo lo que se calcula en vivo para una variable de una estación"""
+
+    METRICS = ("value", "ema", "mean", "std", "min", "max", "rate")
+
+    def __init__(self, window=WINDOW_S, tau=EMA_TAU_S, rate_window=RATE_WINDOW_S):
+        self.session = RunningStats()
+        self.recent = WindowMinMax(window)
+        self.ema = Ema(tau)
+        self.rate = RateOfChange(rate_window)
+        self.value = math.nan
+
+    def add(self, t, x):
+        self.value = x
+        self.session.add(x)
+        self.recent.add(t, x)
+        self.ema.add(t, x)
+        self.rate.add(t, x)
+
+    def metric(self, name):
+        """Valor de una métrica por nombre (para las reglas de alerta)"""
+        if name == "value":
+            return self.value
+        if name == "ema":
+            return self.ema.value
+        if name == "mean":
+            return self.session.mean if self.session.count else math.nan
+        if name == "std":
+            return self.session.std
+        if name == "min":
+            return self.recent.min
+        if name == "max":
+            return self.recent.max
+        if name == "rate":
+            return self.rate.per_hour
+        raise ValueError(f"Métrica desconocida: {name}")
+
+
+class StationStats:
+    """``VariableStats`` de cada variable de una estación"""
+
+    def __init__(self):
+        self.variables = {name: VariableStats() for name in VARIABLES}
+
+    def __getitem__(self, name):
+        return self.variables[name]
+
+    def update(self, rows):
+        """Añade un bloque de filas (columnas de ``SampleStore``); los NaN se saltan"""
+        times = rows["time"].tolist()
+        for name, stats in self.variables.items():
+            for t, x in zip(times, rows[name].tolist()):
+                if x == x:
+                    stats.add(t, x)
+
+
+# ===================== ALERTAS =====================
+OPERATORS = {">=": operator.ge, ">": operator.gt, "<=": operator.le, "<": operator.lt}
+
+
+class AlertRule:
+    """Condición ``métrica(variable) op umbral``, p. ej. UV >= 8.
+
+    Una alerta activa se apaga recién cuando el valor se aleja
+    ``hysteresis`` del umbral, para que no parpadee en el límite.
+    """
+
+    FIELDS = ("variable", "op", "threshold", "metric", "label", "hysteresis")
+
+    def __init__(self, variable, op, threshold, metric="value", label="", hysteresis=0.0):
+        if variable not in VARIABLES:
+            raise ValueError(f"Variable desconocida: {variable}")
+        if op not in OPERATORS:
+            raise ValueError(f"Operador desconocido: {op}")
+        if metric not in VariableStats.METRICS:
+            raise ValueError(f"Métrica desconocida: {metric}")
+        self.variable = variable
+        self.op = op
+        self.threshold = threshold
+        self.metric = metric
+        self.label = label or f"{variable} {metric} {op} {threshold}"
+        self.hysteresis = hysteresis
+
+    def __repr__(self):
+        return f"AlertRule({self.label!r})"
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data[field] for field in cls.FIELDS if field in data})
+
+    def check(self, value, active=False):
+        if not active:
+            return OPERATORS[self.op](value, self.threshold)
+        # Para apagarse hay que cruzar el umbral desplazado hacia "adentro"
+        margin = self.hysteresis if self.op in (">=", ">") else -self.hysteresis
+        return OPERATORS[self.op](value, self.threshold - margin)
+
+
+def load_rules(items):
+    """Reglas a partir de la configuración; las inválidas se informan y se omiten"""
+    rules = []
+    for item in items:
+        try:
+            rules.append(AlertRule.from_dict(item))
+        except (TypeError, ValueError) as e:
+            print(f"Error en regla de alerta {item}: {e}")
+    return rules
+
+
+class AlertEngine:
+    """Evalúa las reglas tras cada bloque y avisa solo de los cambios"""
+
+    def __init__(self, rules=()):
+        self.rules = list(rules)
+        self.active = {}   # estación -> índices de reglas activas
+
+    def evaluate(self, station, stats):
+        """``[(regla, activa, valor)]`` de las reglas que se encendieron o apagaron"""
+        active = self.active.setdefault(station, set())
+        changes = []
+        for i, rule in enumerate(self.rules):
+            value = stats[rule.variable].metric(rule.metric)
+            if value != value:
+                continue
+            now = rule.check(value, i in active)
+            if now != (i in active):
+                (active.add if now else active.discard)(i)
+                changes.append((rule, now, value))
+        return changes
+
+    def active_rules(self, station):
+        return [self.rules[i] for i in sorted(self.active.get(station, ()))]
+
+    def clear(self, station=None):
+        if station is None:
+            self.active.clear()
+        else:
+            self.active.pop(station, None)
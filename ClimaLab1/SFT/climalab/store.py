@@ -0,0 +1,287 @@
+"""Almacén columnar de muestras con memoria acotada (búfer circular)."""
+
+import os
+import time
+
+import numpy as np
+
+
+VARIABLES = ("uv", "temp", "hum", "pres")
+# Lo que mandó el firmware antes de calibrar (``climalab.calibration``):
+# con esto la calibración se puede rehacer sobre sesiones ya guardadas
+RAW_COLUMNS = ("uv_adc", "uv_raw", "temp_raw", "hum_raw", "pres_raw")
+COLUMNS = ("time", "seq", "t_ms") + VARIABLES + RAW_COLUMNS
+
+# Registro que se usa al volcar a disco las filas más antiguas
+RECORD_DTYPE = np.dtype([
+    ("time", "<f8"),
+    ("seq", "<i8"),
+    ("t_ms", "<i8"),
+    ("uv", "<f8"),
+    ("temp", "<f8"),
+    ("hum", "<f8"),
+    ("pres", "<f8"),
+    # Crudos en f4: sobra resolución (la presión queda a ~0,01 Pa) con la mitad de disco
+    ("uv_adc", "<f4"),
+    ("uv_raw", "<f4"),
+    ("temp_raw", "<f4"),
+    ("hum_raw", "<f4"),
+    ("pres_raw", "<f4"),
+])
+
+DEFAULT_CAPACITY = 1 << 19  # ~3 h a 50 Hz
+
+
+class SampleStore:
+    """Una columna NumPy por variable, todas alineadas con ``time``.
+
+    Un sensor ausente queda como NaN en su fila, así que todas las series
+    comparten el mismo índice. Cuando se llena, las filas nuevas pisan a
+    las más antiguas; con ``spill_path`` esas filas se añaden antes a un
+    archivo binario para que la exportación siga viendo la sesión completa.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, spill_path=None):
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self._cols = {
+            name: np.empty(capacity, dtype=RECORD_DTYPE[name]) for name in COLUMNS
+        }
+        self._len = 0
+        self._total = 0
+        self._spilled = 0
+        self._span = None
+        self.gaps = []   # [(inicio, fin, motivo)] periodos sin datos por desconexión
+        # El archivo de volcado es propio del store: se empieza vacío
+        if spill_path and os.path.exists(spill_path):
+            os.remove(spill_path)
+
+    def __len__(self):
+        return self._len
+
+    @property
+    def total(self):
+        """Muestras recibidas desde el inicio (índice absoluto de la siguiente)"""
+        return self._total
+
+    @property
+    def first_index(self):
+        """Índice absoluto de la muestra más antigua que sigue en memoria"""
+        return self._total - self._len
+
+    @property
+    def spilled(self):
+        return self._spilled
+
+    def append(self, samples, received_at=None):
+        """Añade un bloque ``SAMPLE_DTYPE`` recibido en ``received_at`` (epoch s).
+
+        Devuelve las filas añadidas como columnas (con su hora ya calculada).
+        """
+        rows = sample_rows(samples, received_at)
+        self.append_rows(rows)
+        return rows
+
+    def append_rows(self, rows):
+        """Añade filas que ya traen todas las columnas, p. ej. al recuperar una sesión"""
+        n = len(rows["time"])
+        if not n:
+            return
+
+        lo, hi = float(np.min(rows["time"])), float(np.max(rows["time"]))
+        self._span = (lo, hi) if self._span is None else (min(self._span[0], lo), max(self._span[1], hi))
+
+        cap = self.capacity
+
+        # Primero salen las filas más antiguas de memoria...
+        evicted = min(self._len, self._len + n - cap)
+        if evicted > 0:
+            if self.spill_path:
+                self._spill_rows(self._rows_at(self._positions(self.first_index, evicted)))
+            self._len -= evicted
+
+        # ...y luego las del propio bloque que no caben
+        if n > cap:
+            if self.spill_path:
+                self._spill_rows({name: col[:n - cap] for name, col in rows.items()})
+            rows = {name: col[n - cap:] for name, col in rows.items()}
+            self._total += n - cap
+            n = cap
+
+        pos = self._positions(self._total, n)
+        for name, col in rows.items():
+            self._cols[name][pos] = col
+
+        self._total += n
+        self._len += n
+
+    def column(self, name):
+        """Columna en orden temporal (vista si no da la vuelta, copia si la da)"""
+        start = self.first_index % self.capacity
+        end = start + self._len
+        col = self._cols[name]
+        if end <= self.capacity:
+            return col[start:end]
+        return np.concatenate((col[start:], col[:end - self.capacity]))
+
+    def tail(self, name, n):
+        """Últimos ``n`` valores de una columna"""
+        n = min(n, self._len)
+        return self._cols[name][self._positions(self._total - n, n)]
+
+    def range(self, name, start, stop):
+        """Valores de una columna entre los índices absolutos [start, stop)"""
+        start = max(start, self.first_index)
+        stop = min(stop, self._total)
+        return self._cols[name][self._positions(start, max(stop - start, 0))]
+
+    def take(self, name, indices):
+        """Valores en índices absolutos arbitrarios (se limitan a lo que hay en memoria)"""
+        idx = np.clip(np.asarray(indices, dtype=np.int64), self.first_index, self._total - 1)
+        return self._cols[name][idx % self.capacity]
+
+    def last(self):
+        """Última fila como diccionario, o None si está vacío"""
+        if not self._len:
+            return None
+        pos = (self._total - 1) % self.capacity
+        return {name: self._cols[name][pos] for name in COLUMNS}
+
+    def iter_chunks(self, chunk_size=65536, start=0):
+        """Recorre la sesión completa (disco y memoria) en bloques de columnas.
+
+        ``start`` es la posición dentro de la sesión desde la que empezar.
+        Los límites se fijan al empezar: lo que llegue después no se incluye.
+        """
+        spilled_count, first, length = self._spilled, self.first_index, self._len
+
+        yield from _iter_spilled(self.spill_path, spilled_count, start, chunk_size)
+
+        for i in range(max(start - spilled_count, 0), length, chunk_size):
+            k = min(chunk_size, length - i)
+            yield self._rows_at(self._positions(first + i, k))
+
+    def snapshot(self, start=0):
+        """Copia de la sesión desde ``start`` para recorrerla desde otro hilo.
+
+        ``iter_chunks`` lee el búfer circular en vivo: si siguen llegando
+        muestras, las nuevas pisan a las que se están leyendo.
+        """
+        return StoreSnapshot(self, start)
+
+    def session_length(self):
+        """Muestras de la sesión completa, incluidas las volcadas a disco"""
+        return self._spilled + self._len
+
+    def add_gap(self, start, end, reason=""):
+        """Registra un periodo sin datos (la estación estuvo desconectada)"""
+        self.gaps.append((float(start), float(end), reason))
+
+    def time_span(self):
+        """(primera, última) hora de la sesión completa, o None si está vacía"""
+        return self._span
+
+    def clear(self):
+        self._len = 0
+        self._total = 0
+        self._spilled = 0
+        self._span = None
+        self.gaps = []
+        if self.spill_path and os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+
+    def _positions(self, first, n):
+        return (first + np.arange(n)) % self.capacity
+
+    def _rows_at(self, pos):
+        return {name: self._cols[name][pos] for name in COLUMNS}
+
+    def _spill_rows(self, rows):
+        n = len(rows["time"])
+        records = np.empty(n, dtype=RECORD_DTYPE)
+        for name in COLUMNS:
+            records[name] = rows[name]
+        with open(self.spill_path, "ab") as f:
+            records.tofile(f)
+        self._spilled += n
+
+
+class StoreSnapshot:
+    """Sesión de un ``SampleStore`` congelada al crearla (``snapshot``).
+
+    Las filas en memoria desde ``start`` se copian; las volcadas a disco
+    no se copian porque el archivo de volcado solo crece. Tiene la misma
+    interfaz de lectura que el store (``iter_chunks``, ``session_length``,
+    ``time_span``, ``gaps``).
+    """
+
+    def __init__(self, store, start=0):
+        self.spill_path = store.spill_path
+        self.spilled = store.spilled
+        self.start = max(start, self.spilled)   # posición de la primera fila copiada
+        n = max(store.session_length() - self.start, 0)
+        pos = store._positions(store.total - n, n)
+        self.rows = {name: store._cols[name][pos] for name in COLUMNS}
+        self.gaps = list(store.gaps)
+        self._span = store.time_span()
+
+    def __len__(self):
+        return len(self.rows["time"])
+
+    def iter_chunks(self, chunk_size=65536, start=0):
+        if self.spilled <= start < self.start:
+            raise ValueError(f"La copia empieza en la fila {self.start}, no en {start}")
+
+        yield from _iter_spilled(self.spill_path, self.spilled, start, chunk_size)
+
+        for i in range(max(start - self.start, 0), len(self), chunk_size):
+            yield {name: col[i:i + chunk_size] for name, col in self.rows.items()}
+
+    def session_length(self):
+        return self.start + len(self)
+
+    def time_span(self):
+        return self._span
+
+
+def _iter_spilled(path, count, start, chunk_size):
+    """Bloques de columnas de las primeras ``count`` filas del archivo de volcado"""
+    if start >= count:
+        return
+    spilled = np.memmap(path, dtype=RECORD_DTYPE, mode="r", shape=(count,))
+    for i in range(start, count, chunk_size):
+        block = spilled[i:i + chunk_size]
+        yield {name: np.array(block[name]) for name in COLUMNS}
+
+
+def sample_rows(samples, received_at=None):
+    """Columnas de un bloque ``SAMPLE_DTYPE`` con la hora de cada muestra ya calculada.
+
+    Se usa la hora que puso el motor (reloj del dispositivo); las muestras
+    sin ella se fechan con ``host_times``.
+    """
+    rows = {name: samples[name] for name in ("seq", "t_ms") + VARIABLES + RAW_COLUMNS}
+    times = samples["time"]
+    missing = np.isnan(times)
+    if missing.any():
+        times = times.copy()
+        received_at = time.time() if received_at is None else received_at
+        times[missing] = host_times(samples["t_ms"][missing], received_at)
+    rows["time"] = times
+    return rows
+
+
+def host_times(t_ms, received_at):
+    """Hora de cada muestra a partir de su millis() relativo a la última.
+
+    Las muestras sin marca del dispositivo (``t_ms`` = -1) toman la hora
+    de recepción del bloque.
+    """
+    t_ms = np.asarray(t_ms, dtype=np.int64)
+    times = np.full(len(t_ms), received_at, dtype=np.float64)
+    stamped = t_ms >= 0
+    if stamped.any():
+        last = t_ms[stamped][-1]
+        age = (last - t_ms[stamped]) / 1000.0
+        times[stamped] = received_at - np.clip(age, 0.0, None)
+    return times
@@ -1,9 +1,62 @@
-import sys, socket, serial, serial.tools.list_ports
+import os, shutil, sys, tempfile, threading, time
+STARTUP_T0 = time.perf_counter()  # referencia de --startup-times
 from PyQt5 import QtWidgets, QtCore, QtGui
 from datetime import datetime
-from openpyxl import Workbook
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
+import numpy as np
+
+from climalab.analysis import SED, summarize
+from climalab.archive import Archive, archive_stores
+from climalab.calibration import UNIT_DECIMALS, UNITS, convert
+from climalab.config import Config
+from climalab.engine import AcquisitionEngine, StationConfig
+from climalab.export import ExportCancelled, export_xlsx
+from climalab.live import HISTORY_CAPACITY, LiveServer
+from climalab.lod import LevelOfDetail
+from climalab.sessionlog import (
+    SessionLog, mark_finished, new_session_path, read_gaps, read_session, unfinished_sessions,
+)
+from climalab.ports import PortWatcher
+from climalab.protocol import uv_level_word
+from climalab.stats import AlertEngine, StationStats, load_rules
+from climalab.store import COLUMNS, SampleStore
+
+
+# ===================== TIEMPOS DE ARRANQUE =====================
+class StartupTimer:
+    """Marca hitos del arranque y los informa con ``--startup-times``.
+
+    Con ``--startup-exit`` además cierra la app al terminar el arranque,
+    para medir regresiones desde un script. El detalle de cada import se
+    obtiene aparte con ``python -X importtime main_gui.py``.
+    """
+
+    STEPS = ("primer pintado", "gráfico listo", "puertos listados")
+
+    def __init__(self, argv):
+        self.exit = "--startup-exit" in argv
+        self.enabled = self.exit or "--startup-times" in argv
+        self.marks = []
+        self.reported = False
+
+    def mark(self, label):
+        if not self.enabled or any(name == label for name, _ in self.marks):
+            return
+        self.marks.append((label, time.perf_counter() - STARTUP_T0))
+        done = {name for name, _ in self.marks}
+        if not self.reported and all(step in done for step in self.STEPS):
+            self.reported = True
+            self.report()
+            if self.exit:
+                QtCore.QTimer.singleShot(0, QtWidgets.QApplication.quit)
+
+    def report(self):
+        print("Tiempos de arranque (ms desde el inicio del módulo):", file=sys.stderr)
+        for label, t in self.marks:
+            print(f"  {1000 * t:8.1f}  {label}", file=sys.stderr)
+
+
+startup = StartupTimer(sys.argv)
+startup.mark("importaciones")
 
 
 # ===================== VENTANA WIFI =====================
@@ -105,34 +158,19 @@ class WiFiDialog(QtWidgets.QDialog):
 
 # ===================== TARJETA DE DATOS =====================
 class DataCard(QtWidgets.QFrame):
+    ALERT_COLOR = "#D32F2F"
+
     def __init__(self, title, icon="", color="#6A1B9A"):
         super().__init__()
         self.setMinimumHeight(150)
-        self.setMaximumHeight(170)
-        
-        self.setStyleSheet(f"""
-            QFrame {{
-                background: white;
-                border-radius: 15px;
-                border: 2px solid {color};
-            }}
-            QLabel#title {{ 
-                font-size: 15px; 
-                color: {color};
-                font-weight: bold;
-                padding: 5px;
-            }}
-            QLabel#value {{ 
-                font-size: 26px; 
-                font-weight: bold; 
-                color: {color};
-                padding: 10px;
-            }}
-        """)
+        self.setMaximumHeight(190)
+        self.color = color
+        self.alert = False
+        self.apply_style()
 
         layout = QtWidgets.QVBoxLayout(self)
         layout.setContentsMargins(15, 15, 15, 15)
-        layout.setSpacing(10)
+        layout.setSpacing(6)
 
         title_layout = QtWidgets.QHBoxLayout()
         
@@ -150,12 +188,414 @@ class DataCard(QtWidgets.QFrame):
         self.value.setObjectName("value")
         self.value.setAlignment(QtCore.Qt.AlignCenter)
 
+        # Mín/máx de la última hora, media de la sesión y tendencia
+        self.detail = QtWidgets.QLabel("")
+        self.detail.setObjectName("detail")
+        self.detail.setAlignment(QtCore.Qt.AlignCenter)
+        self.detail.setWordWrap(True)
+
         layout.addLayout(title_layout)
         layout.addWidget(self.value)
+        layout.addWidget(self.detail)
+
+    def apply_style(self):
+        color = self.color
+        border = f"4px solid {self.ALERT_COLOR}" if self.alert else f"2px solid {color}"
+        self.setStyleSheet(f"""
+            QFrame {{
+                background: white;
+                border-radius: 15px;
+                border: {border};
+            }}
+            QLabel#title {{ 
+                font-size: 15px; 
+                color: {color};
+                font-weight: bold;
+                padding: 5px;
+            }}
+            QLabel#value {{ 
+                font-size: 26px; 
+                font-weight: bold; 
+                color: {color};
+                padding: 4px;
+            }}
+            QLabel#detail {{
+                font-size: 11px;
+                color: #555555;
+                border: none;
+            }}
+        """)
 
     def set_value(self, text):
         self.value.setText(text)
 
+    def set_detail(self, text):
+        self.detail.setText(text)
+
+    def set_alert(self, active, text=""):
+        """Borde rojo mientras haya una alerta activa en esta variable"""
+        self.setToolTip(text)
+        if active != self.alert:
+            self.alert = active
+            self.apply_style()
+
+
+# ===================== GRÁFICO EN VIVO =====================
+class LiveChart:
+    """Líneas persistentes que se actualizan en el sitio con blitting.
+
+    Ejes, cuadrícula, títulos y leyenda se dibujan solo al cambiar la
+    selección o los límites; cada muestra nueva restaura el fondo guardado
+    y repinta únicamente las líneas. Los datos pasan por ``LevelOfDetail``,
+    así que cada línea tiene del orden del ancho en píxeles en puntos. El
+    eje x es el tiempo desde la primera muestra, común a todas las
+    estaciones para poder compararlas.
+    """
+
+    SERIES = {
+        "uv": ("Índice UV", "#FF9800"),
+        "temp": ("Temperatura", "#2196F3"),
+        "hum": ("Humedad", "#00BCD4"),
+        "pres": ("Presión", "#9C27B0"),
+    }
+
+    # Selector -> (variables visibles, título, color del título)
+    VIEWS = {
+        "Índice UV": (("uv",), "Índice UV", "#FF9800"),
+        "Temperatura": (("temp",), "Temperatura", "#2196F3"),
+        "Humedad": (("hum",), "Humedad", "#00BCD4"),
+        "Presión": (("pres",), "Presión", "#9C27B0"),
+        "Todas las Variables": (("uv", "temp", "hum", "pres"), "Comparación de Variables", "#4A148C"),
+    }
+
+    # Colores por estación en el modo comparación
+    PALETTE = ["#6A1B9A", "#2196F3", "#FF9800", "#00BCD4", "#4CAF50", "#E91E63", "#795548", "#607D8B"]
+
+    def __init__(self, figure, canvas):
+        self.figure = figure
+        self.canvas = canvas
+        self.ax = figure.add_subplot(111)
+        self.ax.set_facecolor('#FAFAFA')
+        self.ax.grid(True, linestyle='--', alpha=0.4, linewidth=0.5)
+        self.ax.set_xlabel("Tiempo (s)", fontsize=11)
+        self.ax.set_ylabel("Valor", fontsize=11)
+
+        self.lines = {}    # (estación, variable) -> Line2D
+        self.lods = {}     # estación -> LevelOfDetail
+        self.traces = []   # [(estación, store, variable, Line2D)]
+        self.seen = {}     # estación -> muestras ya vistas
+        self.t0 = None
+        self.legend = None
+        self.background = None
+        self.units = {name: next(iter(UNITS[name])) for name in self.SERIES}   # unidad en pantalla
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    @property
+    def visible(self):
+        return [trace for trace in self.traces if len(trace[1])]
+
+    def set_view(self, sel, stores, station, compare=False):
+        """Cambia las series visibles y redibuja todo una vez"""
+        names, title, color = self.VIEWS[sel]
+        if len(names) == 1 and self.units[names[0]]:
+            title = f"{title} ({self.units[names[0]]})"
+
+        if compare and len(names) == 1:
+            specs = [(st, names[0], st, self.PALETTE[i % len(self.PALETTE)]) for i, st in enumerate(stores)]
+            title = f"{title} por estación"
+        elif station in stores:
+            specs = [(station, n, self.SERIES[n][0], self.SERIES[n][1]) for n in names]
+        else:
+            specs = []
+
+        for line in self.lines.values():
+            line.set_visible(False)
+
+        single = len(specs) == 1
+        self.traces = []
+        for st, name, label, line_color in specs:
+            line = self.lines.get((st, name))
+            if line is None:
+                line, = self.ax.plot([], [], animated=True)
+                self.lines[(st, name)] = line
+            line.set(label=label, color=line_color, visible=True,
+                     linewidth=2 if single else 1.5, alpha=0.8 if single else 1.0)
+            self.traces.append((st, stores[st], name, line))
+
+        if self.legend:
+            self.legend.remove()
+            self.legend = None
+        if self.visible:
+            self.ax.set_title(title, fontsize=14, fontweight='bold', color=color)
+            if not single:
+                self.legend = self.ax.legend(handles=[t[3] for t in self.traces], fontsize=10)
+        else:
+            self.ax.set_title("")
+
+        self.seen = {}
+        self.update(force=True)
+
+    def update(self, force=False):
+        """Pasa los datos nuevos a las líneas; reescala solo si se salen"""
+        visible = self.visible
+        if not visible:
+            if force:
+                self.canvas.draw_idle()
+            return
+
+        new = {}
+        for st, store, _, _ in visible:
+            self._lod(st, store).update()
+            new[st] = store.total - self.seen.get(st, store.first_index)
+        self.seen.update({st: store.total for st, store, _, _ in visible})
+
+        if self.t0 is None:
+            self.t0 = min(store.range("time", store.first_index, store.first_index + 1)[0]
+                          for _, store, _, _ in visible)
+
+        rescale = force or self._out_of_limits(visible, new)
+        if rescale:
+            self._rescale(visible)
+
+        width = max(int(self.ax.bbox.width), 100)
+        for st, store, name, line in visible:
+            x, y = self.lods[st].view(name, store.first_index, store.total, width)
+            line.set_data(store.take("time", x) - self.t0, self._display(name, y))
+
+        if rescale:
+            self.canvas.draw()
+        else:
+            self._blit()
+
+    def reset(self):
+        self.traces = []
+        self.seen = {}
+        self.t0 = None
+        for line in self.lines.values():
+            line.set_data([], [])
+            line.set_visible(False)
+        for lod in self.lods.values():
+            lod.reset()
+        if self.legend:
+            self.legend.remove()
+            self.legend = None
+        self.ax.set_title("")
+        self.canvas.draw_idle()
+
+    def _lod(self, station, store):
+        lod = self.lods.get(station)
+        if lod is None or lod.store is not store:
+            lod = self.lods[station] = LevelOfDetail(store, self.SERIES)
+        return lod
+
+    def _out_of_limits(self, visible, new):
+        x0, x1 = self.ax.get_xlim()
+        y0, y1 = self.ax.get_ylim()
+        for st, store, name, _ in visible:
+            first = store.range("time", store.first_index, store.first_index + 1)[0] - self.t0
+            last = store.last()["time"] - self.t0
+            if last > x1 or first > x0 + (x1 - x0) / 4:
+                return True
+
+            tail = self._display(name, store.tail(name, new[st]))
+            if not len(tail) or np.isnan(tail).all():
+                continue
+            if np.nanmin(tail) < y0 or np.nanmax(tail) > y1:
+                return True
+        return False
+
+    def _rescale(self, visible):
+        # Margen en x para que los siguientes puntos quepan sin reescalar
+        first = min(store.range("time", store.first_index, store.first_index + 1)[0] for _, store, _, _ in visible)
+        last = max(store.last()["time"] for _, store, _, _ in visible)
+        x0 = first - self.t0
+        span = max(last - first, 10.0)
+        self.ax.set_xlim(x0, x0 + span * 1.25)
+
+        lows, highs = [], []
+        for st, _, name, _ in visible:
+            bounds = self.lods[st].bounds(name)
+            if bounds:
+                lo, hi = self._display(name, bounds)
+                lows.append(lo)
+                highs.append(hi)
+        if lows:
+            lo, hi = min(lows), max(highs)
+            pad = (hi - lo) * 0.1 or max(abs(hi) * 0.05, 1.0)
+            self.ax.set_ylim(lo - pad, hi + pad)
+
+    def _display(self, name, values):
+        """Valores en la unidad elegida (se guardan siempre en la base)"""
+        return convert(values, name, self.units[name])
+
+    def _on_draw(self, event):
+        # Fondo sin las líneas animadas; luego se pintan encima
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        for trace in self.visible:
+            self.ax.draw_artist(trace[3])
+
+    def _blit(self):
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        for trace in self.visible:
+            self.ax.draw_artist(trace[3])
+        self.canvas.blit(self.ax.bbox)
+
+
+# ===================== PUENTE CON EL MOTOR =====================
+class EngineBridge(QtCore.QObject):
+    """Lleva los avisos del motor (que corre en su propio hilo) a la GUI
+    mediante señales en cola."""
+
+    samples_received = QtCore.pyqtSignal(str, object)
+    station_status = QtCore.pyqtSignal(str, str, str)
+    wifi_result = QtCore.pyqtSignal(bool, str)
+    ports_found = QtCore.pyqtSignal(object)
+    gap_detected = QtCore.pyqtSignal(str, float, float, str)
+
+    def on_samples(self, name, samples):
+        self.samples_received.emit(name, samples)
+
+    def on_status(self, name, state, detail=""):
+        self.station_status.emit(name, state, detail)
+
+    def on_gap(self, name, start, end, reason):
+        self.gap_detected.emit(name, start, end, reason)
+
+    def on_wifi_done(self, future):
+        try:
+            ok, message = future.result()
+        except Exception as e:
+            ok, message = False, f"🔴 Error: {str(e)[:30]}"
+        self.wifi_result.emit(ok, message)
+
+
+# ===================== EXPORTACIÓN =====================
+class ExportWorker(QtCore.QThread):
+    """Ejecuta una exportación en segundo plano para no congelar la interfaz.
+
+    ``task(progress, cancelled)`` hace el trabajo y su resultado llega por
+    la señal ``done``.
+    """
+
+    progress = QtCore.pyqtSignal(int, int)
+    done = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+    cancelled = QtCore.pyqtSignal()
+
+    def __init__(self, task, parent=None):
+        super().__init__(parent)
+        self.task = task
+        self._cancel = False
+
+    def cancel(self):
+        self._cancel = True
+
+    def run(self):
+        try:
+            result = self.task(self.progress.emit, lambda: self._cancel)
+            self.done.emit(result)
+        except ExportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            print(f"Error al exportar: {e}")
+            self.failed.emit(str(e))
+
+
+# ===================== RESUMEN =====================
+class SummaryDialog(QtWidgets.QDialog):
+    """Tabla por día u hora de lo archivado: medias, extremos y derivados.
+
+    El cálculo lo hace la ventana principal en segundo plano (``requested``)
+    y el resultado vuelve con ``show_result``.
+    """
+
+    requested = QtCore.pyqtSignal(str, str, int)
+
+    PERIODS = {"Por día": "day", "Por hora": "hour"}
+    # (encabezado, columna de ``summarize``, variable de la unidad, decimales);
+    # decimales None = los de la unidad, +1 en las tendencias
+    TABLE = (
+        ("Muestras", "samples", None, 0),
+        ("Temp. media ({temp})", "temp_mean", "temp", 1),
+        ("Temp. mín", "temp_min", "temp", 1),
+        ("Temp. máx", "temp_max", "temp", 1),
+        ("Hum. media (%)", "hum_mean", None, 0),
+        ("Punto de rocío ({temp})", "dew_point_mean", "temp", 1),
+        ("Índice de calor máx ({temp})", "heat_index_max", "temp", 1),
+        ("Presión media ({pres})", "pres_mean", "pres", None),
+        ("Tendencia ({pres}/h)", "pres_trend", "pres", None),
+        ("UV máx", "uv_max", None, 1),
+        ("Dosis UV (SED)", "uv_dose", None, 2),
+    )
+
+    def __init__(self, stations, units, parent=None):
+        super().__init__(parent)
+        self.units = units
+        self.setWindowTitle("Resumen de Mediciones")
+        self.resize(1000, 480)
+
+        controls = QtWidgets.QHBoxLayout()
+        self.station_box = QtWidgets.QComboBox()
+        self.station_box.addItems(stations)
+        self.period_box = QtWidgets.QComboBox()
+        self.period_box.addItems(list(self.PERIODS))
+        self.days_box = QtWidgets.QSpinBox()
+        self.days_box.setRange(0, 3650)
+        self.days_box.setValue(7)
+        self.days_box.setSpecialValueText("Todo")
+        self.days_box.setSuffix(" días")
+        self.btn_compute = QtWidgets.QPushButton("📈 Calcular")
+        self.btn_compute.clicked.connect(self.compute)
+        self.btn_compute.setEnabled(bool(stations))
+        controls.addWidget(QtWidgets.QLabel("Estación:"))
+        controls.addWidget(self.station_box, 1)
+        controls.addWidget(self.period_box)
+        controls.addWidget(QtWidgets.QLabel("Últimos:"))
+        controls.addWidget(self.days_box)
+        controls.addWidget(self.btn_compute)
+
+        self.table = QtWidgets.QTableWidget(0, len(self.TABLE))
+        self.table.setHorizontalHeaderLabels([title.format(**units) for title, *_ in self.TABLE])
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.ResizeToContents)
+        self.info = QtWidgets.QLabel("Sin datos archivados" if not stations else "")
+
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(controls)
+        layout.addWidget(self.table, 1)
+        layout.addWidget(self.info)
+
+    def compute(self):
+        self.btn_compute.setEnabled(False)
+        self.requested.emit(self.station_box.currentText(),
+                            self.PERIODS[self.period_box.currentText()], self.days_box.value())
+
+    def computation_finished(self):
+        self.btn_compute.setEnabled(self.station_box.count() > 0)
+
+    def show_result(self, station, period, result):
+        starts = result["start"]
+        fmt = "%d/%m/%Y" if period == "day" else "%d/%m %H:%M"
+        self.table.setRowCount(len(starts))
+        self.table.setVerticalHeaderLabels([datetime.fromtimestamp(t).strftime(fmt) for t in starts])
+        for col, (_, key, variable, decimals) in enumerate(self.TABLE):
+            values = result[key] / SED if key == "uv_dose" else result[key]
+            spec = f".{decimals}f"
+            if variable is not None:
+                trend = key.endswith("_trend")
+                values = convert(values, variable, self.units[variable], delta=trend)
+                if decimals is None:
+                    decimals = UNIT_DECIMALS[self.units[variable]]
+                    spec = f"+.{decimals + 1}f" if trend else f".{decimals}f"
+            for row, value in enumerate(values.tolist()):
+                item = QtWidgets.QTableWidgetItem("—" if value != value else format(value, spec))
+                item.setTextAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+                self.table.setItem(row, col, item)
+        self.info.setText(f"{station}: {int(result['samples'].sum())} muestras en {len(starts)} periodos")
+
 
 # ===================== APP PRINCIPAL =====================
 class EstacionApp(QtWidgets.QWidget):
@@ -163,30 +603,83 @@ class EstacionApp(QtWidgets.QWidget):
         super().__init__()
         
         # Variables de estado
-        self.serial_conn = None
-        self.sock = None
-        self.wifi_configured = False  # Ya no es obligatorio
+        # Configuración persistente (estacion_config.json junto a este archivo)
+        self.config = Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "estacion_config.json"))
+        self.config_timer = QtCore.QTimer()
+        self.config_timer.setSingleShot(True)
+        self.config_timer.timeout.connect(self.config.save)
+        self.auto_connect_pending = self.config["auto_connect"] and self.config["was_measuring"]
+
+        self.wifi_configured = self.config["wifi_configured"]  # Ya no es obligatorio
+        self.pending_ssid = ""
         self.conn_mode = "Serial"
         self.measuring = False
+        self.connecting = False
+        self.stations = []          # estaciones agregadas por el usuario
+        self.active = {}            # nombre -> StationConfig en medición
+        self.station_state = {}     # nombre -> estado informado por el motor
         self.wifi_ip = "192.168.4.1"  # IP por defecto de ESP32 en modo AP
         self.wifi_port = 3333
         
-        # Datos
-        self.data_log = []
-        self.uv_data, self.temp_data, self.hum_data, self.pres_data = [], [], [], []
-        
+        # Datos por estación: columnas alineadas con memoria acotada;
+        # lo más antiguo va a disco
+        self.spill_dir = tempfile.mkdtemp(prefix="climalab_")
+        self.export_worker = None
+        self.stores = {}
+
+        # Estadísticas en vivo por estación y alertas (reglas en la configuración)
+        self.stats = {}
+        self.alerts = AlertEngine(load_rules(self.config["alerts"]))
+
+        # Registro de la sesión en disco: cada bloque se guarda al llegar
+        self.session_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sesiones")
+        self.session_log = None
+
+        # Archivo columnar (destino por defecto); el Excel se genera desde él
+        self.archive_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "archivo")
+        self.archived = {}          # nombre -> (filas, huecos) de la sesión ya archivados
+        self.summary_dialog = None
+
+        # Unidades en pantalla (lo guardado queda en °C y Pa)
+        self.units = {"uv": "", "temp": "°C", "hum": "%", "pres": "Pa"}
+
+        # Servidor HTTP/SSE para ver las mediciones desde otra PC (opcional)
+        self.live = None
+
+        # Motor de adquisición: un hilo con bucle asyncio para todas las estaciones
+        self.bridge = EngineBridge()
+        self.bridge.samples_received.connect(self.on_samples_received)
+        self.bridge.station_status.connect(self.on_station_status)
+        self.bridge.wifi_result.connect(self.on_wifi_result)
+        self.bridge.ports_found.connect(self.on_ports_found)
+        self.bridge.gap_detected.connect(self.on_gap)
+        self.engine = AcquisitionEngine(self.bridge.on_samples, self.bridge.on_status, on_gap=self.bridge.on_gap)
+        self.engine.start()
+
         # Timers
-        self.timer = QtCore.QTimer()
-        self.timer.timeout.connect(self.read_data)
-        
+        # Refresco del gráfico (~10 fps como máximo, solo si hay datos nuevos)
+        self.graph_dirty = False
+        self.graph_timer = QtCore.QTimer()
+        self.graph_timer.timeout.connect(self.update_graph)
+        self.graph_timer.start(100)
+
         self.end_timer = QtCore.QTimer()
         self.end_timer.timeout.connect(self.stop_measurement)
+
+        # Latencia de cada estación en la lista (solo mientras se mide)
+        self.link_timer = QtCore.QTimer()
+        self.link_timer.timeout.connect(self.update_station_labels)
         
         # Configurar UI
+        self.chart_pending = False
         self.setup_ui()
+        self.apply_config()
+        startup.mark("ventana construida")
         
-        # Inicializar lista de puertos
-        QtCore.QTimer.singleShot(100, self.refresh_ports_list)
+        # Lista de puertos en vivo: un hilo vigila conexiones y desconexiones
+        self.port_watcher = PortWatcher(self.bridge.ports_found.emit, busy=self.busy_ports)
+        self.port_watcher.start()
+        QtCore.QTimer.singleShot(0, self.check_unfinished_sessions)
 
     def setup_ui(self):
         self.setWindowTitle("Estación de Monitoreo")
@@ -272,6 +765,19 @@ class EstacionApp(QtWidgets.QWidget):
         
         left_panel.addLayout(grid)
 
+        # Estación mostrada en tarjetas y gráfico
+        station_layout = QtWidgets.QHBoxLayout()
+        station_label = QtWidgets.QLabel("🛰️ Estación:")
+        station_label.setStyleSheet("font-size: 14px; font-weight: bold; color: #6A1B9A;")
+        station_layout.addWidget(station_label)
+        self.station_box = QtWidgets.QComboBox()
+        self.station_box.currentTextChanged.connect(self.station_changed)
+        station_layout.addWidget(self.station_box, 1)
+        self.compare_box = QtWidgets.QCheckBox("Comparar estaciones")
+        self.compare_box.toggled.connect(self.view_changed)
+        station_layout.addWidget(self.compare_box)
+        left_panel.addLayout(station_layout)
+
         # Selector de gráfico
         graph_label = QtWidgets.QLabel("📈 Visualización de Gráficos:")
         graph_label.setStyleSheet("font-size: 14px; font-weight: bold; color: #6A1B9A;")
@@ -280,23 +786,24 @@ class EstacionApp(QtWidgets.QWidget):
         self.graph_selector = QtWidgets.QComboBox()
         self.graph_selector.addItems(["Índice UV", "Temperatura", "Humedad", "Presión", "Todas las Variables"])
         self.graph_selector.setStyleSheet("padding: 10px; font-size: 14px;")
-        self.graph_selector.currentIndexChanged.connect(self.update_graph)
+        self.graph_selector.currentIndexChanged.connect(self.view_changed)
         left_panel.addWidget(self.graph_selector)
 
-        # Gráfico
-        self.figure = Figure(figsize=(7, 3.5), facecolor='white', dpi=90)
-        self.canvas = FigureCanvas(self.figure)
-        self.canvas.setMinimumHeight(280)
-        self.canvas.setMaximumHeight(320)
-        self.canvas.setStyleSheet("""
+        # Gráfico: matplotlib se carga después del primer pintado (setup_chart);
+        # mientras tanto se reserva el espacio
+        self.chart = None
+        self.chart_placeholder = QtWidgets.QLabel("Cargando gráfico...")
+        self.chart_placeholder.setAlignment(QtCore.Qt.AlignCenter)
+        self.chart_placeholder.setMinimumHeight(280)
+        self.chart_placeholder.setMaximumHeight(320)
+        self.chart_placeholder.setStyleSheet("""
             border-radius: 10px;
             border: 2px solid #D1C4E9;
             background: white;
+            color: #9E9E9E;
         """)
-        self.ax = self.figure.add_subplot(111)
-        self.ax.set_facecolor('#FAFAFA')
-        self.ax.grid(True, linestyle='--', alpha=0.4, linewidth=0.5)
-        left_panel.addWidget(self.canvas)
+        self.chart_layout = left_panel
+        left_panel.addWidget(self.chart_placeholder)
 
         # Panel derecho (controles)
         right_panel = QtWidgets.QFrame()
@@ -351,6 +858,22 @@ class EstacionApp(QtWidgets.QWidget):
         self.port_box.setStyleSheet("font-family: 'Consolas', monospace;")
         right_layout.addWidget(self.port_box)
 
+        # Estaciones: se agregan con la configuración actual de conexión
+        right_layout.addWidget(QtWidgets.QLabel("🛰️ Estaciones (vacío = la configuración actual):"))
+        self.station_list = QtWidgets.QListWidget()
+        self.station_list.setMaximumHeight(90)
+        self.station_list.setStyleSheet("background: white; border: 2px solid #D1C4E9; border-radius: 6px;")
+        right_layout.addWidget(self.station_list)
+
+        stations_btns = QtWidgets.QHBoxLayout()
+        self.btn_add_station = QtWidgets.QPushButton("➕ Agregar")
+        self.btn_add_station.clicked.connect(self.add_station)
+        stations_btns.addWidget(self.btn_add_station)
+        self.btn_remove_station = QtWidgets.QPushButton("➖ Quitar")
+        self.btn_remove_station.clicked.connect(self.remove_station)
+        stations_btns.addWidget(self.btn_remove_station)
+        right_layout.addLayout(stations_btns)
+
         # Botón WiFi (solo visible en modo Serial)
         self.btn_wifi = QtWidgets.QPushButton("⚙️ Configurar WiFi de ESP32")
         self.btn_wifi.clicked.connect(self.configure_wifi)
@@ -389,6 +912,49 @@ class EstacionApp(QtWidgets.QWidget):
         interval_layout.addWidget(self.interval)
         right_layout.addLayout(interval_layout)
 
+        # Adquisición: consulta DATA por intervalo o streaming continuo
+        acq_layout = QtWidgets.QHBoxLayout()
+        acq_layout.addWidget(QtWidgets.QLabel("📥 Adquisición:"))
+        self.acq_box = QtWidgets.QComboBox()
+        self.acq_box.addItems(["Consulta (DATA)", "Continua (STREAM)"])
+        self.acq_box.currentIndexChanged.connect(self.acq_mode_changed)
+        acq_layout.addWidget(self.acq_box)
+        right_layout.addLayout(acq_layout)
+
+        rate_layout = QtWidgets.QHBoxLayout()
+        rate_layout.addWidget(QtWidgets.QLabel("⚡ Frecuencia:"))
+        self.rate = QtWidgets.QSpinBox()
+        self.rate.setSuffix(" Hz")
+        self.rate.setRange(1, 50)
+        self.rate.setValue(10)
+        self.rate.setEnabled(False)
+        rate_layout.addWidget(self.rate)
+        right_layout.addLayout(rate_layout)
+
+        format_layout = QtWidgets.QHBoxLayout()
+        format_layout.addWidget(QtWidgets.QLabel("🧩 Formato:"))
+        self.format_box = QtWidgets.QComboBox()
+        self.format_box.addItems(["Texto (CSV)", "Binario"])
+        format_layout.addWidget(self.format_box)
+        self.raw_box = QtWidgets.QCheckBox("🔬 Crudos")
+        self.raw_box.setToolTip("Guardar también la lectura del ADC de UV para poder recalibrar después")
+        format_layout.addWidget(self.raw_box)
+        right_layout.addLayout(format_layout)
+
+        units_layout = QtWidgets.QHBoxLayout()
+        units_layout.addWidget(QtWidgets.QLabel("📏 Unidades:"))
+        self.temp_unit_box = QtWidgets.QComboBox()
+        self.temp_unit_box.addItems(list(UNITS["temp"]))
+        units_layout.addWidget(self.temp_unit_box)
+        self.pres_unit_box = QtWidgets.QComboBox()
+        self.pres_unit_box.addItems(list(UNITS["pres"]))
+        units_layout.addWidget(self.pres_unit_box)
+        right_layout.addLayout(units_layout)
+
+        # Tableros remotos: republica lo que llega, sin consultar más a la ESP32
+        self.live_box = QtWidgets.QCheckBox("🌍 Publicar en la red (tablero en vivo)")
+        right_layout.addWidget(self.live_box)
+
         # Botones principales
         self.btn_start = QtWidgets.QPushButton("▶️ INICIAR MEDICIÓN")
         self.btn_start.clicked.connect(self.start_measurement)
@@ -400,16 +966,27 @@ class EstacionApp(QtWidgets.QWidget):
         self.btn_stop.setStyleSheet("background: #FF9800;")
         right_layout.addWidget(self.btn_stop)
 
+        self.btn_archive = QtWidgets.QPushButton("💾 GUARDAR EN ARCHIVO")
+        self.btn_archive.setEnabled(False)
+        self.btn_archive.clicked.connect(self.save_archive)
+        self.btn_archive.setStyleSheet("background: #00897B;")
+        right_layout.addWidget(self.btn_archive)
+
         self.btn_export = QtWidgets.QPushButton("📊 EXPORTAR A EXCEL")
         self.btn_export.setEnabled(False)
         self.btn_export.clicked.connect(self.export_excel)
         self.btn_export.setStyleSheet("background: #4CAF50;")
         right_layout.addWidget(self.btn_export)
 
-        btn_reset = QtWidgets.QPushButton("🔄 REINICIAR TODO")
-        btn_reset.clicked.connect(self.reset_all)
-        btn_reset.setStyleSheet("background: #9C27B0;")
-        right_layout.addWidget(btn_reset)
+        self.btn_summary = QtWidgets.QPushButton("📈 RESUMEN")
+        self.btn_summary.clicked.connect(self.show_summary)
+        self.btn_summary.setStyleSheet("background: #3949AB;")
+        right_layout.addWidget(self.btn_summary)
+
+        self.btn_reset = QtWidgets.QPushButton("🔄 REINICIAR TODO")
+        self.btn_reset.clicked.connect(self.reset_all)
+        self.btn_reset.setStyleSheet("background: #9C27B0;")
+        right_layout.addWidget(self.btn_reset)
 
         btn_refresh = QtWidgets.QPushButton("🔁 ACTUALIZAR PUERTOS")
         btn_refresh.clicked.connect(self.refresh_ports_list)
@@ -460,44 +1037,182 @@ class EstacionApp(QtWidgets.QWidget):
             self.btn_wifi.setEnabled(True)
             self.status.setText("🟦 Modo Serial: Seleccione puerto")
 
-    def refresh_ports_list(self):
-        """Actualiza lista de puertos"""
+    def acq_mode_changed(self, index):
+        """El intervalo aplica a la consulta; la frecuencia, al streaming"""
+        streaming = index == 1
+        self.interval.setEnabled(not streaming)
+        self.rate.setEnabled(streaming)
+
+    def apply_config(self):
+        """Pone en los controles los valores guardados y los guarda al cambiar"""
+        cfg = self.config
         try:
-            current = self.port_box.currentText()
-            self.port_box.clear()
-            
-            ports = list(serial.tools.list_ports.comports())
-            
-            if ports:
-                for p in ports:
-                    self.port_box.addItem(p.device)
-                # Intentar mantener la selección anterior
-                if current in [p.device for p in ports]:
-                    self.port_box.setCurrentText(current)
-                elif ports:
-                    self.port_box.setCurrentIndex(0)
-            else:
-                self.port_box.addItem("Sin puertos disponibles")
-                
+            width, height = cfg["window_size"]
+            self.resize(int(width), int(height))
+            self.mode_box.setCurrentText(cfg["mode"])
+            self.wifi_ip_input.setText(str(cfg["wifi_ip"]))
+            self.wifi_port_input.setText(str(cfg["wifi_port"]))
+            self.duration.setValue(int(cfg["duration"]))
+            self.interval.setValue(int(cfg["interval"]))
+            self.acq_box.setCurrentIndex(int(cfg["acq_mode"]))
+            self.rate.setValue(int(cfg["rate"]))
+            self.format_box.setCurrentIndex(1 if cfg["binary"] else 0)
+            self.raw_box.setChecked(bool(cfg["raw"]))
+            units = cfg["units"]
+            self.temp_unit_box.setCurrentText(units.get("temp", "°C"))
+            self.pres_unit_box.setCurrentText(units.get("pres", "Pa"))
+            self.units_changed()
+            self.live_box.setChecked(bool(cfg["live_server"]))
+            self.stations = [StationConfig.from_dict(d) for d in cfg["stations"]]
         except Exception as e:
-            print(f"Error actualizando puertos: {e}")
-            self.port_box.addItem("Error leyendo puertos")
+            print(f"Error aplicando la configuración: {e}")
+        self.refresh_station_list()
 
-    def safe_close_serial(self):
-        """Cierra conexiones de forma segura"""
-        try:
-            if self.serial_conn:
-                self.serial_conn.close()
-        except:
-            pass
-        self.serial_conn = None
-        
+        self.mode_box.currentTextChanged.connect(self.settings_changed)
+        self.wifi_ip_input.editingFinished.connect(self.settings_changed)
+        self.wifi_port_input.editingFinished.connect(self.settings_changed)
+        self.duration.valueChanged.connect(self.settings_changed)
+        self.interval.valueChanged.connect(self.settings_changed)
+        self.acq_box.currentIndexChanged.connect(self.settings_changed)
+        self.rate.valueChanged.connect(self.settings_changed)
+        self.format_box.currentIndexChanged.connect(self.settings_changed)
+        self.raw_box.toggled.connect(self.settings_changed)
+        for box in (self.temp_unit_box, self.pres_unit_box):
+            box.currentTextChanged.connect(self.units_changed)
+            box.currentTextChanged.connect(self.settings_changed)
+        self.port_box.activated.connect(self.settings_changed)
+        self.live_box.toggled.connect(self.live_toggled)
+        if self.live_box.isChecked():
+            self.start_live_server()
+
+    def settings_changed(self, *args):
+        """Copia los controles a la configuración y la guarda poco después"""
         try:
-            if self.sock:
-                self.sock.close()
-        except:
-            pass
-        self.sock = None
+            wifi_port = int(self.wifi_port_input.text().strip())
+        except ValueError:
+            wifi_port = self.config["wifi_port"]
+        port = self.port_box.currentText()
+        if port and not port.startswith(("Sin puertos", "Error")):
+            self.config.set("last_port", port)
+        self.config.update(
+            mode=self.mode_box.currentText(),
+            wifi_ip=self.wifi_ip_input.text().strip(),
+            wifi_port=wifi_port,
+            duration=self.duration.value(),
+            interval=self.interval.value(),
+            acq_mode=self.acq_box.currentIndex(),
+            rate=self.rate.value(),
+            binary=self.format_box.currentIndex() == 1,
+            raw=self.raw_box.isChecked(),
+            units={"temp": self.temp_unit_box.currentText(), "pres": self.pres_unit_box.currentText()},
+            stations=[config.to_dict() for config in self.stations],
+        )
+        if self.config.dirty:
+            self.config_timer.start(500)
+
+    def units_changed(self, *args):
+        """Cambia las unidades en pantalla: tarjetas, gráfico y resumen"""
+        self.units.update(temp=self.temp_unit_box.currentText(), pres=self.pres_unit_box.currentText())
+        if self.chart is not None:
+            self.chart.units.update(self.units)
+            self.view_changed()
+        self.update_cards()
+
+    def setup_chart(self):
+        """Crea el gráfico de matplotlib (la importación es lo más lento del arranque)"""
+        if self.chart is not None:
+            return
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.figure import Figure
+
+        self.figure = Figure(figsize=(7, 3.5), facecolor='white', dpi=90)
+        self.canvas = FigureCanvas(self.figure)
+        self.canvas.setMinimumHeight(280)
+        self.canvas.setMaximumHeight(320)
+        self.canvas.setStyleSheet("""
+            border-radius: 10px;
+            border: 2px solid #D1C4E9;
+            background: white;
+        """)
+        self.chart = LiveChart(self.figure, self.canvas)
+        self.chart.units.update(self.units)
+        self.chart_layout.replaceWidget(self.chart_placeholder, self.canvas)
+        self.chart_placeholder.deleteLater()
+        self.view_changed()
+        startup.mark("gráfico listo")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.chart is None and not self.chart_pending:
+            self.chart_pending = True
+            startup.mark("primer pintado")
+            QtCore.QTimer.singleShot(0, self.setup_chart)
+
+    def refresh_ports_list(self):
+        """Pide al vigilante de puertos una revisión inmediata"""
+        self.port_watcher.rescan()
+
+    def busy_ports(self):
+        """Puertos que usa la medición (el vigilante no los sondea)"""
+        return [c.target for c in list(self.active.values()) if c.kind == "serial"]
+
+    def on_ports_found(self, ports):
+        """Actualiza la lista de puertos (y reconecta estaciones que reaparecen)"""
+        current = self.port_box.currentText()
+        self.port_box.clear()
+
+        if ports is None:
+            self.port_box.addItem("Error leyendo puertos")
+            return
+
+        # Si hay adaptadores de ESP32 solo se muestran esos
+        shown = [p for p in ports if p.is_candidate] or ports
+        devices = [p.device for p in shown]
+        for i, port in enumerate(shown):
+            self.port_box.addItem(port.device)
+            tip = port.description
+            if port.chip:
+                tip = f"{tip} · {port.chip}"
+            if port.station:
+                tip = f"{tip} · estación ClimaLab confirmada"
+            self.port_box.setItemData(i, tip, QtCore.Qt.ToolTipRole)
+
+        if shown:
+            # Mantener la selección anterior, o una estación confirmada, o el último puerto usado
+            confirmed = [p.device for p in shown if p.station]
+            if current in devices:
+                self.port_box.setCurrentText(current)
+            elif self.config["last_port"] in devices:
+                self.port_box.setCurrentText(self.config["last_port"])
+            elif confirmed:
+                self.port_box.setCurrentText(confirmed[0])
+            else:
+                self.port_box.setCurrentIndex(0)
+        else:
+            self.port_box.addItem("Sin puertos disponibles")
+        startup.mark("puertos listados")
+
+        present = {p.device for p in ports}
+        if self.measuring:
+            # Tras un tirón del cable el puerto vuelve a aparecer: se
+            # reintenta ya en lugar de esperar al siguiente reintento
+            for name, config in self.active.items():
+                if (config.kind == "serial" and config.target in present
+                        and self.station_state.get(name) in ("error", "reconnecting")):
+                    self.status.setText(f"🔄 Reconectando {name}...")
+                    self.engine.submit(self.engine.retry_station(name))
+
+        if self.auto_connect_pending:
+            self.auto_connect_pending = False
+            self.auto_connect([p.device for p in ports])
+
+    def auto_connect(self, ports):
+        """Retoma la medición que quedó en curso al cerrarse la app"""
+        if self.stations or self.conn_mode == "WiFi" or self.config["last_port"] in ports:
+            self.status.setText("🔄 Reconectando a la última estación...")
+            self.start_measurement()
+        else:
+            self.status.setText(f"⚠️ No se encontró el puerto {self.config['last_port']}")
 
     def configure_wifi(self):
         """Configura WiFi de la ESP32 (solo modo Serial)"""
@@ -505,153 +1220,255 @@ class EstacionApp(QtWidgets.QWidget):
         if not port or "Sin puertos" in port:
             self.status.setText("⚠️ Seleccione un puerto válido")
             return
-        
-        # Cerrar conexión previa
-        self.safe_close_serial()
-        
-        try:
-            self.serial_conn = serial.Serial(port, 115200, timeout=2)
-        except Exception as e:
-            error_msg = str(e)
-            if "denied" in error_msg.lower():
-                self.status.setText("🔴 Puerto en uso. Cierre otras apps")
-            else:
-                self.status.setText(f"🔴 Error: {error_msg[:30]}")
-            return
 
         dialog = WiFiDialog(self)
+        dialog.ssid.setText(self.config["wifi_ssid"])
         if not dialog.exec_():
-            self.safe_close_serial()
             return
 
         ssid, password = dialog.get_data()
-        
+        self.pending_ssid = ssid
+
+        # El envío y la espera de OK_WIFI ocurren en el hilo del motor
+        self.btn_wifi.setEnabled(False)
+        self.btn_start.setEnabled(False)
+        self.status.setText("⏳ Configurando WiFi...")
+        future = self.engine.submit(self.engine.configure_wifi(port, ssid, password))
+        future.add_done_callback(self.bridge.on_wifi_done)
+
+    def on_wifi_result(self, ok, message):
+        if ok:
+            self.wifi_configured = True
+            self.config.update(wifi_configured=True, wifi_ssid=self.pending_ssid)
+            self.config.save()
+        self.status.setText(message)
+        self.btn_wifi.setEnabled(self.conn_mode == "Serial")
+        self.btn_start.setEnabled(True)
+
+    def current_station_config(self):
+        """StationConfig con los controles actuales, o None si falta algo"""
+        stream_ms = 0
+        if self.acq_box.currentIndex() == 1:
+            stream_ms = 1000 // self.rate.value()
+        options = dict(
+            interval=self.interval.value(),
+            stream_ms=stream_ms,
+            binary=self.format_box.currentIndex() == 1,
+            raw=self.raw_box.isChecked(),
+        )
+
+        if self.conn_mode == "Serial":
+            port = self.port_box.currentText()
+            if not port or "Sin puertos" in port:
+                self.status.setText("⚠️ Seleccione un puerto válido")
+                return None
+            return StationConfig(port, "serial", port, **options)
+
+        # Modo WiFi - NO requiere configuración previa
+        ip = self.wifi_ip_input.text().strip()
+        if not ip:
+            self.status.setText("⚠️ Ingrese la IP de la ESP32")
+            return None
         try:
-            # Limpiar buffer
-            if self.serial_conn.in_waiting:
-                self.serial_conn.read(self.serial_conn.in_waiting)
-            
-            self.serial_conn.write(f"SET_WIFI,{ssid},{password}\n".encode())
-            
-            # Esperar respuesta
-            confirmed = False
-            for _ in range(40):  # 4 segundos
-                if self.serial_conn.in_waiting:
-                    line = self.serial_conn.readline().decode(errors="ignore").strip()
-                    if "OK_WIFI" in line:
-                        confirmed = True
-                        break
-                QtCore.QThread.msleep(100)
-            
-            if confirmed:
-                self.wifi_configured = True
-                self.status.setText("✅ WiFi configurado correctamente")
-            else:
-                self.status.setText("⚠️ Sin respuesta del ESP32")
-                
-        except Exception as e:
-            self.status.setText(f"🔴 Error: {str(e)[:30]}")
-        finally:
-            self.safe_close_serial()
+            tcp_port = int(self.wifi_port_input.text().strip())
+        except ValueError:
+            self.status.setText("⚠️ Puerto inválido")
+            return None
+        return StationConfig(f"{ip}:{tcp_port}", "tcp", ip, tcp_port, **options)
+
+    def add_station(self):
+        config = self.current_station_config()
+        if not config:
+            return
+        if any(st.name == config.name for st in self.stations):
+            self.status.setText("⚠️ Esa estación ya está en la lista")
+            return
+        self.stations.append(config)
+        self.refresh_station_list()
+        self.settings_changed()
+
+    def remove_station(self):
+        row = self.station_list.currentRow()
+        if row < 0 or self.measuring or self.connecting:
+            return
+        del self.stations[row]
+        self.refresh_station_list()
+        self.settings_changed()
+
+    def refresh_station_list(self):
+        self.station_list.clear()
+        self.station_list.addItems([""] * len(self.stations))
+        self.update_station_labels()
+
+    def update_station_labels(self):
+        """Actualiza los textos sin rehacer la lista (se conserva la selección)"""
+        if self.station_list.count() != len(self.stations):
+            self.refresh_station_list()
+            return
+        for row, config in enumerate(self.stations):
+            item = self.station_list.item(row)
+            item.setText(self.station_label(config))
+            # Jitter y latencia de la sesión (reloj del dispositivo)
+            item.setToolTip(self.engine.timing_summary(config.name))
+
+    def station_label(self, config):
+        labels = {
+            "connecting": "⏳", "connected": "🟢", "error": "🔴", "stopped": "⚪",
+            "reconnecting": "🔄",
+        }
+        state = self.station_state.get(config.name)
+        label = f"{labels.get(state, '⚪')} {config.name} ({config.kind})"
+        rtt, _ = self.engine.link_stats(config.name)
+        if state == "connected" and rtt is not None:
+            label += f" · {rtt * 1000:.0f} ms"
+        store = self.stores.get(config.name)
+        if store is not None and store.gaps:
+            # Tiempo sin datos acumulado por desconexiones
+            downtime = sum(end - start for start, end, _ in store.gaps)
+            label += f" · {len(store.gaps)} cortes, {downtime:.0f} s sin datos"
+        return label
 
     def start_measurement(self):
-        if self.measuring:
+        if self.measuring or self.connecting:
             return
-            
-        # Cerrar conexiones previas
-        self.safe_close_serial()
-        
-        try:
-            if self.conn_mode == "Serial":
-                port = self.port_box.currentText()
-                if not port or "Sin puertos" in port:
-                    self.status.setText("⚠️ Seleccione un puerto válido")
-                    return
-                    
-                print(f"Conectando a {port}...")
-                self.serial_conn = serial.Serial(port, 115200, timeout=2)
-                
-                # Pequeña pausa para estabilizar
-                QtCore.QThread.msleep(1000)
-                
-            else:  # Modo WiFi - NO requiere configuración previa
-                # Obtener IP y puerto de los campos de entrada
-                ip = self.wifi_ip_input.text().strip()
-                port = int(self.wifi_port_input.text().strip())
-                
-                if not ip:
-                    self.status.setText("⚠️ Ingrese la IP de la ESP32")
-                    return
-                    
-                print(f"Conectando WiFi a {ip}:{port}...")
-                self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.sock.settimeout(3)
-                self.sock.connect((ip, port))
-
-            # Iniciar medición
-            self.timer.start(self.interval.value() * 1000)
-            self.end_timer.start(self.duration.value() * 60000)
-            
-            self.status.setText(f"🟡 Midiendo ({self.duration.value()} min)")
-            self.status.setStyleSheet("""
-                QLabel {
-                    padding: 12px;
-                    border-radius: 8px;
-                    background: #FFF3E0;
-                    border: 2px solid #FFCC80;
-                    font-size: 13px;
-                    font-weight: bold;
-                    color: #EF6C00;
-                }
-            """)
-            
-            self.measuring = True
-            self.btn_start.setEnabled(False)
-            self.btn_stop.setEnabled(True)
-            self.btn_wifi.setEnabled(False)
-            
-            # Primera lectura
-            QtCore.QTimer.singleShot(500, self.read_data)
-            
-        except Exception as e:
-            error_msg = str(e)
-            print(f"Error en start_measurement: {error_msg}")
-            
-            if self.conn_mode == "Serial":
-                if "denied" in error_msg.lower():
-                    self.status.setText("🔴 Puerto bloqueado. Use 'Reiniciar Todo'")
-                elif "not found" in error_msg.lower():
-                    self.status.setText("🔴 Puerto no encontrado")
-                else:
-                    self.status.setText(f"🔴 Error Serial: {error_msg[:30]}")
+
+        if self.stations:
+            configs = list(self.stations)
+        else:
+            config = self.current_station_config()
+            if not config:
+                return
+            configs = [config]
+
+        if self.session_log is None:
+            self.open_session_log(new_session_path(self.session_dir))
+
+        # Si la app se cierra de golpe, al volver a abrirla se reconecta sola
+        self.settings_changed()
+        self.config.set("was_measuring", True)
+        self.config.save()
+
+        # Las conexiones se abren en el motor; la ventana sigue respondiendo
+        # La calibración se busca por nombre de estación en la configuración
+        for config in configs:
+            config.calibration = self.config["calibration"].get(config.name, {})
+
+        self.connecting = True
+        self.active = {config.name: config for config in configs}
+        for config in configs:
+            self.station_state[config.name] = "connecting"
+            if config.name not in self.stores:
+                self.add_store(config.name)
+            self.engine.submit(self.engine.start_station(config))
+
+        self.refresh_station_list()
+        self.refresh_station_box()
+        self.btn_start.setEnabled(False)
+        self.btn_wifi.setEnabled(False)
+        self.status.setText("⏳ Conectando...")
+
+    def on_station_status(self, name, state, detail):
+        if name not in self.active:
+            return
+        if self.live is not None:
+            self.live.status(name, state, detail)
+
+        if state == "dropped":
+            print(f"{name}: muestras perdidas (saltos de secuencia): {detail}")
+            if self.measuring:
+                self.status.setText(f"🟡 Midiendo ({self.duration.value()} min) · {name}: {detail} perdidas")
+            return
+
+        if state == "recovered":
+            # Muestras del corte descargadas del registro de la estación
+            print(f"{name}: {detail} muestras recuperadas del registro de la estación")
+            if self.measuring:
+                self.status.setText(f"♻️ {name[:20]}: {detail} muestras recuperadas tras el corte")
+            return
+
+        self.station_state[name] = state
+        self.refresh_station_list()
+
+        if state == "connected" and self.connecting:
+            self.on_connected()
+        elif state == "reconnecting":
+            if self.measuring:
+                self.status.setText(f"🔄 {name[:20]}: reintento en {detail} s")
+        elif state == "error":
+            print(f"Error en estación {name}: {detail}")
+            failed = all(self.station_state.get(n) in ("error", "reconnecting") for n in self.active)
+            if self.connecting and failed:
+                self.on_connect_failed(detail, self.active[name].kind)
+                self.engine.submit(self.engine.stop_stations())
+            elif self.measuring:
+                self.status.setText(f"🔴 {name[:20]}: {detail[:30]}")
+
+    def on_connected(self):
+        self.connecting = False
+
+        # Iniciar medición
+        self.end_timer.start(self.duration.value() * 60000)
+        self.link_timer.start(1000)
+
+        self.status.setText(f"🟡 Midiendo ({self.duration.value()} min)")
+        self.status.setStyleSheet("""
+            QLabel {
+                padding: 12px;
+                border-radius: 8px;
+                background: #FFF3E0;
+                border: 2px solid #FFCC80;
+                font-size: 13px;
+                font-weight: bold;
+                color: #EF6C00;
+            }
+        """)
+
+        self.measuring = True
+        self.btn_start.setEnabled(False)
+        self.btn_stop.setEnabled(True)
+        self.btn_wifi.setEnabled(False)
+
+    def on_connect_failed(self, error_msg, kind="serial"):
+        print(f"Error en start_measurement: {error_msg}")
+        self.connecting = False
+
+        if kind == "serial":
+            if "denied" in error_msg.lower():
+                self.status.setText("🔴 Puerto bloqueado. Use 'Reiniciar Todo'")
+            elif "not found" in error_msg.lower() or "no such file" in error_msg.lower():
+                self.status.setText("🔴 Puerto no encontrado")
             else:
-                self.status.setText(f"🔴 Error WiFi: {error_msg[:30]}")
-            
-            self.status.setStyleSheet("""
-                QLabel {
-                    padding: 12px;
-                    border-radius: 8px;
-                    background: #FFEBEE;
-                    border: 2px solid #EF9A9A;
-                    font-size: 13px;
-                    font-weight: bold;
-                    color: #C62828;
-                }
-            """)
-            
-            self.safe_close_serial()
-            self.measuring = False
-            self.btn_start.setEnabled(True)
-            self.btn_stop.setEnabled(False)
+                self.status.setText(f"🔴 Error Serial: {error_msg[:30]}")
+        else:
+            self.status.setText(f"🔴 Error WiFi: {error_msg[:30]}")
+
+        self.status.setStyleSheet("""
+            QLabel {
+                padding: 12px;
+                border-radius: 8px;
+                background: #FFEBEE;
+                border: 2px solid #EF9A9A;
+                font-size: 13px;
+                font-weight: bold;
+                color: #C62828;
+            }
+        """)
+
+        self.measuring = False
+        self.btn_start.setEnabled(True)
+        self.btn_stop.setEnabled(False)
+        self.btn_wifi.setEnabled(self.conn_mode == "Serial")
 
     def stop_measurement(self):
-        if self.timer.isActive():
-            self.timer.stop()
         if self.end_timer.isActive():
             self.end_timer.stop()
-            
-        self.safe_close_serial()
-        
+        self.link_timer.stop()
+
+        self.connecting = False
+        self.engine.submit(self.engine.stop_stations())
+        self.config.set("was_measuring", False)
+        self.config.save()
+
         self.status.setText("🟢 Medición finalizada")
         self.status.setStyleSheet("""
             QLabel {
@@ -664,166 +1481,435 @@ class EstacionApp(QtWidgets.QWidget):
                 color: #2E7D32;
             }
         """)
-        
+
         self.measuring = False
-        self.btn_start.setEnabled(True)
+        self.btn_start.setEnabled(self.export_worker is None)
         self.btn_stop.setEnabled(False)
-        self.btn_wifi.setEnabled(True)
-        self.btn_export.setEnabled(True)
+        self.btn_wifi.setEnabled(self.conn_mode == "Serial")
+        self.update_export_buttons()
 
-    def read_data(self):
-        if not self.measuring:
+    def on_gap(self, name, start, end, reason):
+        """La estación volvió tras un corte: se registra el hueco"""
+        store = self.stores.get(name)
+        if store is None:
             return
-            
-        try:
-            if self.conn_mode == "Serial" and self.serial_conn:
-                # Limpiar buffer de entrada
-                if self.serial_conn.in_waiting:
-                    self.serial_conn.read(self.serial_conn.in_waiting)
-                
-                # Enviar comando
-                self.serial_conn.write(b"DATA\n")
-                self.serial_conn.flush()
-                
-                # Esperar datos
-                QtCore.QThread.msleep(100)
-                
-                # Leer respuesta
-                if self.serial_conn.in_waiting:
-                    line = self.serial_conn.readline().decode(errors="ignore").strip()
-                    if line:
-                        self.process_data(line)
-                        
-            elif self.conn_mode == "WiFi" and self.sock:
-                self.sock.sendall(b"DATA\n")
-                line = self.sock.recv(128).decode().strip()
-                if line:
-                    self.process_data(line)
-                    
-        except Exception as e:
-            print(f"Error en read_data: {e}")
+        store.add_gap(start, end, reason)
+        if self.session_log is not None:
+            self.session_log.write_gap(name, start, end, reason)
+        if self.live is not None:
+            self.live.gap(name, start, end, reason)
+        print(f"{name}: reconectada tras {end - start:.1f} s sin datos ({reason})")
+        if self.measuring:
+            self.status.setText(f"🟡 {name[:20]}: reconectada tras {end - start:.0f} s sin datos")
+        self.refresh_station_list()
 
-    def process_data(self, line):
-        """Procesa los datos recibidos"""
+    def on_samples_received(self, name, samples):
+        if not (self.measuring or self.connecting) or name not in self.stores:
+            return
+        self.process_samples(name, samples)
+
+    def add_store(self, name):
+        """Store (con volcado a disco) y estadísticas en vivo de una estación nueva"""
+        spill = os.path.join(self.spill_dir, f"estacion_{len(self.stores)}.bin")
+        self.stores[name] = SampleStore(spill_path=spill)
+        self.stats[name] = StationStats()
+
+    def process_samples(self, name, samples):
+        """Procesa un bloque de muestras de una estación (NaN = sensor no detectado)"""
         try:
-            parts = line.split(",")
-            if len(parts) >= 5:
-                uv, nivel, t, h, p = parts[:5]
-                
-                print(f"Datos recibidos: UV={uv}, Temp={t}, Hum={h}, Pres={p}")
-                
-                # Actualizar tarjetas
-                self.cards["UV"].set_value(f"{uv} ({nivel})" if uv != "NA" else "Sensor no detectado")
-                self.cards["Temp"].set_value(f"{t} °C" if t != "NA" else "Sensor no detectado")
-                self.cards["Hum"].set_value(f"{h} %" if h != "NA" else "Sensor no detectado")
-                self.cards["Pres"].set_value(f"{p} Pa" if p != "NA" else "Sensor no detectado")
-
-                # Guardar datos si son válidos
-                if uv != "NA": 
-                    self.uv_data.append(float(uv))
-                if t != "NA": 
-                    self.temp_data.append(float(t))
-                if h != "NA": 
-                    self.hum_data.append(float(h))
-                if p != "NA": 
-                    self.pres_data.append(float(p))
-                
-                self.data_log.append([datetime.now(), uv, nivel, t, h, p])
-                
-                # Actualizar gráfico cada 5 lecturas
-                if len(self.data_log) % 5 == 0:
-                    self.update_graph()
-                    
-        except ValueError as e:
-            print(f"Error procesando datos: {e}, línea: {line}")
+            rows = self.stores[name].append(samples, time.time())
+            if self.session_log is not None:
+                self.session_log.write(name, rows)
+            if self.live is not None:
+                self.live.publish(name, rows)
+
+            # Cada muestra actualiza acumuladores: el costo no crece con el historial
+            self.stats[name].update(rows)
+            for rule, active, value in self.alerts.evaluate(name, self.stats[name]):
+                self.on_alert(name, rule, active, value)
+
+            if name == self.station_box.currentText():
+                self.update_cards()
+
+            # El gráfico se refresca con graph_timer, no por cada bloque
+            self.graph_dirty = True
+
         except Exception as e:
             print(f"Error inesperado: {e}")
 
+    # tarjeta y variable del resumen bajo el valor
+    CARD_STATS = (("UV", "uv"), ("Temp", "temp"), ("Hum", "hum"), ("Pres", "pres"))
+
+    @staticmethod
+    def stats_text(stats, variable, unit):
+        """Mín/máx de la última hora, media de la sesión y tendencia por hora"""
+        if not stats.session.count:
+            return ""
+        fmt = f".{UNIT_DECIMALS[unit]}f"
+        low, high, mean = convert([stats.recent.min, stats.recent.max, stats.session.mean], variable, unit)
+        suffix = f" {unit}" if unit else ""
+        text = f"mín {low:{fmt}} · máx {high:{fmt}} · media {mean:{fmt}}{suffix}"
+        rate = stats.rate.per_hour
+        if rate == rate:
+            arrow = "↗" if rate > 0 else "↘" if rate < 0 else "→"
+            text += f"\n{arrow} {convert(rate, variable, unit, delta=True):+{fmt}}{suffix}/h"
+        return text
+
+    def unit_text(self, value, variable):
+        """Valor con su unidad en pantalla, o el aviso de sensor ausente"""
+        if value != value:
+            return "Sensor no detectado"
+        unit = self.units[variable]
+        return f"{convert(value, variable, unit):.{UNIT_DECIMALS[unit]}f} {unit}"
+
+    def update_cards(self):
+        """Las tarjetas muestran la última muestra de la estación elegida"""
+        store = self.stores.get(self.station_box.currentText())
+        last = store.last() if store is not None else None
+        if last is None:
+            for card in self.cards.values():
+                card.set_value("Sensor no detectado")
+                card.set_detail("")
+                card.set_alert(False)
+            return
+
+        uv, t, h, p = last["uv"], last["temp"], last["hum"], last["pres"]
+        print(f"Datos recibidos: UV={uv}, Temp={t}, Hum={h}, Pres={p}")
+
+        self.cards["UV"].set_value(f"{uv:.0f} ({uv_level_word(uv)})" if uv == uv else "Sensor no detectado")
+        self.cards["Temp"].set_value(self.unit_text(t, "temp"))
+        self.cards["Hum"].set_value(self.unit_text(h, "hum"))
+        self.cards["Pres"].set_value(self.unit_text(p, "pres"))
+
+        stats = self.stats.get(self.station_box.currentText())
+        active = self.alerts.active_rules(self.station_box.currentText())
+        for key, variable in self.CARD_STATS:
+            card = self.cards[key]
+            card.set_detail(self.stats_text(stats[variable], variable, self.units[variable]) if stats else "")
+            labels = [rule.label for rule in active if rule.variable == variable]
+            card.set_alert(bool(labels), "\n".join(labels))
+
+    def on_alert(self, name, rule, active, value):
+        """Una regla de alerta se encendió o se apagó en una estación"""
+        if active:
+            print(f"⚠️ Alerta {name}: {rule.label} ({rule.metric} = {value:.2f})")
+            self.status.setText(f"⚠️ {name[:20]}: {rule.label}")
+        else:
+            print(f"Alerta terminada {name}: {rule.label}")
+        if self.live is not None:
+            self.live.alert(name, rule.label, rule.variable, active, value)
+        if name == self.station_box.currentText():
+            self.update_cards()
+
+    def refresh_station_box(self):
+        current = self.station_box.currentText()
+        self.station_box.blockSignals(True)
+        self.station_box.clear()
+        self.station_box.addItems(list(self.stores))
+        if current in self.stores:
+            self.station_box.setCurrentText(current)
+        self.station_box.blockSignals(False)
+        self.station_changed()
+
+    def station_changed(self):
+        self.update_cards()
+        self.view_changed()
+
+    def view_changed(self):
+        if self.chart is None:
+            return
+        self.chart.set_view(self.graph_selector.currentText(), self.stores,
+                            self.station_box.currentText(), self.compare_box.isChecked())
+        self.graph_dirty = False
+
     def update_graph(self):
-        """Actualiza el gráfico"""
+        """Actualiza el gráfico con las muestras nuevas"""
+        if not self.graph_dirty:
+            return
+        self.graph_dirty = False
+        if self.chart is None:
+            return
         try:
-            self.ax.clear()
-            sel = self.graph_selector.currentText()
-            
-            colors = {
-                "UV": "#FF9800",
-                "Temperatura": "#2196F3", 
-                "Humedad": "#00BCD4",
-                "Presión": "#9C27B0"
-            }
-            
-            if sel == "Índice UV" and self.uv_data:
-                self.ax.plot(self.uv_data, color=colors["UV"], linewidth=2, alpha=0.8)
-                self.ax.set_title("Índice UV", fontsize=14, fontweight='bold', color=colors["UV"])
-            elif sel == "Temperatura" and self.temp_data:
-                self.ax.plot(self.temp_data, color=colors["Temperatura"], linewidth=2, alpha=0.8)
-                self.ax.set_title("Temperatura (°C)", fontsize=14, fontweight='bold', color=colors["Temperatura"])
-            elif sel == "Humedad" and self.hum_data:
-                self.ax.plot(self.hum_data, color=colors["Humedad"], linewidth=2, alpha=0.8)
-                self.ax.set_title("Humedad (%)", fontsize=14, fontweight='bold', color=colors["Humedad"])
-            elif sel == "Presión" and self.pres_data:
-                self.ax.plot(self.pres_data, color=colors["Presión"], linewidth=2, alpha=0.8)
-                self.ax.set_title("Presión (Pa)", fontsize=14, fontweight='bold', color=colors["Presión"])
-            elif sel == "Todas las Variables":
-                if self.uv_data: 
-                    self.ax.plot(self.uv_data, label="Índice UV", color=colors["UV"], linewidth=1.5)
-                if self.temp_data: 
-                    self.ax.plot(self.temp_data, label="Temperatura", color=colors["Temperatura"], linewidth=1.5)
-                if self.hum_data: 
-                    self.ax.plot(self.hum_data, label="Humedad", color=colors["Humedad"], linewidth=1.5)
-                if self.pres_data: 
-                    self.ax.plot(self.pres_data, label="Presión", color=colors["Presión"], linewidth=1.5)
-                
-                if any([self.uv_data, self.temp_data, self.hum_data, self.pres_data]):
-                    self.ax.legend(fontsize=10)
-                    self.ax.set_title("Comparación de Variables", fontsize=14, fontweight='bold', color="#4A148C")
-            
-            self.ax.grid(True, linestyle='--', alpha=0.4, linewidth=0.5)
-            self.ax.set_xlabel("Número de Muestra", fontsize=11)
-            self.ax.set_ylabel("Valor", fontsize=11)
-            
-            self.canvas.draw_idle()
-            
+            if not self.chart.visible:
+                self.view_changed()
+            else:
+                self.chart.update()
         except Exception as e:
             print(f"Error en update_graph: {e}")
 
+    def update_export_buttons(self):
+        has_data = self.export_worker is None and any(len(store) for store in self.stores.values())
+        self.btn_archive.setEnabled(has_data)
+        self.btn_export.setEnabled(has_data)
+        self.btn_summary.setEnabled(self.export_worker is None)
+
+    def snapshot_stores(self):
+        """Copia de lo no archivado de cada store para el hilo de exportación.
+
+        Se sigue midiendo mientras el hilo trabaja: sin la copia, el búfer
+        circular pisaría las filas que el hilo está leyendo.
+        """
+        since = dict(self.archived)
+        stores = {name: store.snapshot(since.get(name, (0, 0))[0]) for name, store in self.stores.items()}
+        return stores, since
+
+    def save_archive(self):
+        """Guarda lo nuevo de la sesión en el archivo columnar (rápido, sin diálogo)"""
+        stores, since = self.snapshot_stores()
+
+        def task(progress, cancelled):
+            return archive_stores(Archive(self.archive_dir), stores, since, progress)
+
+        self.run_export(task, "Guardando en archivo...", self.on_archive_done, cancellable=False)
+
+    def on_archive_done(self, archived):
+        rows = sum(n for n, _ in archived.values()) - sum(n for n, _ in self.archived.values())
+        self.archived = archived
+        self.status.setText(f"✅ Archivado: {rows} muestras nuevas")
+
     def export_excel(self):
+        """El Excel se deriva del archivo: primero se archiva lo nuevo y luego se lee de ahí"""
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Exportar Mediciones", 
+            f"mediciones_ambientales_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx", 
+            "Excel Files (*.xlsx)"
+        )
+        if not path:
+            return
+
+        stores, since = self.snapshot_stores()
+
+        def task(progress, cancelled):
+            archive = Archive(self.archive_dir)
+            archived = archive_stores(archive, stores, since)
+            views = {}
+            for name, store in stores.items():
+                span = store.time_span()
+                if span is not None:
+                    views[name] = archive.view(name, span[0], np.nextafter(span[1], np.inf))
+            export_xlsx(path, views, progress=progress, cancelled=cancelled)
+            return archived, path
+
+        self.run_export(task, "Exportando a Excel...", self.on_export_done)
+
+    def show_summary(self):
+        """Resumen por día u hora desde el archivo (incluye la sesión en curso)"""
+        stations = sorted(set(Archive(self.archive_dir).stations()) | set(self.stores))
+        if self.summary_dialog is not None:
+            self.summary_dialog.close()
+        self.summary_dialog = SummaryDialog(stations, self.units, self)
+        self.summary_dialog.requested.connect(self.compute_summary)
+        self.summary_dialog.show()
+
+    def compute_summary(self, station, period, days):
+        if self.export_worker is not None:
+            self.summary_dialog.computation_finished()
+            return
+        stores, since = self.snapshot_stores()
+        start = None
+        if days:
+            midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            start = midnight.timestamp() - (days - 1) * 86400
+
+        def task(progress, cancelled):
+            # Lo nuevo de la sesión se archiva primero: el resumen sale solo del archivo
+            archive = Archive(self.archive_dir)
+            archived = archive_stores(archive, stores, since)
+            view = archive.view(station, start)
+            return archived, station, period, summarize(view, period, progress=progress, cancelled=cancelled)
+
+        self.run_export(task, "Calculando resumen...", self.on_summary_done)
+
+    def on_summary_done(self, result):
+        self.archived, station, period, summary = result
+        if self.summary_dialog is not None:
+            self.summary_dialog.show_result(station, period, summary)
+        self.status.setText(f"✅ Resumen de {station[:25]}")
+
+    def run_export(self, task, label, on_done, cancellable=True):
+        # Mientras se exporta no se puede iniciar ni reiniciar: el hilo lee el
+        # archivo de volcado de los stores (la medición en curso sigue)
+        self.btn_archive.setEnabled(False)
+        self.btn_export.setEnabled(False)
+        self.btn_summary.setEnabled(False)
+        self.btn_start.setEnabled(False)
+        self.btn_reset.setEnabled(False)
+
+        self.export_progress = QtWidgets.QProgressDialog(label, "Cancelar", 0, 1000, self)
+        self.export_progress.setWindowTitle("Exportar Mediciones")
+        self.export_progress.setWindowModality(QtCore.Qt.WindowModal)
+        self.export_progress.setMinimumDuration(300)
+        self.export_progress.setAutoClose(False)
+        self.export_progress.setAutoReset(False)
+        if not cancellable:
+            self.export_progress.setCancelButton(None)
+
+        self.export_worker = ExportWorker(task, self)
+        self.export_worker.progress.connect(self.on_export_progress)
+        self.export_worker.done.connect(on_done)
+        self.export_worker.failed.connect(self.on_export_failed)
+        self.export_worker.cancelled.connect(self.on_export_cancelled)
+        self.export_worker.finished.connect(self.on_export_finished)
+        self.export_progress.canceled.connect(self.export_worker.cancel)
+        self.export_worker.start()
+        self.status.setText(f"⏳ {label}")
+
+    def on_export_progress(self, done, total):
+        if total:
+            self.export_progress.setValue(int(1000 * done / total))
+            self.export_progress.setLabelText(f"{done}/{total} filas")
+
+    def on_export_done(self, result):
+        self.archived, path = result
+        self.status.setText(f"✅ Guardado: {os.path.basename(path)[:25]}")
+
+    def on_export_failed(self, error_msg):
+        self.status.setText(f"🔴 Error al exportar: {error_msg[:30]}")
+
+    def on_export_cancelled(self):
+        self.status.setText("🟡 Exportación cancelada")
+
+    def on_export_finished(self):
+        self.export_progress.close()
+        self.export_worker = None
+        if self.summary_dialog is not None:
+            self.summary_dialog.computation_finished()
+        self.btn_reset.setEnabled(True)
+        self.btn_start.setEnabled(not (self.measuring or self.connecting))
+        self.update_export_buttons()
+
+    def live_toggled(self, checked):
+        if checked:
+            self.start_live_server()
+        else:
+            self.stop_live_server()
+        self.config.set("live_server", self.live is not None)
+        if self.config.dirty:
+            self.config_timer.start(500)
+
+    def start_live_server(self):
+        """Abre el servidor en vivo; lo ya medido queda en su historial"""
+        if self.live is not None:
+            return
+        server = LiveServer(port=int(self.config["live_port"]))
+        try:
+            server.start()
+        except OSError as e:
+            print(f"Error al iniciar el servidor en vivo: {e}")
+            self.status.setText(f"🔴 Servidor en vivo: {str(e)[:30]}")
+            self.live_box.blockSignals(True)
+            self.live_box.setChecked(False)
+            self.live_box.blockSignals(False)
+            return
+
+        self.live = server
+        for name, store in self.stores.items():
+            n = min(len(store), HISTORY_CAPACITY)
+            if n:
+                server.publish(name, {col: store.tail(col, n) for col in COLUMNS})
+        for name, state in self.station_state.items():
+            server.status(name, state)
+        print(f"Servidor en vivo: {server.url}")
+        self.live_box.setToolTip(f"Tablero en {server.url} (desde otra PC, con la IP de esta)")
+        self.status.setText(f"🌍 Publicando en el puerto {server.port}")
+
+    def stop_live_server(self):
+        if self.live is None:
+            return
+        self.live.shutdown()
+        self.live = None
+        self.live_box.setToolTip("")
+
+    def open_session_log(self, path):
+        try:
+            self.session_log = SessionLog(path)
+            self.session_log.start()
+        except Exception as e:
+            print(f"Error al abrir el registro de sesión: {e}")
+            self.session_log = None
+
+    def close_session_log(self):
+        if self.session_log is not None:
+            try:
+                self.session_log.close()
+            except Exception as e:
+                print(f"Error al cerrar el registro de sesión: {e}")
+            self.session_log = None
+
+    def check_unfinished_sessions(self):
+        """Ofrece recuperar la última sesión que no se cerró bien"""
         try:
-            path, _ = QtWidgets.QFileDialog.getSaveFileName(
-                self, "Exportar Mediciones", 
-                f"mediciones_ambientales_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx", 
-                "Excel Files (*.xlsx)"
-            )
-            if path:
-                wb = Workbook()
-                ws = wb.active
-                ws.title = "Mediciones"
-                ws.append(["Fecha y Hora", "Índice UV", "Nivel UV", "Temperatura (°C)", "Humedad (%)", "Presión (Pa)"])
-                for row in self.data_log:
-                    ws.append(row)
-                wb.save(path)
-                self.status.setText(f"✅ Guardado: {path.split('/')[-1][:25]}")
+            sessions = unfinished_sessions(self.session_dir)
         except Exception as e:
-            self.status.setText(f"🔴 Error al exportar: {str(e)[:30]}")
+            print(f"Error al buscar sesiones: {e}")
+            return
+
+        recovered = False
+        for path, started, count in reversed(sessions):
+            if not recovered and count:
+                when = datetime.fromtimestamp(started).strftime("%d/%m/%Y %H:%M") if started else "?"
+                answer = QtWidgets.QMessageBox.question(
+                    self, "Recuperar sesión",
+                    f"La sesión del {when} no se cerró correctamente ({count} muestras).\n"
+                    "¿Desea recuperarla?",
+                    QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No,
+                )
+                if answer == QtWidgets.QMessageBox.Yes:
+                    recovered = self.recover_session(path)
+                    continue
+            # Las demás se dan por cerradas; sus datos siguen en disco
+            try:
+                mark_finished(path)
+            except Exception as e:
+                print(f"Error al cerrar la sesión {path}: {e}")
+
+    def recover_session(self, path):
+        """Carga una sesión guardada y sigue registrando en el mismo archivo"""
+        try:
+            rows_read = 0
+            for name, rows in read_session(path):
+                if name not in self.stores:
+                    self.add_store(name)
+                self.stores[name].append_rows(rows)
+                self.stats[name].update(rows)
+                rows_read += len(rows["time"])
+            for name, start, end, reason in read_gaps(path):
+                if name in self.stores:
+                    self.stores[name].add_gap(start, end, reason)
+        except Exception as e:
+            print(f"Error al recuperar la sesión: {e}")
+            self.status.setText(f"🔴 Error al recuperar: {str(e)[:30]}")
+            return False
+
+        self.open_session_log(path)
+        self.refresh_station_box()
+        self.update_export_buttons()
+        self.status.setText(f"♻️ Sesión recuperada: {rows_read} muestras")
+        return True
 
     def reset_all(self):
         """Reinicio completo"""
         self.stop_measurement()
+        self.close_session_log()
         
-        self.data_log.clear()
-        self.uv_data.clear()
-        self.temp_data.clear()
-        self.hum_data.clear()
-        self.pres_data.clear()
+        for store in self.stores.values():
+            store.clear()
+        self.stores.clear()
+        self.stats.clear()
+        self.alerts.clear()
+        if self.live is not None:
+            self.live.clear()
+        self.active = {}
+        self.station_state.clear()
+        self.refresh_station_list()
         
-        for card in self.cards.values():
-            card.set_value("Sensor no detectado")
+        if self.chart is not None:
+            self.chart.reset()
+        self.refresh_station_box()
+        self.graph_dirty = False
         
-        self.ax.clear()
-        self.ax.grid(True, linestyle='--', alpha=0.4, linewidth=0.5)
-        self.canvas.draw_idle()
-        
-        self.btn_export.setEnabled(False)
+        self.archived = {}
+        self.update_export_buttons()
         self.status.setText("🟦 Sistema reiniciado. Listo para nueva medición")
         self.status.setStyleSheet("""
             QLabel {
@@ -839,6 +1925,24 @@ class EstacionApp(QtWidgets.QWidget):
         
         QtCore.QTimer.singleShot(300, self.refresh_ports_list)
 
+    def closeEvent(self, event):
+        """Detiene las estaciones y el hilo del motor antes de salir"""
+        self.end_timer.stop()
+        self.link_timer.stop()
+        self.config_timer.stop()
+        self.port_watcher.stop()
+        self.settings_changed()
+        self.config.update(window_size=[self.width(), self.height()], was_measuring=False)
+        self.config.save()
+        if self.export_worker is not None:
+            self.export_worker.cancel()
+            self.export_worker.wait()
+        self.engine.shutdown()
+        self.stop_live_server()
+        self.close_session_log()
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+        super().closeEvent(event)
+
 
 if __name__ == "__main__":
     app = QtWidgets.QApplication(sys.argv)
@@ -0,0 +1,7 @@
+"""Pruebas de ``climalab`` contra la estación simulada (sin hardware)."""
+
+import os
+import sys
+
+# climalab no se instala: se importa desde SFT, como lo hace main_gui
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
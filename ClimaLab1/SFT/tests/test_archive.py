@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from climalab.analysis import summarize
+from climalab.archive import Archive
+from climalab.simulator import sample_blocks
+
+
+def blocks(n, start=0):
+    return np.concatenate(list(sample_blocks(n, 50, start=start)))
+
+
+def test_view_sorts_backfilled_rows(tmp_path):
+    archive = Archive(str(tmp_path))
+    archive.append("COM3", blocks(300, start=200))
+    # Relleno por DUMP: filas más viejas añadidas después
+    archive.append("COM3", blocks(200))
+
+    view = archive.view("COM3")
+    chunks = list(view.iter_chunks(128))
+    seq = np.concatenate([c["seq"] for c in chunks])
+    assert list(seq) == list(range(500))
+    assert np.all(np.diff(np.concatenate([c["time"] for c in chunks])) > 0)
+
+    # Con rango (máscara) también sale ordenado
+    t0 = 1.7e9 + 100 * 0.02
+    ranged = archive.view("COM3", t0, t0 + 300 * 0.02)
+    seq = np.concatenate([c["seq"] for c in ranged.iter_chunks(64)])
+    assert list(seq) == list(range(100, 400))
+
+
+def test_uv_dose_ignores_append_order(tmp_path):
+    ordered = Archive(str(tmp_path / "ordenado"))
+    ordered.append("COM3", blocks(500))
+    backfilled = Archive(str(tmp_path / "relleno"))
+    backfilled.append("COM3", blocks(300, start=200))
+    backfilled.append("COM3", blocks(200))
+
+    expected = summarize(ordered.view("COM3"), chunk_size=64)
+    result = summarize(backfilled.view("COM3"), chunk_size=64)
+    assert result["uv_dose"] == pytest.approx(expected["uv_dose"])
+    assert result["uv_dose"].sum() > 0
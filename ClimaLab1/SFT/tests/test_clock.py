@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from climalab.clock import WRAP_MS, DeviceClock
+
+
+def test_offset_takes_fastest_packet():
+    clock = DeviceClock(drift_ppm=0)
+    clock.host_times([1000], 100.05)     # 50 ms de latencia
+    clock.host_times([2000], 101.01)     # 10 ms
+    clock.host_times([3000], 102.08)
+    times = clock.host_times([4000], 103.02)
+    assert times[0] == pytest.approx(103.01)
+    assert clock.latency == pytest.approx(0.01)
+
+
+def test_samples_without_millis_take_reception_time():
+    clock = DeviceClock()
+    times = clock.host_times([-1, 500, -1], 50.0)
+    assert times[0] == times[2] == 50.0
+    assert times[1] == pytest.approx(50.0)
+
+
+def test_wrap_is_unrolled():
+    clock = DeviceClock(drift_ppm=0)
+    before = WRAP_MS - 1000
+    first = clock.host_times([before - 500, before], 1000.0)
+    # Cruza la vuelta dentro de un bloque y entre bloques
+    second = clock.host_times([WRAP_MS - 200, 300], 1001.3)
+    third = clock.host_times([1300], 1002.3)
+
+    assert clock.wraps == 1
+    assert clock.resets == 0
+    times = np.concatenate([first, second, third])
+    assert np.allclose(np.diff(times), [0.5, 0.8, 0.5, 1.0])
+
+
+def test_reboot_starts_a_new_estimate():
+    clock = DeviceClock(drift_ppm=0)
+    clock.host_times([5_000_000, 5_001_000], 200.0)
+    # La placa se reinició: millis() vuelve a empezar sin dar la vuelta
+    times = clock.host_times([5_002_000, 100, 600], 210.0)
+
+    assert clock.resets == 1
+    assert clock.wraps == 0
+    assert times[0] == pytest.approx(201.0)        # estimación vieja
+    assert times[1:] == pytest.approx([209.5, 210.0])
+
+
+def test_past_times_do_not_move_the_estimate():
+    clock = DeviceClock(drift_ppm=0)
+    clock.host_times([10_000], 100.0)
+    offset = clock.offset
+    assert clock.past_times([7_000, 9_000]) == pytest.approx([97.0, 99.0])
+    assert clock.offset == offset
+
+
+def test_past_times_before_a_wrap():
+    clock = DeviceClock(drift_ppm=0)
+    clock.host_times([WRAP_MS - 1000], 100.0)
+    clock.host_times([1000], 102.0)
+    assert clock.past_times([WRAP_MS - 500]) == pytest.approx([100.5])
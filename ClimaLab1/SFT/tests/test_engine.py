@@ -0,0 +1,204 @@
+import asyncio
+import contextlib
+
+import numpy as np
+import pytest
+
+from climalab import engine as engine_module
+from climalab.engine import AcquisitionEngine, Station, StationConfig
+from climalab.frames import encode_frame
+from climalab.protocol import parse_dump_header
+from climalab.simulator import FakeStation, serve_tcp
+
+
+class Events:
+    """Lo que el motor entrega por sus callbacks"""
+
+    def __init__(self):
+        self.blocks = []
+        self.statuses = []
+        self.gaps = []
+
+    def on_samples(self, name, samples):
+        self.blocks.append(samples.copy())
+
+    def on_status(self, name, state, detail=""):
+        self.statuses.append((state, detail))
+
+    def on_gap(self, name, start, end, reason):
+        self.gaps.append((start, end))
+
+    @property
+    def samples(self):
+        return np.concatenate(self.blocks)
+
+    def states(self, state):
+        return [detail for s, detail in self.statuses if s == state]
+
+
+@contextlib.asynccontextmanager
+async def acquiring(station, link=None, **options):
+    """Simulador TCP y motor en el mismo bucle; da (motor, eventos, nombre)"""
+    server = await serve_tcp(station, "127.0.0.1", 0, **(link or {}))
+    port = server.sockets[0].getsockname()[1]
+    events = Events()
+    engine = AcquisitionEngine(events.on_samples, events.on_status, delivery_interval=0.01, on_gap=events.on_gap)
+    options.setdefault("reconnect", False)
+    config = StationConfig("sim", "tcp", "127.0.0.1", port, **options)
+    await engine.start_station(config)
+    try:
+        yield engine, events, config.name
+    finally:
+        await engine.stop_stations()
+        server.close()
+        await server.wait_closed()
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_polling():
+    async def main():
+        async with acquiring(FakeStation(temp=21.0), interval=0.05) as (engine, events, name):
+            await asyncio.sleep(1.2)
+            rtt, _ = engine.link_stats(name)
+        return events, rtt
+
+    events, rtt = run(main())
+    samples = events.samples
+    assert len(samples) >= 10
+    assert np.allclose(samples["temp"], 21.0)
+    assert np.all(np.diff(samples["time"]) > 0)
+    assert rtt is not None
+    assert events.states("connected") and not events.states("error")
+
+
+def test_binary_streaming():
+    async def main():
+        async with acquiring(FakeStation(), stream_ms=20, binary=True) as (engine, events, name):
+            await asyncio.sleep(1.0)
+        return events
+
+    events = run(main())
+    samples = events.samples
+    assert len(samples) >= 30
+    assert np.all(np.diff(samples["seq"]) == 1)
+    assert np.diff(samples["t_ms"]).mean() == pytest.approx(20, abs=2)
+    assert not events.states("dropped")
+
+
+def test_lost_frames_are_reported():
+    async def main():
+        link = dict(loss=0.3, seed=3)
+        async with acquiring(FakeStation(), link, stream_ms=20, binary=True) as (engine, events, name):
+            await asyncio.sleep(1.0)
+            dropped = engine.stations[name].dropped
+        return events, dropped
+
+    events, dropped = run(main())
+    seq = events.samples["seq"]
+    assert dropped > 0
+    assert sum(int(n) for n in events.states("dropped")) == dropped == seq[-1] - seq[0] + 1 - len(seq)
+
+
+def test_clients_do_not_see_each_others_frames():
+    async def main():
+        station = FakeStation()
+        async with acquiring(station, stream_ms=20, binary=True) as (_, first, _):
+            async with acquiring(station, interval=0.05, binary=True) as (_, second, _):
+                await asyncio.sleep(1.0)
+        return first, second
+
+    first, second = run(main())
+    assert not first.states("dropped") and not second.states("dropped")
+
+
+@pytest.fixture
+def fast_reconnect(monkeypatch):
+    monkeypatch.setattr(engine_module, "RECONNECT_MIN", 0.5)
+
+
+async def cut_link(engine, name):
+    engine.stations[name].transport.close()
+
+
+def test_reconnects_after_link_loss(fast_reconnect):
+    async def main():
+        station = FakeStation()
+        station.LOG_PERIOD_MS = 50
+        async with acquiring(station, stream_ms=50, reconnect=True) as (engine, events, name):
+            await asyncio.sleep(0.6)
+            await cut_link(engine, name)
+            await asyncio.sleep(1.5)
+            reconnects = engine.stations[name].reconnects
+        return events, reconnects
+
+    events, reconnects = run(main())
+    assert len(events.states("connected")) == 2
+    assert events.states("error") and events.states("reconnecting")
+    assert reconnects == 1
+    # Lo que faltó se descargó del registro de la estación: no quedan huecos
+    recovered = sum(int(n) for n in events.states("recovered"))
+    assert recovered >= 3
+    assert not events.gaps
+    times = events.samples["time"]
+    assert np.all(np.diff(times) > 0)
+    assert np.diff(times).max() < 0.15
+
+
+def test_gap_without_station_log(fast_reconnect):
+    async def main():
+        station = FakeStation()
+        station.LOG_PERIOD_MS = 50
+        async with acquiring(station, stream_ms=50, reconnect=True) as (engine, events, name):
+            engine.stations[name].dump_supported = False
+            await asyncio.sleep(0.6)
+            await cut_link(engine, name)
+            await asyncio.sleep(1.5)
+        return events
+
+    events = run(main())
+    assert not events.states("recovered")
+    assert len(events.gaps) == 1
+    start, end = events.gaps[0]
+    assert 0.3 < end - start < 2.0
+
+
+class ScriptedTransport:
+    """Transporte que entrega lecturas preparadas y anota lo enviado"""
+
+    def __init__(self, reads):
+        self.reads = list(reads)
+        self.written = []
+
+    async def read(self):
+        if not self.reads:
+            await asyncio.sleep(3600)
+        return self.reads.pop(0)
+
+    async def write(self, data):
+        self.written.append(data)
+
+    def close(self):
+        pass
+
+
+def test_dump_returns_live_samples_behind_the_frames():
+    frames = encode_frame(7, 7000, uv=1) + encode_frame(8, 8000, uv=1)
+    live = b"3,Moderado,24.5,55.0,101325,9000\r\n"
+
+    async def main():
+        station = Station(StationConfig("sim", "tcp", "127.0.0.1"), 8)
+        station.transport = ScriptedTransport([b"OK_DUMP,2,8,8000,1000,9000\r\n" + frames[:30], frames[30:] + live])
+        return await AcquisitionEngine(lambda *a: None)._dump(station, 6)
+
+    head, samples, live_samples, _ = run(main())
+    assert head == (2, 8, 8000, 1000, 9000)
+    assert list(samples["seq"]) == [7, 8]
+    assert list(live_samples["t_ms"]) == [9000]
+
+
+@pytest.mark.parametrize("line", ["OK_DUMP,2,8,8000,0,9000", "OK_DUMP,-1,8,8000,1000,9000", "OK_DUMP,2,8", "DATA"])
+def test_invalid_dump_headers(line):
+    assert parse_dump_header(line) is None
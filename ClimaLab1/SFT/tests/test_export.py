@@ -0,0 +1,44 @@
+import pytest
+
+from climalab.export import GAPS_SHEET, export_xlsx, sheet_title
+from climalab.simulator import sample_blocks
+from climalab.store import SampleStore
+
+openpyxl = pytest.importorskip("openpyxl")
+
+
+def store_with(n):
+    store = SampleStore(capacity=100)
+    for samples in sample_blocks(n, 7):
+        store.append(samples)
+    return store
+
+
+def test_station_continues_on_new_sheets(tmp_path):
+    path = tmp_path / "sesion.xlsx"
+    rows = export_xlsx(str(path), {"COM3": store_with(25)}, chunk_size=4, sheet_rows=11)
+    assert rows == 25
+
+    wb = openpyxl.load_workbook(path, read_only=True)
+    assert wb.sheetnames == ["COM3", "COM3 (2)", "COM3 (3)"]
+    # Cada hoja lleva su encabezado y como máximo sheet_rows filas
+    assert [len(list(wb[name].rows)) for name in wb.sheetnames] == [11, 11, 6]
+
+
+def test_sheet_titles_fit_and_are_unique():
+    long_name = "estación de la azotea norte /dev/ttyUSB0"
+    titles = [sheet_title(long_name, 0, 2, part) for part in (1, 2, 10)]
+    assert all(len(title) <= 31 for title in titles)
+    assert len(set(titles)) == 3
+    assert titles[2].endswith(" (10)")
+
+
+def test_station_named_like_gaps_sheet(tmp_path):
+    path = tmp_path / "sesion.xlsx"
+    store = store_with(3)
+    store.add_gap(1.7e9, 1.7e9 + 5, "cable")
+    export_xlsx(str(path), {GAPS_SHEET.upper(): store})
+
+    wb = openpyxl.load_workbook(path, read_only=True)
+    assert len({name.lower() for name in wb.sheetnames}) == len(wb.sheetnames) == 2
+    assert GAPS_SHEET in wb.sheetnames
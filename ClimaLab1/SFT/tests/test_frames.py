@@ -0,0 +1,77 @@
+import numpy as np
+
+from climalab.frames import FRAME_SIZE, FrameDecoder, encode_frame
+
+
+def frames(seqs):
+    return b"".join(encode_frame(seq, seq * 20, uv=3, temp=24.5, hum=55.0, pres=101325, uv_adc=512)
+                    for seq in seqs)
+
+
+def feed_all(decoder, chunks):
+    blocks = [decoder.feed(chunk) for chunk in chunks]
+    return np.concatenate(blocks)
+
+
+def test_decodes_values():
+    samples = FrameDecoder().feed(frames([1, 2, 3]))
+    assert list(samples["seq"]) == [1, 2, 3]
+    assert list(samples["t_ms"]) == [20, 40, 60]
+    assert np.allclose(samples["temp"], 24.5)
+    assert np.allclose(samples["pres"], 101325)
+    assert np.allclose(samples["uv_adc"], 512)
+
+
+def test_missing_sensor_is_nan():
+    samples = FrameDecoder().feed(encode_frame(1, 0, uv=2, temp=None, hum=None, pres=101000))
+    assert np.isnan(samples["temp"][0]) and np.isnan(samples["hum"][0])
+    assert samples["pres"][0] == 101000
+
+
+def test_split_at_every_byte():
+    data = frames(range(1, 11))
+    decoder = FrameDecoder()
+    samples = feed_all(decoder, [data[i:i + 1] for i in range(len(data))])
+    assert list(samples["seq"]) == list(range(1, 11))
+    assert decoder.dropped == 0 and decoder.corrupted == 0
+
+
+def test_split_at_odd_sizes():
+    data = frames(range(1, 101))
+    decoder = FrameDecoder()
+    chunks = [data[i:i + 37] for i in range(0, len(data), 37)]
+    assert list(feed_all(decoder, chunks)["seq"]) == list(range(1, 101))
+
+
+def test_junk_before_and_between_frames():
+    data = b"BMP280 OK\r\n" + frames([1, 2]) + b"\xa5\x00zz" + frames([3])
+    decoder = FrameDecoder()
+    assert list(decoder.feed(data)["seq"]) == [1, 2, 3]
+    assert decoder.dropped == 0
+
+
+def test_corrupted_frame_is_skipped_and_counted():
+    data = bytearray(frames(range(1, 6)))
+    data[2 * FRAME_SIZE + 10] ^= 0xFF          # trama seq=3
+    decoder = FrameDecoder()
+    samples = decoder.feed(bytes(data))
+    assert list(samples["seq"]) == [1, 2, 4, 5]
+    assert decoder.corrupted == 1
+    assert decoder.dropped == 1
+
+
+def test_corrupted_frame_split_across_reads():
+    data = bytearray(frames(range(1, 6)))
+    data[FRAME_SIZE + 4] ^= 0x01               # trama seq=2
+    decoder = FrameDecoder()
+    chunks = [bytes(data[i:i + 30]) for i in range(0, len(data), 30)]
+    assert list(feed_all(decoder, chunks)["seq"]) == [1, 3, 4, 5]
+    assert decoder.dropped == 1
+
+
+def test_sequence_gaps_are_counted_across_reads():
+    decoder = FrameDecoder()
+    decoder.feed(frames([1, 2]))
+    decoder.feed(frames([5, 6]))
+    decoder.feed(frames([10]))
+    assert decoder.dropped == 2 + 3
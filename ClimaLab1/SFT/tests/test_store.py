@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from climalab.simulator import sample_blocks
+from climalab.store import SampleStore
+
+
+def seqs(chunks):
+    return np.concatenate([chunk["seq"] for chunk in chunks]) if chunks else np.empty(0)
+
+
+def fill(store, n, start=0, block=70):
+    for samples in sample_blocks(n, block, start=start):
+        store.append(samples)
+
+
+def test_wrap_keeps_newest_rows_in_order():
+    store = SampleStore(capacity=100)
+    fill(store, 250)
+    assert len(store) == 100
+    assert store.total == 250
+    assert store.first_index == 150
+    assert list(store.column("seq")) == list(range(150, 250))
+    assert list(store.tail("seq", 3)) == [247, 248, 249]
+    assert store.time_span() == pytest.approx((1.7e9, 1.7e9 + 249 * 0.02))
+
+
+def test_block_larger_than_capacity():
+    store = SampleStore(capacity=50)
+    fill(store, 120, block=120)
+    assert list(store.column("seq")) == list(range(70, 120))
+
+
+def test_samples_without_time_are_dated_on_arrival():
+    store = SampleStore(capacity=100)
+    samples = next(sample_blocks(5, block=5))
+    samples["time"] = np.nan
+    store.append(samples, received_at=1.7e9)
+    assert np.allclose(store.column("time"), 1.7e9 - np.array([0.08, 0.06, 0.04, 0.02, 0.0]))
+
+
+def test_spill_keeps_whole_session(tmp_path):
+    store = SampleStore(capacity=100, spill_path=str(tmp_path / "spill.bin"))
+    fill(store, 1000)
+    assert store.spilled == 900
+    assert store.session_length() == 1000
+    assert list(seqs(list(store.iter_chunks(64)))) == list(range(1000))
+
+
+def test_clear_removes_spill_file(tmp_path):
+    path = tmp_path / "spill.bin"
+    store = SampleStore(capacity=100, spill_path=str(path))
+    fill(store, 250)
+    store.clear()
+    assert not path.exists()
+    assert len(store) == 0 and store.session_length() == 0
+
+
+@pytest.mark.parametrize("start", [0, 1, 899, 900, 901, 999, 1000])
+def test_iter_chunks_from_start(tmp_path, start):
+    store = SampleStore(capacity=100, spill_path=str(tmp_path / "spill.bin"))
+    fill(store, 1000)
+    assert list(seqs(list(store.iter_chunks(33, start=start)))) == list(range(start, 1000))
+
+
+def test_iter_chunks_without_spill_counts_from_memory():
+    store = SampleStore(capacity=100)
+    fill(store, 250)
+    assert store.session_length() == 100
+    assert list(seqs(list(store.iter_chunks(30, start=40)))) == list(range(190, 250))
+
+
+def test_snapshot_is_stable_while_appending(tmp_path):
+    store = SampleStore(capacity=100, spill_path=str(tmp_path / "spill.bin"))
+    fill(store, 450)
+    snapshot = store.snapshot(start=300)
+    fill(store, 550, start=450, block=550)   # da varias vueltas al búfer
+    store.add_gap(0, 1)
+
+    assert snapshot.session_length() == 450
+    assert list(seqs(list(snapshot.iter_chunks(40, start=300)))) == list(range(300, 450))
+    assert list(seqs(list(snapshot.iter_chunks(40, start=420)))) == list(range(420, 450))
+    assert snapshot.gaps == []
+
+
+def test_snapshot_only_covers_rows_from_start(tmp_path):
+    store = SampleStore(capacity=100, spill_path=str(tmp_path / "spill.bin"))
+    fill(store, 450)
+    snapshot = store.snapshot(start=420)
+    assert len(snapshot) == 30
+    with pytest.raises(ValueError):
+        list(snapshot.iter_chunks(start=400))
+
+
+def test_snapshot_reads_spilled_rows_from_disk(tmp_path):
+    store = SampleStore(capacity=100, spill_path=str(tmp_path / "spill.bin"))
+    fill(store, 450)
+    snapshot = store.snapshot()
+    fill(store, 300, start=450)
+    assert list(seqs(list(snapshot.iter_chunks(64)))) == list(range(450))